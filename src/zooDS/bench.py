@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import time
+import can
+import isotp
+from .did_scan import IDENTIFICATION_DIDS, scan_dids
+from .dump_image import DumpImage
+from .mem_scan import scan_memory_by_address, upload_memory
+from .rid_scan import scan_rids
+from .simulator import SimulatedECU
+from .transport import close_stack, open_isotp_stack
+from .utils import send_and_collect
+
+"""
+Scan throughput benchmarks against the simulated ECU.
+
+Each benchmark runs a scanner against a SimulatedECU on its own bus and reports
+the requests the ECU answered, the hits found, the wall time and the request rate.
+Results can be saved as JSON and compared with an earlier run, so a change to the
+response handling, the scanners or the ISO-TP settings shows up as a rate change.
+"""
+
+BENCHMARKS = ("did", "rid", "mem", "upload", "key")
+
+DID_RANGE = (0xF100, 0xF1FF)
+RID_RANGE = (0x0200, 0x02FF)
+MEMORY_BASE = 0x00000000
+MEMORY_SIZE = 0x4000
+MEMORY_BLOCK = 0x80
+UPLOAD_BLOCK_LENGTH = 0x402
+
+
+def bench_ecu(bus, latency=0.0, fd=False):
+    """
+    Returns the SimulatedECU the benchmarks run against.
+
+    It has the identification DIDs and every 16th DID of DID_RANGE, four RIDs, a
+    MEMORY_SIZE image with a protected last kilobyte that can also be uploaded in
+    UPLOAD_BLOCK_LENGTH blocks, and a few identifiers that answer Response Pending (0x78)
+    or Busy Repeat Request (0x21) first.
+    """
+    dids = {did: f"ID{did:04X}".encode() for did in IDENTIFICATION_DIDS}
+    dids.update({did: bytes(range(8)) for did in range(DID_RANGE[0], DID_RANGE[1] + 1, 0x10)})
+    rids = {0x0200: b"\x00", 0x0203: b"\x01", 0x0240: b"\x00\x10", 0x02FF: b"\x02"}
+    memory = bytes(address & 0xFF for address in range(MEMORY_SIZE))
+    return SimulatedECU(bus, latency=latency, dids=dids, rids=rids, memory=memory, memory_base=MEMORY_BASE,
+                        protected=[(MEMORY_BASE + MEMORY_SIZE - 0x400, MEMORY_BASE + MEMORY_SIZE - 1)],
+                        pending={0xF190: 2, 0x0240: 1}, busy={0xF120: 1, 0x0203: 1},
+                        upload_block_length=UPLOAD_BLOCK_LENGTH, fd=fd)
+
+
+def _key_scan(stack, timeout):
+    """Tries the single-byte XOR keys in order, each on a fresh seed, like key_crack.xor_key()."""
+    for candidate in range(256):
+        responses = send_and_collect(stack, b"\x27\x01", timeout)
+        if not responses or responses[0].negative:
+            return 0
+        seed = responses[0].payload
+        key = bytes(b ^ candidate for b in seed)
+        responses = send_and_collect(stack, b"\x27\x02" + key, timeout)
+        if responses and responses[0].positive:
+            return 1
+    return 0
+
+
+def _upload(stack, timeout):
+    """Uploads the unprotected memory of the bench ECU into a temporary dump image; returns the blocks received."""
+    end = MEMORY_BASE + MEMORY_SIZE - 0x400 - 1
+    blocks = []
+    with tempfile.TemporaryDirectory() as directory:
+        with DumpImage(os.path.join(directory, "upload.bin"), MEMORY_BASE, end - MEMORY_BASE + 1) as image:
+            upload_memory(stack, MEMORY_BASE, end, image, timeout=timeout,
+                          on_hit=lambda address, data: blocks.append(address))
+    return len(blocks)
+
+
+def run_benchmark(name, stack, timeout=0.3, batch_size=1):
+    """
+    Runs one benchmark scan on a stack connected to a bench_ecu().
+
+    Returns:
+        int: Hits found.
+    """
+    if name == "did":
+        return len(scan_dids(stack, DID_RANGE[0], DID_RANGE[1], timeout, batch_size))
+    if name == "rid":
+        return len(scan_rids(stack, RID_RANGE[0], RID_RANGE[1], timeout))
+    if name == "mem":
+        results = scan_memory_by_address(stack, MEMORY_BASE, MEMORY_BASE + MEMORY_SIZE - 1, MEMORY_BLOCK,
+                                         timeout=timeout)
+        return sum(1 for _, _, responses in results if responses and responses[0].positive)
+    if name == "upload":
+        return _upload(stack, timeout)
+    if name == "key":
+        return _key_scan(stack, timeout)
+    raise ValueError(f"Unknown benchmark '{name}', expected one of: {', '.join(BENCHMARKS)}")
+
+
+def run_benchmarks(names=BENCHMARKS, interface="virtual", channel="zoods-bench", latency=0.0, timeout=0.3,
+                   batch_size=1, stmin=0, blocksize=0, backend="user", fd=False):
+    """
+    Runs benchmark scans against a simulated ECU.
+
+    Args:
+        names (tuple): Benchmarks to run (see BENCHMARKS).
+        interface (str): python-can interface, "virtual" or "socketcan" (with a vcan channel).
+        channel (str): Bus channel shared by the tester and the simulated ECU.
+        latency (float): Simulated ECU response latency in seconds.
+        timeout (float): Scanner response timeout in seconds.
+        batch_size (int): DIDs per ReadDataByIdentifier request.
+        stmin (int): Separation time minimum of the tester's flow control frames.
+        blocksize (int): Block size of the tester's flow control frames.
+        backend (str): ISO-TP implementation of the tester (see transport.BACKENDS).
+        fd (bool): Use CAN FD frames.
+
+    Returns:
+        list: One dict per benchmark with name, requests, hits, seconds and rate (requests per second).
+    """
+    results = []
+    for name in names:
+        ecu_bus = can.Bus(interface=interface, channel=channel, fd=fd)
+        tester_bus = can.Bus(interface=interface, channel=channel, fd=fd)
+        address = isotp.Address(isotp.AddressingMode.Normal_11bits, txid=0x7E0, rxid=0x7E8)
+        stack = None
+        try:
+            with bench_ecu(ecu_bus, latency, fd) as ecu:
+                stack = open_isotp_stack(tester_bus, address, stmin, blocksize, backend, fd)
+                started = time.monotonic()
+                hits = run_benchmark(name, stack, timeout, batch_size)
+                seconds = time.monotonic() - started
+                requests = ecu.requests
+        finally:
+            if stack is not None:
+                close_stack(stack)
+            tester_bus.shutdown()
+            ecu_bus.shutdown()
+        results.append({"name": name, "requests": requests, "hits": hits, "seconds": round(seconds, 3),
+                        "rate": round(requests / seconds, 1) if seconds else 0.0})
+    return results
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_results(results, baseline=None):
+    """Prints benchmark results, with the rate change against a baseline run if given."""
+    before = {result["name"]: result for result in baseline or []}
+    print(f"{'scan':<6}{'requests':>10}{'hits':>7}{'seconds':>10}{'req/s':>10}")
+    for result in results:
+        line = (f"{result['name']:<6}{result['requests']:>10}{result['hits']:>7}"
+                f"{result['seconds']:>10.3f}{result['rate']:>10.1f}")
+        old = before.get(result["name"])
+        if old and old["rate"]:
+            line += f"  {100 * (result['rate'] - old['rate']) / old['rate']:+.1f}% vs baseline"
+        print(line)
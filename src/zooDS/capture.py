@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+import can
+
+"""
+Raw CAN trace capture.
+
+attach_capture() hooks a python-can bus so that every frame it sends or receives is
+also handed to a CaptureWriter. The writer logs the frames from a background thread
+through python-can's Logger, which picks the format from the file extension: .blf,
+.asc, .log (candump), .csv or .trc. Frames are queued without blocking; if the writer
+falls behind and the queue is full, frames are dropped and counted instead of
+stalling the scan.
+
+Only frames passing through python-can are seen: frames removed by the bus's receive
+filters, kernel ISO-TP sockets and cyclic messages sent by the kernel (send_periodic)
+are not in the trace.
+"""
+
+# Frames queued for the writer before new frames are dropped.
+DEFAULT_QUEUE_SIZE = 100000
+
+
+class CaptureWriter:
+    """
+    Writes CAN frames to a log file from a background thread.
+
+    Args:
+        path (str): Log file; the extension selects the format.
+        queue_size (int): Frames buffered before new ones are dropped.
+
+    Attributes:
+        captured (int): Frames queued for writing.
+        dropped (int): Frames dropped because the queue was full.
+    """
+
+    def __init__(self, path, queue_size=DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.logger = can.Logger(path)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.captured = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="can-capture", daemon=True)
+        self._thread.start()
+
+    def put(self, msg):
+        """Queues a frame for writing without blocking."""
+        try:
+            self.queue.put_nowait(msg)
+            self.captured += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+            self.logger.on_message_received(msg)
+
+    def close(self):
+        """Writes the queued frames and closes the log."""
+        self.queue.put(None)
+        self._thread.join()
+        self.logger.stop()
+        if self.dropped:
+            print(f"Capture {self.path}: {self.dropped} of {self.captured + self.dropped} frame(s) dropped.")
+
+
+def attach_capture(bus, path, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Logs every frame sent or received through a python-can bus to a file.
+
+    The bus's send(), recv() and shutdown() are wrapped on the instance, so all code using
+    the bus (ISO-TP stacks, notifiers, discovery) is captured. Sent frames are logged with
+    is_rx False and the time they were sent. Shutting the bus down closes the log.
+
+    Args:
+        bus: The CAN bus instance.
+        path (str): Log file; the extension selects the format (.blf, .asc, .log, ...).
+        queue_size (int): Frames buffered before new ones are dropped.
+
+    Returns:
+        CaptureWriter: The writer, also set as bus.capture.
+    """
+    writer = CaptureWriter(path, queue_size)
+    send, recv, shutdown = bus.send, bus.recv, bus.shutdown
+
+    def capturing_send(msg, timeout=None):
+        send(msg, timeout)
+        writer.put(can.Message(timestamp=time.time(), arbitration_id=msg.arbitration_id,
+                               is_extended_id=msg.is_extended_id, is_remote_frame=msg.is_remote_frame,
+                               is_fd=msg.is_fd, bitrate_switch=msg.bitrate_switch, dlc=msg.dlc,
+                               data=msg.data, channel=msg.channel, is_rx=False))
+
+    def capturing_recv(timeout=None):
+        msg = recv(timeout)
+        if msg is not None:
+            writer.put(msg)
+        return msg
+
+    def capturing_shutdown():
+        try:
+            shutdown()
+        finally:
+            if bus.capture is writer:
+                bus.capture = None
+                writer.close()
+
+    bus.send, bus.recv, bus.shutdown = capturing_send, capturing_recv, capturing_shutdown
+    bus.capture = writer
+    return writer
+
+
+def is_capturing(bus):
+    """True if the bus has a capture attached."""
+    return getattr(bus, "capture", None) is not None
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+"""
+Resumable checkpoints for long DID/RID/memory sweeps.
+
+A checkpoint is an append-only file of JSON lines. The first line describes the
+scan; later lines record the cursor (the next identifier or address to probe),
+DID/RID hits, and completed ranges. Memory scans record no hits: their data is in
+the output, dump image or scan database, and would double the checkpoint's size.
+Every write is flushed and fsync'd, so a crash loses at most the cursor updates
+since the last sync, and resuming never skips an identifier that was not probed.
+"""
+
+
+class ScanCheckpoint:
+    """
+    Records and restores the progress of one scan.
+
+    Args:
+        path (str): Checkpoint file.
+        kind (str): What is scanned, e.g. "did", "rid" or "mem".
+        start (int): First identifier or address of the scan.
+        end (int): Last identifier or address of the scan (inclusive).
+        resume (bool): Continue from an existing checkpoint file instead of starting over.
+        interval (float): Minimum time in seconds between two cursor writes.
+
+    Attributes:
+        cursor (int): Next identifier or address to probe.
+        hits (dict): DID/RID hits recorded so far, mapping identifier to data bytes.
+        completed (list): (start, end) ranges that were scanned to the end.
+    """
+
+    def __init__(self, path, kind, start, end, resume=False, interval=2.0):
+        self.path = path
+        self.header = {"scan": kind, "start": start, "end": end}
+        self.interval = interval
+        self.cursor = start
+        self.hits = {}
+        self.completed = []
+        self._last_sync = time.monotonic()
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a")
+        else:
+            self._file = open(path, "w")
+            self._append(self.header)
+
+    def _load(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break  # torn write at the end of the file
+        if not records or records[0] != self.header:
+            raise ValueError(f"Checkpoint {self.path} belongs to a different scan: {records[0] if records else 'empty'}")
+        for record in records[1:]:
+            if "cursor" in record:
+                self.cursor = max(self.cursor, record["cursor"])
+            elif "hit" in record:
+                self.hits[record["hit"]] = bytes.fromhex(record["data"])
+            elif "done" in record:
+                self.completed.append(tuple(record["done"]))
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    @property
+    def finished(self):
+        """True if the whole scan range has been completed."""
+        if self.cursor > self.header["end"]:
+            return True
+        return any(start <= self.header["start"] and end >= self.header["end"] for start, end in self.completed)
+
+    def advance(self, cursor):
+        """Moves the cursor; it is written to disk at most once per interval."""
+        self.cursor = cursor
+        if time.monotonic() - self._last_sync >= self.interval:
+            self._append({"cursor": cursor})
+
+    def hit(self, identifier, data):
+        """Records a hit immediately."""
+        self.hits[identifier] = bytes(data)
+        self._append({"hit": identifier, "data": bytes(data).hex()})
+
+    def complete(self, start, end):
+        """Records that the range from start to end (inclusive) has been scanned."""
+        self.completed.append((start, end))
+        self.cursor = max(self.cursor, end + 1)
+        self._append({"done": [start, end]})
+
+    def close(self):
+        """Writes the final cursor and closes the file."""
+        if not self._file.closed:
+            self._append({"cursor": self.cursor})
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,10 +1,589 @@
+import contextlib
+import sys
+from typing import Annotated, Optional
+
 import typer
+
+from . import did_scan, mem_scan, rid_scan, service_scan
+from .checkpoint import ScanCheckpoint
+from .dump_image import DumpImage
+from .plans import hit_limit, load_plan
+from .reporting import ProgressReporter
+from .sinks import open_sink
+from .store import ScanStore, print_run_report, scan_context
+from .tester_present import CyclicTesterPresent, discover_ecus, pauses_during_scans
+from .timing import parse_timeout
+from .transport import close_stack
 from .user_interface import zds
+from .utils import open_stack, parse_hex_range, set_can_channel
 
 
 app = typer.Typer()
-app.command()(zds)
+
+
+def hex_int(value):
+    """Parses a hex command line value such as 7E0 or 0x7E0."""
+    return int(value, 16)
+
+
+# Options shared by the headless scan commands.
+Iface = Annotated[str, typer.Option(help="CAN interface, e.g. can0 or vcan0.")]
+TesterId = Annotated[int, typer.Option("--tx", parser=hex_int, metavar="HEX", help="Tester (source) ID in hex.")]
+EcuId = Annotated[int, typer.Option("--rx", parser=hex_int, metavar="HEX", help="ECU (destination) ID in hex.")]
+Timeout = Annotated[str, typer.Option(help="Response timeout in seconds, or 'auto' to follow measured latency.")]
+Output = Annotated[str, typer.Option("--output", "-o", help="File to stream hits to, or - for stdout.")]
+Format = Annotated[Optional[str], typer.Option("--format", help="jsonl or csv (default: from file extension).")]
+Checkpoint = Annotated[Optional[str], typer.Option(
+    help="Checkpoint file (default: zoods-<scan>-<tx>-<rx>.ckpt in the current directory).")]
+Resume = Annotated[bool, typer.Option("--resume", help="Continue from the checkpoint of an interrupted scan.")]
+KeepAlive = Annotated[float, typer.Option(
+    help="Seconds between cyclic Tester Present messages sent by the kernel/driver (0 disables).")]
+PauseKeepAlive = Annotated[Optional[bool], typer.Option(
+    "--pause-keep-alive/--no-pause-keep-alive",
+    help="Pause the keep-alive while the scan runs, so it cannot interrupt multi-frame requests "
+         "(default: pause unless the tester ID is functional). A paused --keep-alive sends nothing "
+         "during a headless scan, so it needs --no-pause-keep-alive on a physical tester ID.")]
+Backend = Annotated[str, typer.Option(
+    help="ISO-TP implementation: kernel (CAN_ISOTP socket), user (Python stack) or auto.")]
+Log = Annotated[Optional[str], typer.Option(
+    "--log", help="Append one line of detail per request to this file (verbose mode).")]
+Order = Annotated[str, typer.Option(
+    help="priority: high-yield ranges of the identifier dictionaries first; linear: ascending.")]
+Dictionary = Annotated[Optional[list[str]], typer.Option(
+    "--dictionary", help="Extra identifier dictionary (JSON) with ranges, priorities, names and decoders.")]
+MinPriority = Annotated[Optional[int], typer.Option(
+    help="With priority order, only scan dictionary ranges with at least this priority.")]
+MaxHits = Annotated[int, typer.Option(help="Stop after this many hits (0 for no limit).")]
+Capture = Annotated[Optional[str], typer.Option(
+    help="Log every CAN frame to this trace file (.blf, .asc or .log for candump format).")]
+Db = Annotated[Optional[str], typer.Option(
+    help="Scan database to record every probe in; settled results of earlier runs are skipped.")]
+Fd = Annotated[Optional[bool], typer.Option(
+    "--fd/--no-fd", help="Use CAN FD with 64-byte frames (default: when the interface is set up for CAN FD).")]
+
+
+@app.callback(invoke_without_command=True)
+def main(ctx: typer.Context):
+    """
+    An automotive UDS cli tool. Starts the interactive session when no command is given.
+    """
+    if ctx.invoked_subcommand is None:
+        zds()
+
+
+def output_sink(output, fmt):
+    """Opens the result sink of a command, or exits with an error for an unknown format or unwritable file."""
+    try:
+        return open_sink(output, fmt)
+    except (ValueError, OSError) as e:
+        typer.echo(f"Cannot open output {output}: {e}", err=True)
+        raise typer.Exit(code=1)
+
+
+@contextlib.contextmanager
+def headless_scan(iface, tx, rx, output, fmt, kind, start, end, checkpoint_path=None, resume=False,
+                  keep_alive=0.0, backend="auto", fd=None, log=None, capture=None, pause_keep_alive=None):
+    """
+    Opens the ISO-TP stack, result sink, checkpoint and progress reporter for a headless scan.
+
+    Scanner progress goes to stderr so stdout only carries results. With resume, the
+    checkpoint's cursor tells where to continue; its hits are already in the output.
+    A keep-alive that would pause for the scan, and so never send, is rejected.
+
+    Yields:
+        tuple: (stack, sink, checkpoint, reporter)
+    """
+    if keep_alive > 0 and pauses_during_scans(tx, pause_keep_alive):
+        typer.echo(f"--keep-alive on tester ID {tx:X} pauses for the whole scan and would send nothing; add "
+                   "--no-pause-keep-alive to keep it running (it may interrupt multi-frame requests).", err=True)
+        raise typer.Exit(code=1)
+    sink = output_sink(output, fmt)
+    checkpoint_path = checkpoint_path or f"zoods-{kind}-{tx:X}-{rx:X}.ckpt"
+    try:
+        checkpoint = ScanCheckpoint(checkpoint_path, kind, start, end, resume=resume)
+    except ValueError as e:
+        sink.close()
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    if checkpoint.finished:
+        checkpoint.close()
+        sink.close()
+        typer.echo(f"Checkpoint {checkpoint_path} shows this scan already completed.", err=True)
+        raise typer.Exit()
+    if resume:
+        earlier = f" with {len(checkpoint.hits)} earlier hit(s)" if checkpoint.hits else ""
+        typer.echo(f"Resuming at 0x{checkpoint.cursor:X}{earlier}.", err=True)
+    opened = open_stack(iface, tx, rx, backend=backend, fd=fd, capture=capture)
+    if not opened:
+        checkpoint.close()
+        sink.close()
+        raise typer.Exit(code=1)
+    bus, stack = opened
+    reporter = ProgressReporter(log)
+    tester_present = None
+    if keep_alive > 0:
+        tester_present = CyclicTesterPresent(bus, tx, keep_alive, pause_during_scans=pause_keep_alive)
+    scanning = tester_present.scanning if tester_present else contextlib.nullcontext
+    try:
+        if tester_present:
+            tester_present.start()
+        with contextlib.redirect_stdout(sys.stderr), scanning():
+            yield stack, sink, checkpoint, reporter
+    except KeyboardInterrupt:
+        typer.echo(f"Scan interrupted at 0x{checkpoint.cursor:X}; rerun with --resume to continue.", err=True)
+    finally:
+        if tester_present:
+            tester_present.stop()
+        checkpoint.close()
+        sink.close()
+        reporter.close()
+        close_stack(stack)
+        bus.shutdown()
+    typer.echo(f"{sink.count} hit(s) written.", err=True)
+
+
+def fill_image(image, probes, start, end):
+    """Writes stored memory reads (see ScanStore.settled_probes) between start and end into a dump image."""
+    for address, length, response in probes:
+        low, high = max(address, start), min(address + length - 1, end)
+        if response.positive:
+            image.write(low, response.payload[low - address:high - address + 1])
+        else:
+            image.mark_nrc(low, high - low + 1, response.nrc)
+
+
+@contextlib.contextmanager
+def recorded_scan(db, stack, tx, rx, kind, start, end, timeout, context="", image=None):
+    """
+    Records a headless scan in the scan database, if one is given.
+
+    The ECU is identified by its identification DIDs; identifiers (for memory: address
+    ranges) settled in earlier runs against the same ECU in the same scan context
+    (see store.scan_context()) are skipped. A dump image is first filled with the stored
+    responses of the skipped memory ranges, so skipping them leaves no holes in it.
+
+    Yields:
+        tuple: (on_result, skip) to pass to the scanner.
+    """
+    if not db:
+        yield None, ()
+        return
+    with ScanStore(db) as store:
+        ecu = store.ecu(tx, rx, did_scan.read_identification(stack, timeout))
+        if kind == "mem":
+            skip = store.settled_ranges(ecu, kind, start, end, context)
+            print(f"Skipping {sum(high - low + 1 for low, high in skip)} byte(s) settled in earlier runs.")
+            if image is not None:
+                fill_image(image, store.settled_probes(ecu, kind, start, end, context), start, end)
+        else:
+            skip = store.settled(ecu, kind, start, end, context)
+            print(f"Skipping {len(skip)} ID(s) settled in earlier runs.")
+        run = store.begin_run(ecu, kind, context)
+        try:
+            yield store.on_result(run), skip
+        finally:
+            store.finish_run(run)
+            print_run_report(store, ecu, run, kind, context)
+
+
+def scan_plan(kind, order, start, end, dictionaries=None, min_priority=None):
+    """
+    Resolves the identifiers and checkpoint of a DID or RID scan.
+
+    Returns:
+        tuple: (plan, ids, checkpoint_kind, checkpoint_start, checkpoint_end). ids is None for a
+               linear scan; for a priority scan the checkpoint counts positions in ids.
+    """
+    if order not in ("priority", "linear"):
+        typer.echo(f"Unknown order '{order}', expected priority or linear.", err=True)
+        raise typer.Exit(code=1)
+    try:
+        plan = load_plan(kind, dictionaries or ())
+    except (ValueError, OSError) as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    if order == "linear":
+        return plan, None, kind, start, end
+    ids = plan.ordered_ids(start, end, min_priority)
+    if not ids:
+        typer.echo("No dictionary range reaches the minimum priority within the scan range.", err=True)
+        raise typer.Exit(code=1)
+    return plan, ids, f"{kind}-plan", 0, len(ids) - 1
+
+
+@app.command("scan-did")
+def scan_did(iface: Iface, tx: TesterId, rx: EcuId,
+             id_range: Annotated[str, typer.Option("--range", help="DID range in hex, e.g. F100-F1FF.")] = "0000-FFFF",
+             batch_size: Annotated[int, typer.Option(help="DIDs per ReadDataByIdentifier request.")] = 1,
+             bisect_out_of_range: Annotated[bool, typer.Option(
+                 "--bisect-out-of-range",
+                 help="Split batches answered with NRC 0x31 as well. By default such a batch counts as holding "
+                      "no supported DID, as ISO 14229 specifies; use this for ECUs that send 0x31 when any "
+                      "DID of the batch is unknown.")] = False,
+             timeout: Timeout = "0.3", output: Output = "-", fmt: Format = None,
+             checkpoint: Checkpoint = None, resume: Resume = False, keep_alive: KeepAlive = 0.0,
+             pause_keep_alive: PauseKeepAlive = None, backend: Backend = "auto", fd: Fd = None,
+             db: Db = None, log: Log = None, capture: Capture = None, order: Order = "priority",
+             dictionary: Dictionary = None, min_priority: MinPriority = None, max_hits: MaxHits = 0):
+    """
+    Scans DIDs with ReadDataByIdentifier (0x22) without prompting.
+    """
+    start, end = parse_hex_range(id_range)
+    timeout = parse_timeout(timeout)
+    plan, ids, ckpt_kind, ckpt_start, ckpt_end = scan_plan("did", order, start, end, dictionary, min_priority)
+    with headless_scan(iface, tx, rx, output, fmt, ckpt_kind, ckpt_start, ckpt_end,
+                       checkpoint, resume, keep_alive, backend, fd, log, capture,
+                       pause_keep_alive) as (stack, sink, ckpt, reporter), \
+            recorded_scan(db, stack, tx, rx, "did", start, end, timeout) as (on_result, skip):
+        did_scan.scan_dids(stack, ckpt.cursor if ids is None else start, end, timeout, batch_size=batch_size,
+                           on_hit=hit_limit(sink.on_hit("did", rx, plan.describe), max_hits), checkpoint=ckpt,
+                           on_result=on_result, skip=skip, reporter=reporter, ids=ids,
+                           trust_out_of_range=not bisect_out_of_range)
+
+
+@app.command("scan-rid")
+def scan_rid(iface: Iface, tx: TesterId, rx: EcuId,
+             id_range: Annotated[str, typer.Option("--range", help="RID range in hex, e.g. 0200-02FF.")] = "0000-FFFF",
+             timeout: Timeout = "0.3", output: Output = "-", fmt: Format = None,
+             checkpoint: Checkpoint = None, resume: Resume = False, keep_alive: KeepAlive = 0.0,
+             pause_keep_alive: PauseKeepAlive = None, backend: Backend = "auto", fd: Fd = None,
+             db: Db = None, log: Log = None, capture: Capture = None, order: Order = "priority",
+             dictionary: Dictionary = None, min_priority: MinPriority = None, max_hits: MaxHits = 0,
+             sub_function: Annotated[str, typer.Option(
+                 help="results or stop probe RIDs without running them; start runs every supported routine.")] = "results",
+             session: Annotated[Optional[int], typer.Option(
+                 parser=hex_int, metavar="HEX", help="Diagnostic session to scan in, re-entered after ECU resets.")] = None,
+             allow_unsafe: Annotated[bool, typer.Option(
+                 "--allow-unsafe", help="With --sub-function start, also start the dictionaries' unsafe routines "
+                                        "(erase memory, safety systems).")] = False):
+    """
+    Scans RIDs with RoutineControl (0x31) without prompting.
+    """
+    if sub_function not in rid_scan.SUB_FUNCTIONS:
+        typer.echo(f"Unknown sub-function '{sub_function}', expected one of: {', '.join(rid_scan.SUB_FUNCTIONS)}", err=True)
+        raise typer.Exit(code=1)
+    start, end = parse_hex_range(id_range)
+    timeout = parse_timeout(timeout)
+    plan, ids, ckpt_kind, ckpt_start, ckpt_end = scan_plan("rid", order, start, end, dictionary, min_priority)
+    with headless_scan(iface, tx, rx, output, fmt, ckpt_kind, ckpt_start, ckpt_end,
+                       checkpoint, resume, keep_alive, backend, fd, log, capture,
+                       pause_keep_alive) as (stack, sink, ckpt, reporter), \
+            recorded_scan(db, stack, tx, rx, "rid", start, end, timeout,
+                          scan_context(session, rid_scan.SUB_FUNCTIONS[sub_function])) as (on_result, skip):
+        if sub_function == "start" and not allow_unsafe:
+            skip = set(skip) | plan.unsafe_ids(start, end)
+        rid_scan.scan_rids(stack, ckpt.cursor if ids is None else start, end, timeout,
+                           on_hit=hit_limit(sink.on_hit("rid", rx, plan.describe), max_hits), checkpoint=ckpt,
+                           on_result=on_result, skip=skip, reporter=reporter, ids=ids,
+                           sub_function=rid_scan.SUB_FUNCTIONS[sub_function], session=session)
+
+
+@app.command("scan-mem")
+def scan_mem(iface: Iface, tx: TesterId, rx: EcuId,
+             address_range: Annotated[str, typer.Option("--range", help="Address range in hex, e.g. 10000000-100000FF.")],
+             size: Annotated[Optional[int], typer.Option(
+                 parser=hex_int, metavar="HEX",
+                 help="Bytes per request in hex (default: the largest read the ECU allows at the range start, else FF).")] = None,
+             addr_len: Annotated[Optional[int], typer.Option(
+                 help="Bytes in MemoryAddress (default: probed, else 4).")] = None,
+             size_len: Annotated[Optional[int], typer.Option(
+                 help="Bytes in MemorySize (default: probed, else 1).")] = None,
+             timeout: Timeout = "0.3", output: Output = "-", fmt: Format = None,
+             checkpoint: Checkpoint = None, resume: Resume = False, keep_alive: KeepAlive = 0.0,
+             pause_keep_alive: PauseKeepAlive = None, backend: Backend = "auto", fd: Fd = None,
+             db: Db = None, log: Log = None, capture: Capture = None,
+             image: Annotated[Optional[str], typer.Option(
+                 help="Sparse dump image to write data into; re-runs read only its missing ranges.")] = None,
+             upload: Annotated[bool, typer.Option(
+                 "--upload", help="Dump with RequestUpload (0x35/0x36) first, reading what it does not deliver "
+                                  "with 0x23. Needs --image.")] = False):
+    """
+    Scans memory with ReadMemoryByAddress (0x23) without prompting.
+
+    Unless --size, --addr-len and --size-len are all given, the addressAndLengthFormatIdentifier
+    and the largest read size are probed at the start of the range first.
+    """
+    if upload and not image:
+        typer.echo("--upload writes into a dump image; give one with --image.", err=True)
+        raise typer.Exit(code=1)
+    start, end = parse_hex_range(address_range)
+    timeout = parse_timeout(timeout)
+    try:
+        dump = DumpImage(image, start, end - start + 1) if image else None
+    except (ValueError, OSError) as e:
+        typer.echo(f"Cannot open image: {e}", err=True)
+        raise typer.Exit(code=1)
+    try:
+        with headless_scan(iface, tx, rx, output, fmt, "mem", start, end,
+                           checkpoint, resume, keep_alive, backend, fd, log, capture,
+                           pause_keep_alive) as (stack, sink, ckpt, reporter), \
+                recorded_scan(db, stack, tx, rx, "mem", start, end, timeout, image=dump) as (on_result, skip):
+            if size is None or addr_len is None or size_len is None:
+                probed = mem_scan.probe_memory_access(stack, start, timeout, min(mem_scan.MAX_READ_SIZE, end - start + 1),
+                                                      addr_len, size_len)
+                if probed:
+                    addr_len, size_len, max_size = probed
+                    size = size or max_size
+            addr_len, size_len, size = addr_len or 4, size_len or 1, size or 0xFF
+            if upload:
+                mem_scan.dump_memory(stack, start, end, dump, size, addr_len, size_len, timeout,
+                                     on_hit=sink.on_hit("mem", rx), checkpoint=ckpt, on_result=on_result,
+                                     skip=skip, reporter=reporter)
+            else:
+                mem_scan.scan_memory_by_address(stack, ckpt.cursor, end, size, addr_len, size_len, timeout,
+                                                on_hit=sink.on_hit("mem", rx), checkpoint=ckpt, image=dump,
+                                                on_result=on_result, skip=skip, reporter=reporter)
+    finally:
+        if dump:
+            dump.close()
+
+
+@app.command("map-mem")
+def map_mem(iface: Iface, tx: TesterId, rx: EcuId,
+            address_range: Annotated[str, typer.Option("--range", help="Address range in hex, e.g. 00000000-FFFFFFFF.")],
+            stride: Annotated[int, typer.Option(parser=hex_int, metavar="HEX", help="Bytes between coarse probes in hex.")] = 0x100,
+            addr_len: Annotated[int, typer.Option(help="Bytes in MemoryAddress.")] = 4,
+            size_len: Annotated[int, typer.Option(help="Bytes in MemorySize.")] = 1,
+            timeout: Timeout = "0.3", backend: Backend = "auto", fd: Fd = None, capture: Capture = None):
+    """
+    Maps readable, protected and unmapped memory regions with ReadMemoryByAddress (0x23).
+    """
+    start, end = parse_hex_range(address_range)
+    timeout = parse_timeout(timeout)
+    opened = open_stack(iface, tx, rx, backend=backend, fd=fd, capture=capture)
+    if not opened:
+        raise typer.Exit(code=1)
+    bus, stack = opened
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            regions = mem_scan.map_memory_regions(stack, start, end, stride, 1, addr_len, size_len, timeout)
+    finally:
+        close_stack(stack)
+        bus.shutdown()
+    mem_scan.print_memory_map(regions, addr_len)
+
+
+@app.command("scan-services")
+def scan_services(iface: Iface, tx: TesterId, rx: EcuId,
+                  sessions: Annotated[Optional[str], typer.Option(
+                      help="Sessions to scan in, in hex, e.g. 01,03 (default: every session reachable with 0x10).")] = None,
+                  sub_functions: Annotated[bool, typer.Option(
+                      "--sub-functions/--no-sub-functions", help="Sweep sub-functions of supported services.")] = True,
+                  allow_unsafe: Annotated[bool, typer.Option(
+                      "--allow-unsafe", help="Also enter the programming session and sweep ECUReset, "
+                                             "CommunicationControl, ControlDTCSetting and LinkControl.")] = False,
+                  all_sids: Annotated[bool, typer.Option(
+                      "--all-sids", help="Also send the response SIDs 0x40-0x7F and 0xC0-0xFF.")] = False,
+                  timeout: Timeout = "0.3", output: Output = "-", fmt: Format = None,
+                  backend: Backend = "auto", fd: Fd = None, log: Log = None, capture: Capture = None):
+    """
+    Maps supported services and sub-functions per diagnostic session.
+    """
+    try:
+        session_list = [int(session, 16) for session in sessions.split(",")] if sessions else None
+    except ValueError:
+        typer.echo(f"Invalid sessions '{sessions}', expected hex values such as 01,03.", err=True)
+        raise typer.Exit(code=1)
+    timeout = parse_timeout(timeout)
+    sink = output_sink(output, fmt)
+    opened = open_stack(iface, tx, rx, backend=backend, fd=fd, capture=capture)
+    if not opened:
+        sink.close()
+        raise typer.Exit(code=1)
+    bus, stack = opened
+    reporter = ProgressReporter(log)
+    service_map = {}
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            service_map = service_scan.scan_services(stack, session_list, timeout, sub_functions, allow_unsafe,
+                                                     on_hit=service_scan.sink_on_hit(sink, rx), reporter=reporter,
+                                                     all_sids=all_sids)
+    except KeyboardInterrupt:
+        typer.echo("Service scan interrupted.", err=True)
+    finally:
+        sink.close()
+        reporter.close()
+        close_stack(stack)
+        bus.shutdown()
+    with contextlib.redirect_stdout(sys.stderr):
+        service_scan.print_service_map(service_map)
+    typer.echo(f"{sink.count} hit(s) written.", err=True)
+
+
+@app.command("scan-template")
+def scan_template(iface: Iface, tx: TesterId, rx: EcuId,
+                  template: Annotated[str, typer.Argument(help="Request in hex with ?? for the swept bytes, e.g. '19 ??'.")],
+                  value_range: Annotated[Optional[str], typer.Option(
+                      "--range", help="Values in hex, e.g. 00-7F (default: every value of the ?? bytes).")] = None,
+                  timeout: Timeout = "0.3", output: Output = "-", fmt: Format = None,
+                  backend: Backend = "auto", fd: Fd = None, log: Log = None, capture: Capture = None,
+                  max_hits: MaxHits = 0):
+    """
+    Sweeps a value through a request template and reports the supported values.
+    """
+    try:
+        parsed = service_scan.parse_template(template)
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    start, end = parse_hex_range(value_range) if value_range else (0, (1 << (8 * parsed[1])) - 1)
+    timeout = parse_timeout(timeout)
+    sink = output_sink(output, fmt)
+    opened = open_stack(iface, tx, rx, backend=backend, fd=fd, capture=capture)
+    if not opened:
+        sink.close()
+        raise typer.Exit(code=1)
+    bus, stack = opened
+    reporter = ProgressReporter(log)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            service_scan.scan_template(stack, parsed, range(start, end + 1), timeout,
+                                       on_hit=hit_limit(sink.on_hit("template", rx), max_hits), reporter=reporter)
+    except KeyboardInterrupt:
+        typer.echo("Template scan interrupted.", err=True)
+    finally:
+        sink.close()
+        reporter.close()
+        close_stack(stack)
+        bus.shutdown()
+    typer.echo(f"{sink.count} hit(s) written.", err=True)
+
+
+@app.command()
+def discover(iface: Iface,
+             sweep_11bit: Annotated[bool, typer.Option("--11bit/--no-11bit", help="Sweep 0x000-0x7FF.")] = True,
+             sweep_29bit: Annotated[bool, typer.Option("--29bit/--no-29bit", help="Sweep 0x18DA00F1-0x18DAFFF1.")] = True,
+             burst_size: Annotated[int, typer.Option(help="Tester Present messages per burst.")] = 16,
+             burst_gap: Annotated[float, typer.Option(help="Seconds between bursts.")] = 0.02,
+             capture: Capture = None):
+    """
+    Discovers tester/ECU ID pairs by sweeping Tester Present over all physical request IDs.
+    """
+    bus = set_can_channel(iface, capture=capture)
+    if not bus:
+        raise typer.Exit(code=1)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            pairs = discover_ecus(bus, sweep_11bit, sweep_29bit, burst_size, burst_gap)
+    finally:
+        bus.shutdown()
+    if not pairs:
+        typer.echo("No ECU responded to the sweep.", err=True)
+    for tester_id, ecu_ids in pairs.items():
+        for ecu_id in ecu_ids:
+            typer.echo(f"{tester_id:X} {ecu_id:X}")
+
+
+@app.command()
+def tune(iface: Iface, tx: TesterId, rx: EcuId,
+         request: Annotated[str, typer.Option(help="Request with a long response in hex, e.g. 231400008000FF.")],
+         trials: Annotated[int, typer.Option(help="Requests per STmin/block size setting.")] = 5,
+         timeout: Annotated[float, typer.Option(help="Response timeout in seconds.")] = 1.0,
+         backend: Backend = "auto", fd: Fd = None):
+    """
+    Calibrates ISO-TP flow control (STmin/block size) for an ECU and stores the fastest reliable setting.
+    """
+    from .tuning import calibrate_isotp, describe_stmin
+
+    try:
+        request = bytes.fromhex(request)
+    except ValueError:
+        typer.echo("Request must be hex.", err=True)
+        raise typer.Exit(code=1)
+    bus = set_can_channel(iface, fd=fd)
+    if not bus:
+        raise typer.Exit(code=1)
+    try:
+        best, _ = calibrate_isotp(bus, tx, rx, request, trials, timeout, backend)
+    except (ValueError, OSError, NotImplementedError) as e:
+        typer.echo(f"Calibration failed: {e}", err=True)
+        raise typer.Exit(code=1)
+    finally:
+        bus.shutdown()
+    if not best:
+        typer.echo("No setting completed every transfer; nothing stored.", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Stored STmin {describe_stmin(best[0])}, block size {best[1]} ({best[2]:.0f} B/s) for {tx:X}/{rx:X}.")
+
+
+@app.command()
+def replay(trace: Annotated[str, typer.Argument(help="Trace file (.blf, .asc, .log, ...), e.g. from --capture.")],
+           tx: TesterId, rx: EcuId, output: Output = "-", fmt: Format = None,
+           verbose: Annotated[bool, typer.Option("--verbose", "-v", help="Print every request and response.")] = False):
+    """
+    Re-derives scan results from a captured trace without touching the bus.
+    """
+    from .replay import replay as replay_trace
+
+    sink = output_sink(output, fmt)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            counts = replay_trace(trace, tx, rx, lambda kind, ident, data: sink.hit(kind, ident, data, rx), verbose)
+    except (ValueError, OSError) as e:
+        typer.echo(f"Cannot replay {trace}: {e}", err=True)
+        raise typer.Exit(code=1)
+    finally:
+        sink.close()
+    typer.echo(f"{counts['requests']} request(s): {counts['hits']} hit(s), {counts['negative']} negative, "
+               f"{counts['no response']} without response.", err=True)
+
+
+@app.command()
+def bench(scans: Annotated[Optional[list[str]], typer.Argument(help="Benchmarks to run: did, rid, mem, upload, key (default: all).")] = None,
+          iface: Annotated[str, typer.Option(help="Bus channel: a virtual bus name, or a vcan interface with --socketcan.")] = "zoods-bench",
+          socketcan: Annotated[bool, typer.Option("--socketcan", help="Run on a SocketCAN (vcan) interface.")] = False,
+          latency: Annotated[float, typer.Option(help="Simulated ECU response latency in seconds.")] = 0.0,
+          timeout: Annotated[float, typer.Option(help="Response timeout in seconds.")] = 0.3,
+          batch_size: Annotated[int, typer.Option(help="DIDs per ReadDataByIdentifier request.")] = 1,
+          stmin: Annotated[int, typer.Option(help="STmin of the tester's flow control frames.")] = 0,
+          blocksize: Annotated[int, typer.Option(help="Block size of the tester's flow control frames.")] = 0,
+          backend: Backend = "user", fd: Annotated[bool, typer.Option("--fd", help="Use CAN FD frames.")] = False,
+          save: Annotated[Optional[str], typer.Option(help="Write the results as JSON to this file.")] = None,
+          baseline: Annotated[Optional[str], typer.Option(help="Compare with results saved by an earlier run.")] = None):
+    """
+    Measures scan throughput against a simulated ECU.
+    """
+    from .bench import BENCHMARKS, load_results, print_results, run_benchmarks, save_results
+
+    unknown = [name for name in scans or () if name not in BENCHMARKS]
+    if unknown:
+        typer.echo(f"Unknown benchmark(s): {', '.join(unknown)}", err=True)
+        raise typer.Exit(code=1)
+    try:
+        before = load_results(baseline) if baseline else None
+        results = run_benchmarks(scans or BENCHMARKS, "socketcan" if socketcan else "virtual", iface, latency,
+                                 timeout, batch_size, stmin, blocksize, backend, fd)
+    except (ValueError, OSError, NotImplementedError) as e:
+        typer.echo(f"Benchmark failed: {e}", err=True)
+        raise typer.Exit(code=1)
+    print_results(results, before)
+    if save:
+        save_results(results, save)
+
+
+@app.command("solve-key")
+def solve_key(pairs: Annotated[list[str], typer.Argument(help="Captured SEED:KEY pairs in hex.")],
+              seed: Annotated[Optional[str], typer.Option(help="New seed in hex to predict keys for.")] = None):
+    """
+    Infers the Security Access seed/key algorithm offline from captured pairs.
+    """
+    from .key_solver import solve_seed_key, candidate_keys, describe_transform
+
+    try:
+        parsed = [tuple(bytes.fromhex(part) for part in pair.split(':')) for pair in pairs]
+        transforms = solve_seed_key(parsed)
+    except ValueError as e:
+        typer.echo(f"Cannot solve: {e}", err=True)
+        raise typer.Exit(code=1)
+    width = len(parsed[0][0])
+    typer.echo(f"{len(transforms)} transform(s) fit all {len(parsed)} pair(s):")
+    for steps in transforms:
+        typer.echo(f"  {describe_transform(steps, width)}")
+    if seed:
+        typer.echo(f"Candidate keys for seed {seed}:")
+        for key, steps in candidate_keys(transforms, bytes.fromhex(seed)):
+            typer.echo(f"  {key.hex()}  ({describe_transform(steps, width)})")
 
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -1,4 +1,12 @@
-from .utils import wait_for_responses, process_ecu_response
+from .plans import load_plan
+from .reporting import ProgressReporter, ScanReporter
+from .read_response import UDSResponse
+from .utils import send_and_collect
+
+# NRCs that reject a multi-DID request as a whole, hiding which DIDs in it are supported.
+BATCH_BISECT_NRCS = (0x13, 0x14, 0x22, 0x33)
+# Identification DIDs (ISO 14229-1 Annex C): spare part, software and hardware numbers, serial, VIN.
+IDENTIFICATION_DIDS = (0xF187, 0xF188, 0xF189, 0xF18A, 0xF18C, 0xF190, 0xF191, 0xF192, 0xF193, 0xF194, 0xF195)
 
 
 def read_did(did, stack, timeout = 0.3):
@@ -14,42 +22,235 @@ def read_did(did, stack, timeout = 0.3):
         List of response frames.
     """
     request = bytes([0x22, (did >> 8) & 0xFF, did & 0xFF])
-    print(f"Sending ReadDataByIdentifier (0x22) for DID: 0x{did:04X}")
-    stack.send(request)
+    return send_and_collect(stack, request, timeout)
+
+
+def read_dids(dids, stack, timeout=0.3):
+    """
+    Sends one ReadDataByIdentifier (0x22) request carrying several DIDs and collects responses.
+
+    Args:
+        dids (list): 2-byte identifiers, in the order they are placed in the request.
+        stack: The iso-tp communication interface.
+        timeout (float): Time in seconds to wait for responses.
 
-    responses = wait_for_responses(stack, timeout)
-    for response in responses:
-        print(f"Received response for DID 0x{did:04X}: {response.hex()}")
-    return responses
+    Returns:
+        List of response frames.
+    """
+    request = bytes([0x22]) + b"".join(did.to_bytes(2, byteorder='big') for did in dids)
+    return send_and_collect(stack, request, timeout)
 
 
-def try_all_dids(stack, timeout=0.3):
+def split_did_records(payload, dids):
+    """
+    Splits the concatenated [DID][data] records of a positive ReadDataByIdentifier response.
+
+    The ECU answers in request order and leaves out DIDs it does not support. Record lengths are
+    not encoded in the response, so each record is taken to end where the identifier of a later
+    requested DID starts. Data that happens to contain such an identifier is split wrongly, so
+    scan_dids() confirms responses with several records by reading each hit on its own.
+
+    Args:
+        payload (bytes): Response bytes following the 0x62 service byte.
+        dids (list): The DIDs in the order they were requested.
+
+    Returns:
+        dict: Maps each DID found in the response to its data bytes.
+    """
+    records = {}
+    position = 0
+    remaining = list(dids)
+    while position + 2 <= len(payload):
+        did = int.from_bytes(payload[position:position + 2], byteorder='big')
+        if did not in remaining:
+            break  # malformed or unexpected record; stop parsing
+        remaining = remaining[remaining.index(did) + 1:]
+        end = len(payload)
+        for later in remaining:
+            found = payload.find(later.to_bytes(2, byteorder='big'), position + 2, end)
+            if found != -1:
+                end = found
+        records[did] = bytes(payload[position + 2:end])
+        position = end
+    return records
+
+
+def read_identification(stack, timeout=0.3):
+    """
+    Reads the ECU's identification DIDs (IDENTIFICATION_DIDS) one by one.
+
+    Returns:
+        dict: Maps each identification DID the ECU supports to its data bytes.
+    """
+    identity = {}
+    for did in IDENTIFICATION_DIDS:
+        responses = read_did(did, stack, timeout)
+        if responses and responses[0].identifier == did:
+            identity[did] = bytes(responses[0].payload)
+    return identity
+
+
+def scan_dids(stack, start=0x0000, end=0xFFFF, timeout=0.3, batch_size=1, on_hit=None,
+              trust_out_of_range=True, checkpoint=None, on_result=None, skip=(), reporter=None, ids=None,
+              stop=None):
+    """
+    Scans DIDs from start to end with ReadDataByIdentifier, packing up to batch_size DIDs per request.
+
+    A batch rejected as a whole (see BATCH_BISECT_NRCS) is split in half and each half is retried,
+    down to single DIDs. An NRC 0x13 on a batch also halves the batch size used for the rest of the
+    scan, so it settles at the ECU's maximum request length. NRC 0x31 on a batch means none of its
+    DIDs is supported, as ISO 14229 specifies, and is not bisected by default so that empty batches
+    cost one request; set trust_out_of_range to False for ECUs that send it when any DID is unknown,
+    whose hits would otherwise be missed.
+    A positive response with several records is confirmed with single-DID reads before its hits are
+    reported, since its record boundaries are guessed (see split_did_records).
+
+    Args:
+        stack: The iso-tp communication interface.
+        start (int): First DID to scan.
+        end (int): Last DID to scan (inclusive).
+        timeout (float): Time in seconds to wait for responses.
+        batch_size (int): Maximum number of DIDs per request; 1 sends a request per DID.
+        on_hit (callable): Called as on_hit(did, data) for each supported DID. Returning False stops the scan.
+        trust_out_of_range (bool): Treat NRC 0x31 on a batch as "no DID supported" instead of bisecting.
+        checkpoint (ScanCheckpoint): Records the scan's progress and hits, if given.
+        on_result (callable): Called as on_result(did, response) for every probed DID with the
+                              response that decided it, or None if the ECU did not answer. A DID
+                              left out of a positive multi-DID response is reported as NRC 0x31.
+        skip (container): DIDs not to probe, e.g. ones with a settled result in a ScanStore.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
+        ids (list): DIDs to scan in this order instead of start to end, e.g. from
+                    plans.ScanPlan.ordered_ids(). The checkpoint cursor is then a position in ids,
+                    and the scan continues from it.
+        stop (threading.Event): Ends the scan before the next request once set, e.g. from another thread.
+
+    Returns:
+        dict: Maps each supported DID to its data bytes.
+    """
+    hits = {}
+    reporter = reporter or ScanReporter()
+    limit = max(1, batch_size)
+    bisect_nrcs = BATCH_BISECT_NRCS if trust_out_of_range else BATCH_BISECT_NRCS + (0x31,)
+
+    def report(records):
+        for did, data in records.items():
+            hits[did] = data
+            if checkpoint:
+                checkpoint.hit(did, data)
+            if on_hit and on_hit(did, data) is False:
+                return False
+        return True
+
+    def settle(dids, response, records=None):
+        if on_result is None:
+            return
+        for did in dids:
+            if records is None:
+                on_result(did, response)
+            elif did in records:
+                on_result(did, UDSResponse(bytes([0x62]) + did.to_bytes(2, byteorder='big') + records[did]))
+            else:
+                on_result(did, UDSResponse(b"\x7F\x22\x31"))  # what a single request would have returned
+
+    def confirm_records(dids, records, payload_length, response):
+        # The split guessed the record boundaries from DID bytes, so each hit is read again on its
+        # own. If the confirmed records do not fill the response, a record was split off wrongly
+        # and may have hidden a supported DID; the rest of the batch is then read singly too.
+        reporter.probe("did", dids[0], response, 0, 0)
+        for did in records:
+            if not scan_batch([did]):
+                return False
+        if sum(2 + len(hits[did]) for did in records if did in hits) == payload_length:
+            settle([did for did in dids if did not in records], response, records)
+            return True
+        for did in dids:
+            if did not in records and not scan_batch([did]):
+                return False
+        return True
+
+    def scan_batch(dids):
+        nonlocal limit
+        if len(dids) == 1:
+            responses = read_did(dids[0], stack, timeout)
+        else:
+            responses = read_dids(dids, stack, timeout)
+        if not responses:
+            reporter.probe("did", dids[0], None, len(dids))
+            settle(dids, None)
+            return True
+        response = responses[0]
+        if response.positive:
+            if len(dids) == 1:
+                # send_and_collect() only returns a response echoing the DID; its payload is the data.
+                records = {dids[0]: bytes(response.payload)}
+            else:
+                records = split_did_records(response[1:], dids)
+                if len(records) > 1:
+                    return confirm_records(dids, records, len(response) - 1, response)
+            reporter.probe("did", dids[0], response, len(dids), len(records))
+            settle(dids, response, records)
+            return report(records)
+        nrc = response.nrc
+        if len(dids) > 1 and nrc in bisect_nrcs:
+            reporter.probe("did", dids[0], response, 0)
+            if nrc == 0x13:
+                limit = max(1, min(limit, len(dids) // 2))
+            middle = len(dids) // 2
+            return scan_batch(dids[:middle]) and scan_batch(dids[middle:])
+        reporter.probe("did", dids[0], response, len(dids))
+        settle(dids, response)
+        return True
+
+    order = range(start, end + 1) if ids is None else ids
+    position = checkpoint.cursor if checkpoint and ids is not None else 0
+    reporter.start("did", sum(1 for did in order[position:] if did not in skip))
+    try:
+        while position < len(order):
+            if stop is not None and stop.is_set():
+                break
+            batch = []
+            while position < len(order) and len(batch) < limit:
+                if order[position] not in skip:
+                    batch.append(order[position])
+                position += 1
+            if batch and not scan_batch(batch):
+                break
+            if checkpoint:
+                checkpoint.advance(position if ids is not None else start + position)
+        else:
+            if checkpoint:
+                checkpoint.complete(*((0, len(order) - 1) if ids is not None else (start, end)))
+    finally:
+        reporter.finish()
+    return hits
+
+
+def try_all_dids(stack, timeout=0.3, batch_size=1, plan=None):
     """
     Iterates over all possible 2-byte DIDs, sending a ReadDataByIdentifier request for each.
-    Processes and prints responses, distinguishing between positive and negative responses.
+    DIDs are probed in the plan's priority order, so identification and other high-yield
+    ranges come first. Processes and prints responses, with the DID's name and decoded value.
+    With batch_size above 1, several DIDs are packed into each request (see scan_dids).
     Allows a KeyboardInterrupt (Ctrl+C) to abort the scan.
     """
+    plan = plan or load_plan("did")
+    reporter = ProgressReporter()
+
+    def prompt_on_hit(did, data):
+        name, value = plan.describe(did, data)
+        with reporter.suspended():
+            print(f"    Positive Response{f' ({name})' if name else ''}")
+            print(f"    {(bytes([0x62, (did >> 8) & 0xFF, did & 0xFF]) + data).hex(' ')}")
+            print(f"    Data: {data.hex()}")
+            print(f"    Decoded data: {value}\n")
+            cont = input("Positive response received for DID 0x{0:04X}. Continue scanning DIDs? (y/n): ".format(did)).strip().lower()
+        if cont.startswith('n'):
+            print("exiting DID scan")
+            return False
+        return True
+
     try:
-        for did in range(0x0000, 0x10000):
-            responses = read_did(did, stack, timeout)
-            if responses:
-                if responses[0][0] != 0x7F:  # Positive response check
-                    for r in responses:
-                        processed = process_ecu_response(r)
-                        print(f"    {processed}")
-                        print(f"    {r.hex(' ')}")
-                        data = r.hex()[4:]
-                        decoded = bytearray.fromhex(data).decode('ascii', errors='replace')
-                        print(f"    Data: {data}")
-                        print(f"    Decoded data: {decoded}\n")
-                        cont = input("Positive response received for DID 0x{0:04X}. Continue scanning DIDs? (y/n): ".format(did)).strip().lower()
-                        if cont.startswith('n'):
-                            print("exiting DID scan")
-                            break
-                        else:
-                            continue
-                else:
-                    error_msg = process_ecu_response(responses[0])
-                    print(f"Negative response for DID 0x{did:04X}: {error_msg}\n")
+        scan_dids(stack, timeout=timeout, batch_size=batch_size, on_hit=prompt_on_hit, reporter=reporter,
+                  ids=plan.ordered_ids())
     except KeyboardInterrupt:
         print("\nKeyboard interrupt received. Aborting DID scan.")
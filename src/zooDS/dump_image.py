@@ -0,0 +1,163 @@
+import json
+import mmap
+import os
+import time
+
+"""
+Sparse, memory-mapped dump images for ReadMemoryByAddress results.
+
+An image is a raw file where the byte at offset (address - base) holds the memory
+byte at address. It is created sparse, so unread areas take no disk space, and it
+can be mmap'd directly by analysis tools. A JSON sidecar index (<image>.idx.json)
+records which ranges hold valid data and which ranges the ECU refused, by NRC:
+
+    {"base": 268435456, "size": 65536,
+     "valid": [[268435456, 268439551]],
+     "nrc": {"31": [[268439552, 268505087]]}}
+
+All ranges are inclusive [start, end] addresses.
+"""
+
+
+def add_range(ranges, start, end):
+    """Returns the sorted, merged list of inclusive ranges with [start, end] added."""
+    merged = []
+    for low, high in sorted(ranges + [[start, end]]):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+def subtract_range(ranges, start, end):
+    """Returns the list of inclusive ranges with [start, end] removed."""
+    result = []
+    for low, high in ranges:
+        if high < start or low > end:
+            result.append([low, high])
+            continue
+        if low < start:
+            result.append([low, start - 1])
+        if high > end:
+            result.append([end + 1, high])
+    return result
+
+
+class DumpImage:
+    """
+    Memory-mapped image of the address range [base, base + size).
+
+    Opening an existing image keeps its data and index, so a re-run only needs to read
+    the ranges returned by missing().
+
+    Args:
+        path (str): Image file.
+        base (int): Address stored at offset 0.
+        size (int): Number of bytes in the image.
+        sync_interval (float): Minimum time in seconds between two index writes.
+    """
+
+    def __init__(self, path, base, size, sync_interval=2.0):
+        self.path = path
+        self.index_path = path + ".idx.json"
+        self.base = base
+        self.size = size
+        self.sync_interval = sync_interval
+        self.valid = []
+        self.nrc = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if index["base"] != base or index["size"] != size:
+                raise ValueError(f"Image {path} covers 0x{index['base']:X} (+0x{index['size']:X} bytes), "
+                                 f"not 0x{base:X} (+0x{size:X} bytes)")
+            self.valid = index["valid"]
+            self.nrc = {int(code, 16): ranges for code, ranges in index["nrc"].items()}
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._file.truncate(size)  # extends sparsely, no data is written
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._last_sync = time.monotonic()
+
+    def _check(self, address, length):
+        if address < self.base or address + length > self.base + self.size:
+            raise ValueError(f"0x{address:X} (+{length} bytes) is outside the image")
+
+    def write(self, address, data):
+        """Stores data read at address and marks the range valid."""
+        self._check(address, len(data))
+        if not data:
+            return
+        offset = address - self.base
+        self._map[offset:offset + len(data)] = data
+        end = address + len(data) - 1
+        self.valid = add_range(self.valid, address, end)
+        for code in list(self.nrc):
+            self.nrc[code] = subtract_range(self.nrc[code], address, end)
+        self._maybe_sync()
+
+    def mark_nrc(self, address, length, nrc):
+        """Records that reading length bytes at address was refused with the given NRC."""
+        self._check(address, length)
+        self.nrc[nrc] = add_range(self.nrc.get(nrc, []), address, address + length - 1)
+        self._maybe_sync()
+
+    def read(self, address, length):
+        """Returns a zero-copy view of length bytes at address."""
+        self._check(address, length)
+        offset = address - self.base
+        return memoryview(self._map)[offset:offset + length]
+
+    def missing(self, start=None, end=None, retry_nrc=False):
+        """
+        Returns the ranges between start and end (inclusive) that hold no data yet.
+
+        Args:
+            start (int): First address (default: image base).
+            end (int): Last address (default: end of image).
+            retry_nrc (bool): Also return ranges the ECU refused before.
+
+        Returns:
+            list: Inclusive [start, end] ranges.
+        """
+        start = self.base if start is None else start
+        end = self.base + self.size - 1 if end is None else end
+        holes = [[start, end]]
+        settled = list(self.valid)
+        if not retry_nrc:
+            for ranges in self.nrc.values():
+                settled.extend(ranges)
+        for low, high in settled:
+            holes = subtract_range(holes, low, high)
+        return holes
+
+    def _maybe_sync(self):
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.flush()
+
+    def flush(self):
+        """Writes the mapped data and the index to disk."""
+        self._map.flush()
+        index = {
+            "base": self.base,
+            "size": self.size,
+            "valid": self.valid,
+            "nrc": {f"{code:02X}": ranges for code, ranges in sorted(self.nrc.items()) if ranges},
+        }
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(index, f)
+        os.replace(temporary, self.index_path)
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._map.closed:
+            self.flush()
+            self._map.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
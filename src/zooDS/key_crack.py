@@ -1,4 +1,37 @@
-from .utils import wait_for_responses, process_ecu_response
+from .utils import send_and_collect, process_ecu_response
+
+# Inferred keys sent without asking; ECUs typically lock Security Access after about three invalid keys.
+MAX_UNCONFIRMED_KEYS = 3
+# NRCs after which further keys only extend the lockout: Exceeded Number Of Attempts, Required Time Delay Not Expired.
+LOCKOUT_NRCS = (0x36, 0x37)
+
+
+def locked_out(responses):
+    """True if the ECU answered a key with a lockout NRC (see LOCKOUT_NRCS)."""
+    return bool(responses) and responses[0].nrc in LOCKOUT_NRCS
+
+
+def request_seed(stack, key_send_bytes, timeout=0.3):
+    """
+    Requests a new seed for the security level of a key request. ECUs discard the seed
+    after an invalid key, so every further key must answer a fresh seed.
+
+    Args:
+        stack: Communication interface with required methods.
+        key_send_bytes (bytes): UDS request header for sending a key (27 <even level>).
+        timeout (float): Time (in seconds) to wait for responses.
+
+    Returns:
+        bytes: The seed, or None if the ECU refused to send one.
+    """
+    seed_req = bytes([key_send_bytes[0], (key_send_bytes[1] - 1) % 256])
+    responses = send_and_collect(stack, seed_req, timeout)
+    if responses and responses[0].positive:
+        return bytes(responses[0].payload)
+    if responses:
+        print(process_ecu_response(responses[0]))
+    print("ECU sent no new seed. Aborting key scan.")
+    return None
 
 def key_request(key_req, stack, timeout=0.3):
     """
@@ -16,15 +49,14 @@ def key_request(key_req, stack, timeout=0.3):
             responses (list): All response frames received.
     """
     print(f"Sending UDS key request: {key_req.hex()}")
-    stack.send(key_req)
     candidate = key_req[2:]
-    responses = wait_for_responses(stack, timeout)
+    responses = send_and_collect(stack, key_req, timeout)
 
     if responses:
-        if responses[0][0] != 0x7F:
-            flag = responses[0].hex(' ')[6:]
-            print(f"\nKey found!\n Security Access gained with key {candidate.hex()}\nResponse: {flag}")
-            print(f"Decoded data: {bytearray.fromhex(flag).decode('ascii', errors='replace')}")
+        if responses[0].positive:
+            print(f"\nKey found!\n Security Access gained with key {candidate.hex()}\n"
+                  f"Response: {responses[0].payload.hex(' ')}")
+            print(f"Decoded data: {responses[0].ascii}")
             return True, candidate, responses
         else:
             print(process_ecu_response(responses[0]))
@@ -34,21 +66,29 @@ def key_request(key_req, stack, timeout=0.3):
 def xor_key(seed, stack, key_send_bytes):
     """
     Generates candidate keys by XORing each byte of the seed with every possible byte (0x00-0xFF)
-    and sends them via the key_request helper function.
+    and sends them via the key_request helper function. Each key after the first answers a
+    fresh seed.
 
     Args:
-        seed (bytes): The seed value.
+        seed (bytes): The seed value for the first key.
         stack: Communication interface with required methods.
         key_send_bytes (bytes): UDS request header for sending a key.
     """
     try:
         for candidate in range(256):
+            if candidate:
+                seed = request_seed(stack, key_send_bytes)
+                if seed is None:
+                    break
             xor_value = bytes([b ^ candidate for b in seed])
             print(f"Candidate {candidate:02X}: {xor_value.hex()}")
             key_req = key_send_bytes + xor_value
             found, candidate_key, responses = key_request(key_req, stack)
             if found:
                 break
+            if locked_out(responses):
+                print("ECU locked Security Access. Aborting key scan.")
+                break
     except KeyboardInterrupt:
         print("\nKeyboard interrupt received. Aborting key scan.")
 
@@ -76,6 +116,78 @@ def invert_bits(seed, stack, service_bytes):
     key_request(key_req, stack)
 
 
+def read_seed_key_pairs():
+    """
+    Prompts for captured seed/key pairs, one "SEED:KEY" hex pair per line, ended by an empty line.
+
+    Returns:
+        list: (seed, key) tuples of bytes.
+    """
+    pairs = []
+    while True:
+        line = input("Enter captured seed:key in hex (empty line to finish): ").strip()
+        if not line:
+            return pairs
+        try:
+            seed, key = line.split(':')
+            pairs.append((bytes.fromhex(seed), bytes.fromhex(key)))
+        except ValueError:
+            print("Invalid pair, expected e.g. 1A2B3C4D:5E6F7081")
+
+
+def solve_and_send(seed, stack, key_send_bytes, pairs):
+    """
+    Infers the seed/key algorithm offline from captured pairs and sends only the keys it predicts.
+    More than MAX_UNCONFIRMED_KEYS keys are sent only after confirmation, and sending stops once
+    the ECU locks Security Access. Each key after the first is computed from a fresh seed, with
+    the transforms not yet ruled out by an invalid key.
+
+    Args:
+        seed (bytes): The seed value for the first key.
+        stack: Communication interface with required methods.
+        key_send_bytes (bytes): UDS request header for sending a key.
+        pairs (list): Captured (seed, key) tuples of bytes.
+    """
+    from .key_solver import apply_transform, solve_seed_key, candidate_keys, describe_transform
+
+    if not pairs:
+        print("No seed/key pairs entered.")
+        return
+    try:
+        transforms = solve_seed_key(pairs)
+    except ValueError as e:
+        print(f"Cannot solve: {e}")
+        return
+    candidates = candidate_keys(transforms, bytes(seed))
+    print(f"{len(transforms)} transform(s) fit all {len(pairs)} pair(s), giving {len(candidates)} distinct key(s).")
+    if len(candidates) > MAX_UNCONFIRMED_KEYS:
+        print("Capture more seed/key pairs to narrow the candidates down; "
+              "each wrong key counts towards the ECU's attempt limit.")
+        if not input(f"Send all {len(candidates)} keys anyway? (y/n): ").strip().lower().startswith('y'):
+            return
+    # Transforms that agree on one seed may differ on the next, so an invalid key only rules out
+    # the transforms that predicted it for its own seed.
+    remaining = list(transforms)
+    try:
+        while remaining:
+            if len(remaining) < len(transforms):
+                seed = request_seed(stack, key_send_bytes)
+                if seed is None:
+                    break
+            steps = remaining[0]
+            candidate = apply_transform(steps, seed)
+            print(f"Trying {describe_transform(steps, len(seed))}: {candidate.hex()}")
+            found, candidate_key, responses = key_request(key_send_bytes + candidate, stack)
+            if found:
+                break
+            if locked_out(responses):
+                print("ECU locked Security Access. Aborting key scan.")
+                break
+            remaining = [steps for steps in remaining if apply_transform(steps, seed) != candidate]
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt received. Aborting key scan.")
+
+
 def handle_security_access(service_bytes, responses, stack):
     """
     Handles Security Access responses (service 0x27). If a positive response is received,
@@ -87,10 +199,9 @@ def handle_security_access(service_bytes, responses, stack):
         stack: Communication interface with required methods.
     """
     complete_response = responses[0]
-    result = process_ecu_response(complete_response)
-    if result.startswith("P"):
-        # Assuming a positive response code "67 01" where the seed follows.
-        seed = complete_response[2:]
+    if complete_response.positive:
+        # Positive response "67 <level>" where the seed follows.
+        seed = bytes(complete_response.payload)
         print(f"Security Access positive response. Seed: {seed.hex(' ')}")
         if input("Attempt to crack Security Access key? (y/n): ").strip().lower().startswith('y'):
             # Modify key request header: increment second byte.
@@ -101,12 +212,14 @@ def handle_security_access(service_bytes, responses, stack):
                 "Which cipher tool?\n"
                 "1. Single Byte XOR\n"
                 "2. Bitwise Inversion\n"
-                # "3. ..." list to be expanded with additional "bit twiddling"
+                "3. Solve from captured seed/key pairs\n"
             ).strip()
             if cipher == "1":
                 xor_key(seed, stack, key_send_bytes)
             elif cipher == "2":
                 # For bitwise inversion, convert seed to hex string.
                 invert_bits(seed.hex(), stack, key_send_bytes)
+            elif cipher == "3":
+                solve_and_send(seed, stack, key_send_bytes, read_seed_key_pairs())
     else:
         print("Security Access did not return a positive response.")
@@ -0,0 +1,204 @@
+import numpy as np
+
+"""
+Offline seed/key algorithm inference for Security Access (0x27).
+
+Given captured (seed, key) pairs, searches a family of transforms built from
+XOR/add/subtract constants, bit rotations, byte swaps and bit inversion, and
+reports every transform that maps each seed to its key. Candidate constants are
+solved from the first pair and checked against all pairs at once with NumPy, so
+the whole family is evaluated in milliseconds without touching the ECU.
+
+A transform is a list of steps applied to the seed in order:
+    ("not", None), ("bswap", None), ("rotl", bits), ("xor", c), ("add", c), ("rsub", c)
+where rsub computes c - x. All arithmetic wraps at the seed width.
+"""
+
+# Enumerated first constants for the two-constant transforms: all 16-bit values
+# plus every byte value repeated across the seed width.
+TWO_CONSTANT_SPACE = 0x10000
+
+
+def _mask(width):
+    return (1 << (8 * width)) - 1
+
+
+def apply_transform(steps, seed):
+    """
+    Applies a transform to a seed.
+
+    Args:
+        steps (list): Transform steps as described in the module docstring.
+        seed (bytes): The seed.
+
+    Returns:
+        bytes: The key, as long as the seed.
+    """
+    width = len(seed)
+    bits = 8 * width
+    mask = _mask(width)
+    x = int.from_bytes(seed, byteorder='big')
+    for op, value in steps:
+        if op == "not":
+            x = ~x & mask
+        elif op == "bswap":
+            x = int.from_bytes(x.to_bytes(width, byteorder='big')[::-1], byteorder='big')
+        elif op == "rotl":
+            x = ((x << value) | (x >> (bits - value))) & mask
+        elif op == "xor":
+            x ^= value
+        elif op == "add":
+            x = (x + value) & mask
+        elif op == "rsub":
+            x = (value - x) & mask
+    return x.to_bytes(width, byteorder='big')
+
+
+def describe_transform(steps, width):
+    """Returns a readable description of a transform, e.g. 'rotl 3 -> xor 0x1234ABCD'."""
+    parts = []
+    for op, value in steps:
+        if op in ("not", "bswap"):
+            parts.append(op)
+        elif op == "rotl":
+            parts.append(f"rotl {value}")
+        elif op == "rsub":
+            parts.append(f"0x{value:0{2 * width}X} - x")
+        else:
+            parts.append(f"{op} 0x{value:0{2 * width}X}")
+    return " -> ".join(parts) if parts else "identity"
+
+
+def _apply_unary(steps, values, width):
+    """Applies constant-free steps to a uint64 array."""
+    bits = 8 * width
+    mask = np.uint64(_mask(width))
+    for op, value in steps:
+        if op == "not":
+            values = ~values & mask
+        elif op == "bswap":
+            swapped = np.zeros_like(values)
+            for i in range(width):
+                byte = (values >> np.uint64(8 * i)) & np.uint64(0xFF)
+                swapped |= byte << np.uint64(8 * (width - 1 - i))
+            values = swapped
+        elif op == "rotl":
+            values = ((values << np.uint64(value)) | (values >> np.uint64(bits - value))) & mask
+    return values
+
+
+def _invert_unary(steps, width):
+    """Returns the steps that undo the given constant-free steps."""
+    inverse = []
+    for op, value in reversed(steps):
+        if op == "rotl":
+            inverse.append(("rotl", 8 * width - value))
+        else:
+            inverse.append((op, value))
+    return inverse
+
+
+def _unary_family(width):
+    """Constant-free transforms used before and after the constant operations."""
+    family = [[], [("not", None)]]
+    if width > 1:
+        family += [[("bswap", None)], [("not", None), ("bswap", None)]]
+    for rotation in range(1, 8 * width):
+        family.append([("rotl", rotation)])
+        if width > 1:
+            family.append([("bswap", None), ("rotl", rotation)])
+    return family
+
+
+def _solve_constant(op, x, y, mask):
+    """Solves op(x, c) == y for c, elementwise."""
+    if op == "xor":
+        return x ^ y
+    if op == "add":
+        return (y - x) & mask
+    return (y + x) & mask  # rsub: c - x == y
+
+
+def _apply_op(op, x, c, mask):
+    if op == "xor":
+        return x ^ c
+    if op == "add":
+        return (x + c) & mask
+    return (c - x) & mask
+
+
+def _parse_pairs(pairs):
+    width = len(pairs[0][0])
+    if width > 8:
+        raise ValueError("Seeds longer than 8 bytes are not supported")
+    for seed, key in pairs:
+        if len(seed) != width or len(key) != width:
+            raise ValueError("All seeds and keys must have the same length")
+    seeds = np.array([int.from_bytes(seed, byteorder='big') for seed, _ in pairs], dtype=np.uint64)
+    keys = np.array([int.from_bytes(key, byteorder='big') for _, key in pairs], dtype=np.uint64)
+    return width, seeds, keys
+
+
+def solve_seed_key(pairs):
+    """
+    Finds the transforms in the search family that are consistent with every (seed, key) pair.
+
+    Single-constant transforms have the form post(op(pre(seed), c)) with pre and post taken
+    from inversions, byte swaps and rotations. Two-constant transforms have the form
+    op2(op1(seed, a), b) with op1/op2 being xor/add, a enumerated over TWO_CONSTANT_SPACE and
+    repeated-byte masks, and b solved from the first pair. With few pairs many transforms fit;
+    collect more pairs to narrow them down.
+
+    Args:
+        pairs (list): (seed, key) tuples of bytes, all of the same length (up to 8 bytes).
+
+    Returns:
+        list: Transforms (lists of steps), simplest first.
+    """
+    width, seeds, keys = _parse_pairs(pairs)
+    mask = np.uint64(_mask(width))
+    family = _unary_family(width)
+    # Rows: every pre transform applied to the seeds / every post transform undone on the keys.
+    pre = np.stack([_apply_unary(steps, seeds, width) for steps in family])
+    post_inverse = np.stack([_apply_unary(_invert_unary(steps, width), keys, width) for steps in family])
+
+    solutions = []
+    with np.errstate(over="ignore"):
+        for op in ("xor", "add", "rsub"):
+            constants = _solve_constant(op, pre[:, None, 0], post_inverse[None, :, 0], mask)
+            predicted = _apply_op(op, pre[:, None, :], constants[:, :, None], mask)
+            consistent = np.all(predicted == post_inverse[None, :, :], axis=2)
+            for i, j in zip(*np.nonzero(consistent)):
+                constant = int(constants[i, j])
+                solutions.append(family[i] + [(op, constant)] + family[j])
+
+        repeated = [int.from_bytes(bytes([b]) * width, byteorder='big') for b in range(256)]
+        first = np.unique(np.array(list(range(min(TWO_CONSTANT_SPACE, int(mask) + 1))) + repeated,
+                                   dtype=np.uint64) & mask)
+        for op1, op2 in (("xor", "add"), ("add", "xor")):
+            inner = _apply_op(op1, seeds[None, :], first[:, None], mask)
+            second = _solve_constant(op2, inner[:, 0], keys[0], mask)
+            predicted = _apply_op(op2, inner, second[:, None], mask)
+            for i in np.nonzero(np.all(predicted == keys[None, :], axis=1))[0]:
+                a, b = int(first[i]), int(second[i])
+                if a and b:  # single-constant forms were found above
+                    solutions.append([(op1, a), (op2, b)])
+
+    unique = {}
+    for steps in solutions:
+        steps = [step for step in steps if step not in (("xor", 0), ("add", 0))]
+        unique.setdefault(tuple(steps), steps)
+    return sorted(unique.values(), key=len)
+
+
+def candidate_keys(transforms, seed):
+    """
+    Applies the transforms to a new seed.
+
+    Returns:
+        list: (key, transform) tuples with distinct keys, in the order of transforms.
+    """
+    keys = {}
+    for steps in transforms:
+        keys.setdefault(apply_transform(steps, seed), steps)
+    return list(keys.items())
@@ -1,4 +1,20 @@
-from .utils import wait_for_responses, process_ecu_response
+from .dump_image import DumpImage, subtract_range
+from .read_response import UDSResponse
+from .reporting import ProgressReporter, ScanReporter
+from .utils import send_and_collect, process_ecu_response
+
+# Region classes reported by map_memory_regions.
+READABLE = "readable"
+PROTECTED = "protected"      # NRC 0x33 Security Access Denied
+UNMAPPED = "unmapped"        # NRC 0x31 Request Out Of Range
+REJECTED = "rejected"        # any other NRC
+NO_RESPONSE = "no response"
+
+# addressAndLengthFormatIdentifiers tried by probe_memory_format, most common first:
+# (MemorySize bytes << 4) | MemoryAddress bytes.
+FORMAT_CANDIDATES = (0x14, 0x24, 0x44, 0x13, 0x23, 0x43, 0x12, 0x22, 0x42, 0x11, 0x21, 0x41, 0x15, 0x25, 0x45)
+# Largest read size probed: the longest classic ISO-TP message minus the response SID.
+MAX_READ_SIZE = 0xFFE
 
 
 def build_read_memory_request(address, size, mem_addr_len=4, mem_size_len=1):
@@ -36,15 +52,29 @@ def build_read_memory_request(address, size, mem_addr_len=4, mem_size_len=1):
     return request
 
 
+def _memory_blocks(spans, step):
+    """Yields (address, span_end) for every block start in the given inclusive spans."""
+    for span_start, span_end in spans:
+        for address in range(span_start, span_end + 1, step):
+            yield address, span_end
+
+
 def scan_memory_by_address(stack, start_address, end_address, mem_size,
-                           mem_addr_len=4, mem_size_len=1, timeout=0.3):
+                           mem_addr_len=4, mem_size_len=1, timeout=0.3, on_hit=None, checkpoint=None,
+                           step=None, image=None, on_result=None, skip=(), reporter=None):
     """
-    Scans memory using the UDS ReadMemoryByAddress service at every byte from
-    start_address to end_address. Each request reads 'mem_size' bytes.
+    Scans memory using the UDS ReadMemoryByAddress service from start_address to
+    end_address. Each request reads 'mem_size' bytes, and the address advances by
+    'step' bytes (default: mem_size, so every byte is read once).
+
+    For each address, a request is built and sent and the outcome is passed to the reporter.
+    If a positive response is received, on_hit is called with the address and the response
+    data, a memoryview of the response frame. Ctrl+C (KeyboardInterrupt) aborts the scan and
+    is raised to the caller, with the checkpoint at the last address read.
 
-    For each address, a request is built and sent. If any ECU response is received,
-    the responses are printed. If a positive response (i.e. response[0] != 0x7F) is received,
-    the scan pauses and asks the user whether to continue scanning.
+    With an image, data is written straight into the DumpImage and refusals are recorded in
+    its index instead of being kept in the returned list, and only the image's missing
+    ranges are read.
 
     Args:
         stack: The iso-tp interface.
@@ -54,65 +84,514 @@ def scan_memory_by_address(stack, start_address, end_address, mem_size,
         mem_addr_len (int): Number of bytes for MemoryAddress.
         mem_size_len (int): Number of bytes for MemorySize.
         timeout (float): Timeout in seconds for ECU responses.
+        on_hit (callable): Called as on_hit(address, data) for each positive response.
+                           Returning False stops the scan.
+        checkpoint (ScanCheckpoint): Records the scan's progress, if given. The data itself goes to
+                                     on_hit and the image; the checkpoint only keeps the cursor.
+        step (int): Bytes between two request addresses (default: mem_size).
+        image (DumpImage): Image to write the dump into, if given.
+        on_result (callable): Called as on_result(address, response, size) for every request, with
+                              None if the ECU did not answer.
+        skip (list): Inclusive [start, end] address ranges not to read, e.g. settled ranges in a ScanStore.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
 
     Returns:
-        list of tuples: Each tuple is (address, request, responses)
+        list of tuples: Each tuple is (address, request, responses). Empty when an image is given.
     """
     results = []
+    step = step or mem_size
+    if image is not None:
+        spans = image.missing(start_address, end_address)
+    else:
+        spans = [[start_address, end_address]]
+    for low, high in skip:
+        spans = subtract_range(spans, low, high)
+    reporter = reporter or ScanReporter()
+    reporter.start("mem", sum(high - low + 1 for low, high in spans))
     try:
-        for address in range(start_address, end_address + 1):
+        for address, span_end in _memory_blocks(spans, step):
+            size = min(mem_size, span_end - address + 1)
             try:
-                request = build_read_memory_request(address, mem_size, mem_addr_len, mem_size_len)
-                print(f"\nScanning memory at address 0x{address:0{mem_addr_len * 2}X} with size {mem_size} bytes.")
-                stack.send(request)
-                responses = wait_for_responses(stack, timeout)
-                if responses:
-                    positive = False
-                    for r in responses:
-                        processed = process_ecu_response(r)
-                        print(f"  {processed} - {r.hex(' ')}")
-                        if r[0] != 0x7F:  # positive response
-                            positive = True
-                    results.append((address, request, responses))
-                    if positive:
-                        cont = input(
-                            f"Positive response received for address 0x{address:0{mem_addr_len * 2}X}. Continue scanning? (y/n): ").strip().lower()
-                        if not cont.startswith('y'):
-                            print("Memory scan aborted.")
-                            break
-                else:
-                    print(f"No response for address 0x{address:0{mem_addr_len * 2}X}.")
+                request = build_read_memory_request(address, size, mem_addr_len, mem_size_len)
+                responses = send_and_collect(stack, request, timeout)
+                response = responses[0] if responses else None
+                reporter.probe("mem", address, response, min(step, span_end - address + 1))
+                if on_result:
+                    on_result(address, response, size)
+                if response is not None:
+                    data = response.payload if response.positive else None
+                    if image is None:
+                        results.append((address, request, responses))
+                    elif data is not None:
+                        image.write(address, data[:size])
+                    elif response.nrc is not None:
+                        image.mark_nrc(address, size, response.nrc)
+                    if data is not None and on_hit and on_hit(address, data) is False:
+                        reporter.note("Memory scan aborted.")
+                        break
             except Exception as e:
-                print(f"Error at address 0x{address:0{mem_addr_len * 2}X}: {str(e)}")
-    except KeyboardInterrupt:
-        print("\nKeyboard interrupt received. Aborting memory scan.")
+                reporter.note(f"Error at address 0x{address:0{mem_addr_len * 2}X}: {str(e)}")
+            if checkpoint:
+                checkpoint.advance(address + step)
+        else:
+            if checkpoint:
+                checkpoint.complete(start_address, end_address)
+    finally:
+        reporter.finish()
     return results
 
 
+def build_request_upload(address, size, mem_addr_len=4, mem_size_len=4, data_format=0x00):
+    """
+    Builds a UDS RequestUpload (0x35) request message.
+
+    Message structure:
+        [0x35] [dataFormatIdentifier] [addressAndLengthFormatIdentifier] [MemoryAddress] [MemorySize]
+
+    Args:
+        address (int): First address to upload.
+        size (int): Number of bytes to upload.
+        mem_addr_len (int): Number of bytes for MemoryAddress.
+        mem_size_len (int): Number of bytes for MemorySize.
+        data_format (int): dataFormatIdentifier, 0x00 for neither compressed nor encrypted.
+
+    Returns:
+        bytes: The complete UDS request message.
+    """
+    return bytes([0x35, data_format]) + build_read_memory_request(address, size, mem_addr_len, mem_size_len)[1:]
+
+
+def parse_max_block_length(response):
+    """
+    Returns the TransferData payload size from a positive RequestUpload response.
+
+    The response carries maxNumberOfBlockLength, the length of a whole TransferData
+    message, whose first two bytes are the response SID and the block sequence counter.
+
+    Raises:
+        ValueError: If the response is truncated.
+    """
+    length = response[1] >> 4 if len(response) > 1 else 0
+    if not length or len(response) < 2 + length:
+        raise ValueError(f"Malformed RequestUpload response: {bytes(response).hex(' ')}")
+    return int.from_bytes(response[2:2 + length], byteorder='big') - 2
+
+
+def _transfer_blocks(stack, address, end_address, block_length, image, timeout, retries, on_hit, reporter):
+    """
+    Requests TransferData (0x36) blocks of an accepted upload until end_address.
+
+    A block without answer or with the wrong counter is requested again with the same block
+    sequence counter, which makes the ECU repeat it. NRC 0x73 (Wrong Block Sequence Counter)
+    means the ECU moved on without the tester, so the block is lost.
+
+    Returns:
+        tuple: (next address to upload, True if the upload has to restart there)
+    """
+    counter = 0x01
+    failures = 0
+    while address <= end_address:
+        responses = send_and_collect(stack, bytes([0x36, counter]), timeout)
+        response = responses[0] if responses else None
+        if response is not None and response.negative:
+            if response.nrc == 0x73:
+                return address, True
+            reporter.probe("upload", address, response, 0)
+            reporter.note(f"TransferData refused at 0x{address:X}: {process_ecu_response(response)}")
+            return address, False
+        if response is None or response.identifier != counter or not response.payload:
+            failures += 1
+            if failures > retries:
+                return address, True
+            continue
+        data = response.payload[:min(block_length, end_address - address + 1)]
+        image.write(address, data)
+        reporter.probe("upload", address, response, len(data))
+        if on_hit and on_hit(address, data) is False:
+            reporter.note("Upload aborted.")
+            return address + len(data), False
+        address += len(data)
+        counter = (counter + 1) & 0xFF  # wraps to 0x00 after 0xFF
+        failures = 0
+    return address, False
+
+
+def upload_memory(stack, start_address, end_address, image, mem_addr_len=4, mem_size_len=4, timeout=0.3,
+                  data_format=0x00, retries=3, on_hit=None, reporter=None):
+    """
+    Uploads memory with RequestUpload (0x35), TransferData (0x36) and RequestTransferExit (0x37)
+    straight into a dump image.
+
+    TransferData blocks are as large as the ECU's maxNumberOfBlockLength allows. Response
+    Pending (0x78) is waited out by send_and_collect. If the block sequence is lost (NRC 0x73,
+    or a block that stays unanswered after retries), the transfer is exited and a new upload
+    starts at the first missing address, up to retries times.
+
+    Args:
+        stack: The iso-tp interface.
+        start_address (int): First address to upload.
+        end_address (int): Last address to upload (inclusive).
+        image (DumpImage): Image the data is written into.
+        mem_addr_len (int): Number of bytes for MemoryAddress in the RequestUpload.
+        mem_size_len (int): Number of bytes for MemorySize in the RequestUpload.
+        timeout (float): Timeout in seconds for ECU responses.
+        data_format (int): dataFormatIdentifier of the RequestUpload.
+        retries (int): Repeats of an unanswered block, and restarts of a lost transfer.
+        on_hit (callable): Called as on_hit(address, data) for each block. Returning False stops the upload.
+        reporter (ScanReporter): Receives an event per block (default: counted silently).
+
+    Returns:
+        int: Number of bytes uploaded from start_address on; 0 if the ECU refused the upload.
+    """
+    reporter = reporter or ScanReporter()
+    address = start_address
+    restarts = 0
+    reporter.start("upload", end_address - start_address + 1)
+    try:
+        while address <= end_address:
+            request = build_request_upload(address, end_address - address + 1, mem_addr_len, mem_size_len,
+                                           data_format)
+            responses = send_and_collect(stack, request, timeout)
+            if not responses or responses[0].negative:
+                reporter.note(f"RequestUpload refused at 0x{address:X}: "
+                              f"{process_ecu_response(responses[0] if responses else None)}")
+                break
+            try:
+                block_length = parse_max_block_length(responses[0])
+            except ValueError as e:
+                reporter.note(str(e))
+                block_length = 0
+            restart = False
+            if block_length > 0:
+                address, restart = _transfer_blocks(stack, address, end_address, block_length, image, timeout,
+                                                    retries, on_hit, reporter)
+            responses = send_and_collect(stack, b"\x37", timeout)
+            if not responses or responses[0].negative:
+                reporter.note(f"RequestTransferExit failed: {process_ecu_response(responses[0] if responses else None)}")
+            if not restart:
+                break
+            restarts += 1
+            if restarts > retries:
+                reporter.note(f"Block sequence lost at 0x{address:X} too often; giving up the upload.")
+                break
+            reporter.note(f"Block sequence lost at 0x{address:X}; restarting the upload there.")
+    except KeyboardInterrupt:
+        send_and_collect(stack, b"\x37", timeout)  # leave the ECU ready for the next transfer
+        raise
+    finally:
+        reporter.finish()
+    return address - start_address
+
+
+def dump_memory(stack, start_address, end_address, image, mem_size=0xFF, mem_addr_len=4, mem_size_len=1,
+                timeout=0.3, upload=True, upload_size_len=4, on_hit=None, checkpoint=None, on_result=None,
+                skip=(), reporter=None):
+    """
+    Dumps memory into an image with RequestUpload, reading whatever it did not deliver with
+    ReadMemoryByAddress (0x23).
+
+    Only the image's missing ranges are requested, so an interrupted dump continues where it
+    stopped. The 0x23 fallback covers a refused upload as well as the rest of an aborted one.
+
+    Args:
+        stack: The iso-tp interface.
+        start_address (int): Starting memory address.
+        end_address (int): Ending memory address (inclusive).
+        image (DumpImage): Image the dump is written into.
+        mem_size (int): Bytes per ReadMemoryByAddress request.
+        mem_addr_len (int): Number of bytes for MemoryAddress.
+        mem_size_len (int): Number of bytes for MemorySize in ReadMemoryByAddress requests.
+        timeout (float): Timeout in seconds for ECU responses.
+        upload (bool): Try RequestUpload first.
+        upload_size_len (int): Number of bytes for MemorySize in the RequestUpload.
+        on_hit (callable): Called as on_hit(address, data) for each block read.
+                           Returning False stops the dump.
+        checkpoint (ScanCheckpoint): Records the ReadMemoryByAddress progress, if given.
+        on_result (callable): Called as on_result(address, response, size) for every ReadMemoryByAddress
+                              request, and for every uploaded block with the response a
+                              ReadMemoryByAddress of it would have returned.
+        skip (list): Inclusive [start, end] address ranges not to upload or read.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
+
+    Returns:
+        int: Number of bytes received through RequestUpload.
+    """
+    uploaded = 0
+    stopped = False
+
+    def block(address, data):
+        nonlocal stopped
+        stopped = on_hit is not None and on_hit(address, data) is False
+        return not stopped
+
+    def uploaded_block(address, data):
+        if on_result:
+            on_result(address, UDSResponse(b"\x63" + bytes(data)), len(data))
+        return block(address, data)
+
+    if upload:
+        spans = image.missing(start_address, end_address)
+        for low, high in skip:
+            spans = subtract_range(spans, low, high)
+        for low, high in spans:
+            count = upload_memory(stack, low, high, image, mem_addr_len, upload_size_len, timeout,
+                                  on_hit=uploaded_block, reporter=reporter)
+            uploaded += count
+            if count < high - low + 1:
+                break
+    if stopped:
+        return uploaded
+    if image.missing(start_address, end_address):
+        scan_memory_by_address(stack, start_address, end_address, mem_size, mem_addr_len, mem_size_len, timeout,
+                               on_hit=block, checkpoint=checkpoint, image=image, on_result=on_result, skip=skip,
+                               reporter=reporter)
+    elif checkpoint:
+        checkpoint.complete(start_address, end_address)
+    return uploaded
+
+
+def classify_memory(stack, address, size=1, mem_addr_len=4, mem_size_len=1, timeout=0.3):
+    """
+    Reads size bytes at address and classifies the result.
+
+    Returns:
+        str: READABLE, PROTECTED (NRC 0x33), UNMAPPED (NRC 0x31), REJECTED (other NRC) or NO_RESPONSE.
+    """
+    request = build_read_memory_request(address, size, mem_addr_len, mem_size_len)
+    responses = send_and_collect(stack, request, timeout)
+    if not responses:
+        return NO_RESPONSE
+    response = responses[0]
+    if response.positive:
+        return READABLE
+    nrc = response.nrc
+    if nrc == 0x33:
+        return PROTECTED
+    if nrc == 0x31:
+        return UNMAPPED
+    return REJECTED
+
+
+def probe_memory_format(stack, address, timeout=0.3, formats=FORMAT_CANDIDATES):
+    """
+    Finds an addressAndLengthFormatIdentifier the ECU accepts by reading one byte at address
+    with each candidate format.
+
+    Data, NRC 0x33 (Security Access Denied) or 0x22 (Conditions Not Correct) show the ECU parsed
+    the request, NRC 0x13 that it expects another format. NRC 0x31 may mean either an invalid
+    format or an unmapped address, so it only counts when no format gets a clearer answer.
+    Among the accepted formats, the one with the widest MemorySize is chosen, as it allows the
+    largest reads.
+
+    Args:
+        stack: The iso-tp interface.
+        address (int): Address to probe, ideally one known to be readable.
+        timeout (float): Timeout in seconds for ECU responses.
+        formats (tuple): Candidate format identifiers, in order of preference.
+
+    Returns:
+        tuple: (mem_addr_len, mem_size_len, readable), readable True if the byte could be read;
+               None if no format was accepted.
+    """
+    accepted = []
+    out_of_range = []
+    for format_identifier in formats:
+        mem_addr_len, mem_size_len = format_identifier & 0x0F, format_identifier >> 4
+        if address >= 1 << (8 * mem_addr_len):
+            continue
+        request = build_read_memory_request(address, 1, mem_addr_len, mem_size_len)
+        responses = send_and_collect(stack, request, timeout)
+        if not responses:
+            continue
+        response = responses[0]
+        if response.positive or response.nrc in (0x22, 0x33):
+            accepted.append((mem_addr_len, mem_size_len, response.positive))
+        elif response.nrc == 0x31:
+            out_of_range.append((mem_addr_len, mem_size_len, False))
+    candidates = [c for c in accepted if c[2]] or accepted or out_of_range
+    if not candidates:
+        return None
+    return max(candidates, key=lambda candidate: candidate[1])
+
+
+def probe_max_read_size(stack, address, mem_addr_len=4, mem_size_len=1, timeout=0.3, limit=MAX_READ_SIZE):
+    """
+    Binary-searches the largest number of bytes the ECU returns for one read at address.
+
+    A size counts as readable if the ECU answers with all the requested bytes; NRC 0x14
+    (Response Too Long), 0x31, 0x13 or no answer mean it is too large. Reads that cross the
+    end of the memory region behind address also fail, so the result is bounded by the region.
+
+    Args:
+        stack: The iso-tp interface.
+        address (int): Readable address to probe.
+        mem_addr_len (int): Number of bytes for MemoryAddress.
+        mem_size_len (int): Number of bytes for MemorySize.
+        timeout (float): Timeout in seconds for ECU responses.
+        limit (int): Largest size to try; also bounded by what MemorySize can hold.
+
+    Returns:
+        int: The largest readable size, or 0 if not even one byte could be read.
+    """
+    limit = min(limit, (1 << (8 * mem_size_len)) - 1)
+
+    def readable(size):
+        request = build_read_memory_request(address, size, mem_addr_len, mem_size_len)
+        responses = send_and_collect(stack, request, timeout)
+        return bool(responses) and responses[0].positive and len(responses[0].payload) >= size
+
+    if limit < 1 or not readable(1):
+        return 0
+    if readable(limit):
+        return limit
+    low, high = 1, limit  # low is readable, high is not
+    while high - low > 1:
+        middle = (low + high) // 2
+        if readable(middle):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def probe_memory_access(stack, address, timeout=0.3, limit=MAX_READ_SIZE, mem_addr_len=None, mem_size_len=None):
+    """
+    Finds the format and the largest read size to dump memory from address with.
+
+    The format is only probed when mem_addr_len or mem_size_len is not given.
+
+    Args:
+        stack: The iso-tp interface.
+        address (int): Address to probe, ideally the start of a readable region.
+        timeout (float): Timeout in seconds for ECU responses.
+        limit (int): Largest read size to try, e.g. the size of the range to dump.
+        mem_addr_len (int): Known number of bytes for MemoryAddress.
+        mem_size_len (int): Known number of bytes for MemorySize.
+
+    Returns:
+        tuple: (mem_addr_len, mem_size_len, max_size), max_size 0 if address could not be read;
+               None if the ECU accepted no format.
+    """
+    if mem_addr_len is None or mem_size_len is None:
+        formats = [candidate for candidate in FORMAT_CANDIDATES
+                   if mem_addr_len in (None, candidate & 0x0F) and mem_size_len in (None, candidate >> 4)]
+        probed = probe_memory_format(stack, address, timeout, formats)
+        if probed is None:
+            print("No addressAndLengthFormatIdentifier was accepted.")
+            return None
+        mem_addr_len, mem_size_len, _ = probed
+        print(f"ECU accepts addressAndLengthFormatIdentifier 0x{(mem_size_len << 4) | mem_addr_len:02X}.")
+    max_size = probe_max_read_size(stack, address, mem_addr_len, mem_size_len, timeout, limit)
+    if max_size:
+        print(f"Largest read at 0x{address:0{mem_addr_len * 2}X}: 0x{max_size:X} bytes.")
+    else:
+        print(f"Address 0x{address:0{mem_addr_len * 2}X} is not readable; cannot probe the read size.")
+    return mem_addr_len, mem_size_len, max_size
+
+
+def map_memory_regions(stack, start_address, end_address, stride=0x100, probe_size=1,
+                       mem_addr_len=4, mem_size_len=1, timeout=0.3, granularity=1):
+    """
+    Maps which parts of an address range are readable, protected or unmapped.
+
+    A coarse pass classifies one address every 'stride' bytes. Where two neighbouring probes
+    disagree, the edge between them is located by bisection down to 'granularity' bytes.
+    Probes that agree are assumed to enclose a single region, so regions smaller than the
+    stride can be missed; lower the stride to find them.
+
+    Args:
+        stack: The iso-tp interface.
+        start_address (int): Starting memory address.
+        end_address (int): Ending memory address (inclusive).
+        stride (int): Bytes between two coarse probes.
+        probe_size (int): Number of bytes read by each probe.
+        mem_addr_len (int): Number of bytes for MemoryAddress.
+        mem_size_len (int): Number of bytes for MemorySize.
+        timeout (float): Timeout in seconds for ECU responses.
+        granularity (int): Resolution in bytes of the located edges.
+
+    Returns:
+        list of tuples: (start, end, region_class) covering start_address to end_address.
+    """
+    classes = {}
+
+    def classify(address):
+        if address not in classes:
+            classes[address] = classify_memory(stack, address, probe_size, mem_addr_len, mem_size_len, timeout)
+            print(f"  0x{address:0{mem_addr_len * 2}X}: {classes[address]}")
+        return classes[address]
+
+    def find_edges(low, high):
+        # low and high are classified differently; returns the addresses where the class changes.
+        if high - low <= granularity:
+            return [high]
+        middle = (low + high) // 2
+        if classify(middle) == classes[low]:
+            return find_edges(middle, high)
+        if classes[middle] == classes[high]:
+            return find_edges(low, middle)
+        return find_edges(low, middle) + find_edges(middle, high)
+
+    probes = list(range(start_address, end_address + 1, stride))
+    if probes[-1] != end_address:
+        probes.append(end_address)
+    edges = []
+    try:
+        for previous, address in zip(probes, probes[1:]):
+            if classify(previous) != classify(address):
+                edges.extend(find_edges(previous, address))
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt received. Aborting memory map.")
+        if not classes:
+            return []
+        edges = [edge for edge in edges if edge <= max(classes)]
+        end_address = max(classes)
+
+    regions = []
+    region_start = start_address
+    for edge in edges + [end_address + 1]:
+        regions.append((region_start, edge - 1, classify(region_start)))
+        region_start = edge
+    return regions
+
+
+def print_memory_map(regions, mem_addr_len=4):
+    """Prints the regions returned by map_memory_regions()."""
+    width = mem_addr_len * 2
+    for start, end, region_class in regions:
+        print(f"0x{start:0{width}X}-0x{end:0{width}X}  {end - start + 1:>10} bytes  {region_class}")
+
+
 def try_memory_scan(stack, timeout=0.3):
     """
     Prompts the user for a memory address range and memory size, then scans memory using
-    the UDS ReadMemoryByAddress service. If the user leaves the memory size input empty,
-    a default value of 0xFF is used.
+    the UDS ReadMemoryByAddress service. If the user leaves the memory size input empty, the
+    ECU's addressAndLengthFormatIdentifier and largest read size are probed at the start
+    address (see probe_memory_access), falling back to format 0x14 and 0xFF bytes.
 
-    The scan tries every byte starting from the entered address until the end address,
-    pausing when a positive response is received.
+    The scan reads consecutive blocks of the memory size from the entered address until the
+    end address, pausing when a positive response is received. Alternatively the range can be
+    mapped into readable, protected and unmapped regions (see map_memory_regions), or dumped
+    into an image with RequestUpload (see dump_memory).
 
     Args:
         stack: The iso-tp communication interface.
         timeout (float): Timeout in seconds for ECU responses.
 
     Returns:
-        List of scan results as returned by scan_memory_by_address.
+        List of scan results as returned by scan_memory_by_address, or the regions
+        returned by map_memory_regions.
     """
     try:
+        mode = input("1. Read memory blocks\n2. Map accessible regions\n"
+                     "3. Dump with RequestUpload (falls back to reading blocks)\nChoose a mode (default 1): ").strip()
         start_str = input("Enter start memory address (in hex, e.g., 10000000): ").strip()
         end_str = input("Enter end memory address (in hex, e.g., 100000FF): ").strip()
-        mem_size_str = input("Enter memory size in bytes (press Enter to use default 0xFF): ").strip()
+        mem_size_str = input("Enter memory size in bytes (press Enter to probe the ECU's largest read): ").strip()
 
         start_address = int(start_str, 16)
         end_address = int(end_str, 16)
-        mem_size = int(mem_size_str, 16) if mem_size_str != "" else 0xFF
+        mem_size = int(mem_size_str, 16) if mem_size_str != "" else None
 
         if start_address > end_address:
             print("Error: Start address must be less than or equal to end address.")
@@ -121,11 +600,60 @@ def try_memory_scan(stack, timeout=0.3):
         print("Invalid input. Please enter valid hexadecimal addresses and memory size.")
         return []
 
-    results = scan_memory_by_address(stack, start_address, end_address, mem_size, timeout=timeout)
+    mem_addr_len, mem_size_len = 4, 1
+    if mem_size is None:
+        probed = probe_memory_access(stack, start_address, timeout, min(MAX_READ_SIZE, end_address - start_address + 1))
+        if probed:
+            mem_addr_len, mem_size_len, mem_size = probed
+        mem_size = mem_size or 0xFF
+
+    if mode == '2':
+        regions = map_memory_regions(stack, start_address, end_address, stride=mem_size, mem_addr_len=mem_addr_len,
+                                     mem_size_len=mem_size_len, timeout=timeout)
+        print("\nMemory map:")
+        print_memory_map(regions, mem_addr_len)
+        return regions
+
+    if mode == '3':
+        image_path = input("Enter dump image file to write: ").strip()
+        if not image_path:
+            print("RequestUpload dumps need an image file.")
+            return []
+    else:
+        image_path = input("Enter dump image file to write (press Enter to keep results in memory): ").strip()
+    if image_path:
+        try:
+            image = DumpImage(image_path, start_address, end_address - start_address + 1)
+        except (OSError, ValueError) as e:
+            print(f"Cannot open dump image: {e}")
+            return []
+        with image:
+            try:
+                dump_memory(stack, start_address, end_address, image, mem_size, mem_addr_len, mem_size_len,
+                            timeout=timeout, upload=mode == '3', reporter=ProgressReporter())
+            except KeyboardInterrupt:
+                print("\nKeyboard interrupt received. Aborting memory dump.")
+            print(f"\nDump image {image_path}: {len(image.missing(retry_nrc=True))} range(s) still missing.")
+        return []
+
+    reporter = ProgressReporter()
+
+    def prompt_on_hit(address, data):
+        with reporter.suspended():
+            print(f"  0x{address:0{mem_addr_len * 2}X}: {bytes(data).hex(' ')}")
+            cont = input(f"Positive response received for address 0x{address:0{mem_addr_len * 2}X}. "
+                         f"Continue scanning? (y/n): ").strip().lower()
+        return cont.startswith('y')
+
+    try:
+        results = scan_memory_by_address(stack, start_address, end_address, mem_size, mem_addr_len, mem_size_len,
+                                         timeout=timeout, on_hit=prompt_on_hit, reporter=reporter)
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt received. Aborting memory scan.")
+        return []
 
     if results:
         print("\nMemory scan results:")
-        mem_addr_len = 4  # Default value from scan_memory_by_address
         for addr, req, responses in results:
             print(f"Address 0x{addr:0{mem_addr_len * 2}X}:")
             for r in responses:
@@ -0,0 +1,146 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import can
+import isotp
+from .transport import isotp_params
+from .utils import can_filters_for, flow_control_for, bus_is_fd
+
+"""
+Runs scans against several ECUs on one CAN bus at the same time.
+
+Each ECU gets its own ISO-TP stack fed by a shared can.Notifier, so the stacks
+never steal each other's frames, and its own worker thread, so a slow ECU does
+not hold back the others.
+"""
+
+
+def tester_id_for(ecu_id):
+    """
+    Derives the physical request ID for an ECU from the ID it responds on.
+
+    11-bit ECUs conventionally respond on their request ID + 8 (e.g. 0x7E8 -> 0x7E0).
+    29-bit normal fixed addressing swaps the target and source bytes
+    (e.g. 0x18DAF110 -> 0x18DA10F1).
+
+    Args:
+        ecu_id (int): The arbitration ID the ECU responds on.
+
+    Returns:
+        int: The arbitration ID to send physical requests on.
+    """
+    if ecu_id > 0x7FF:
+        source = ecu_id & 0xFF
+        target = (ecu_id >> 8) & 0xFF
+        return (ecu_id & 0xFFFF0000) | (source << 8) | target
+    return ecu_id - 8
+
+
+def open_ecu_stacks(bus, ecu_ids, stmin=None, blocksize=None, tester_ids=None):
+    """
+    Creates and starts one ISO-TP stack per ECU on a shared bus. On a CAN FD bus the
+    stacks send 64-byte frames.
+
+    Args:
+        bus: The CAN bus instance.
+        ecu_ids (list): Arbitration IDs the ECUs respond on.
+        stmin (int): Separation time minimum (default: each ECU's calibrated value, or 0).
+        blocksize (int): Block size (default: each ECU's calibrated value, or 8).
+        tester_ids (dict): Known {ecu_id: tester_id} pairs, e.g. from discover_ecus();
+                           other ECUs use tester_id_for().
+
+    Returns:
+        tuple: (notifier, {ecu_id: stack}). Pass both to close_ecu_stacks() when done.
+    """
+    notifier = can.Notifier(bus, [])
+    fd = bus_is_fd(bus)
+    stacks = {}
+    for ecu_id in ecu_ids:
+        tester_id = (tester_ids or {}).get(ecu_id) or tester_id_for(ecu_id)
+        if ecu_id > 0x7FF:
+            addressing_mode = isotp.AddressingMode.Normal_29bits
+        else:
+            addressing_mode = isotp.AddressingMode.Normal_11bits
+        address = isotp.Address(addressing_mode, txid=tester_id, rxid=ecu_id)
+        ecu_stmin, ecu_blocksize = flow_control_for(tester_id, ecu_id, stmin, blocksize)
+        stack = isotp.NotifierBasedCanStack(bus=bus, notifier=notifier, address=address,
+                                            params=isotp_params(ecu_stmin, ecu_blocksize, fd))
+        stack.start()
+        stacks[ecu_id] = stack
+    return notifier, stacks
+
+
+def close_ecu_stacks(notifier, stacks):
+    """Stops the per-ECU stacks and detaches the notifier from the bus."""
+    for stack in stacks.values():
+        stack.stop()
+    notifier.stop()
+
+
+def scan_ecus(bus, ecu_ids, scan, max_workers=None, tester_ids=None):
+    """
+    Runs the same scan against every ECU concurrently and merges the results.
+
+    Args:
+        bus: The CAN bus instance.
+        ecu_ids (list): Arbitration IDs the ECUs respond on.
+        scan (callable): Called as scan(stack, stop) in a worker thread for each ECU; its return
+                         value becomes that ECU's entry in the report. stop is a threading.Event
+                         set on Ctrl+C, which the scan should check between requests (see the
+                         stop argument of did_scan.scan_dids and rid_scan.scan_rids).
+        max_workers (int): Maximum number of ECUs scanned at once (default: all of them).
+        tester_ids (dict): Known {ecu_id: tester_id} pairs (see open_ecu_stacks()).
+
+    Returns:
+        dict: Maps each ECU ID to its scan result, or to the exception that ended its scan.
+              After Ctrl+C it holds the partial results of the scans that had started.
+    """
+    if not ecu_ids:
+        return {}
+    previous_filters = bus.filters
+    bus.set_filters(can_filters_for(ecu_ids))  # only the ECUs' responses reach the stacks
+    notifier, stacks = open_ecu_stacks(bus, ecu_ids, tester_ids=tester_ids)
+    report = {}
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(stacks))
+    try:
+        futures = {ecu_id: pool.submit(scan, stack, stop) for ecu_id, stack in stacks.items()}
+        try:
+            wait(futures.values())
+        except KeyboardInterrupt:
+            print("\nKeyboard interrupt received. Stopping the ECU scans.")
+            stop.set()
+        pool.shutdown(cancel_futures=True)
+        for ecu_id, future in futures.items():
+            if future.cancelled():
+                continue
+            try:
+                report[ecu_id] = future.result()
+            except Exception as e:
+                report[ecu_id] = e
+    finally:
+        stop.set()
+        pool.shutdown()
+        close_ecu_stacks(notifier, stacks)
+        bus.set_filters(previous_filters)
+    return report
+
+
+def print_report(report, label="ID", tester_ids=None):
+    """
+    Prints the merged per-ECU results of scan_ecus().
+
+    Args:
+        report (dict): {ecu_id: {identifier: data}} as returned by scan_ecus().
+        label (str): Name of the identifier type, e.g. "DID" or "RID".
+        tester_ids (dict): Known {ecu_id: tester_id} pairs (see open_ecu_stacks()).
+    """
+    for ecu_id, result in sorted(report.items()):
+        print(f"\nECU {hex(ecu_id)} (tester {hex((tester_ids or {}).get(ecu_id) or tester_id_for(ecu_id))}):")
+        if isinstance(result, Exception):
+            print(f"  Scan failed: {result}")
+        elif not result:
+            print("  No positive responses.")
+        else:
+            for identifier, data in sorted(result.items()):
+                data = bytes(data)
+                print(f"  {label} 0x{identifier:04X}: {data.hex(' ')}  ascii: {data.decode('ascii', errors='replace')}")
@@ -0,0 +1,179 @@
+import json
+import os
+from importlib import resources
+
+"""
+Priority-ordered scan plans built from identifier dictionaries.
+
+A dictionary is a JSON file listing ranges of DIDs or RIDs with a priority, and
+names and decoders for single identifiers:
+
+    {"kind": "did",
+     "ranges": [{"start": "F180", "end": "F19F", "priority": 100, "name": "ISO 14229-1 identification"}],
+     "identifiers": {"F190": {"name": "VIN", "decoder": "ascii"}}}
+
+Dictionaries for DIDs and RIDs are bundled with the package. Files in
+~/.zoods/dictionaries/<kind>*.json and files given on the command line are merged on
+top; their names and decoders replace bundled ones. A ScanPlan orders the identifiers
+of a scan range by range priority, highest first, so the high-yield identifiers are
+probed in the first minutes of a sweep. Identifiers outside every range follow,
+unless the scan is limited to a minimum priority.
+
+A range marked "unsafe": true holds identifiers whose use can damage the ECU or the
+vehicle, e.g. RIDs that erase memory or deploy airbags. They are probed last, and
+RID scans that start routines leave them out unless unsafe probes are allowed.
+"""
+
+USER_DICTIONARY_DIR = os.path.join(os.path.expanduser("~"), ".zoods", "dictionaries")
+
+
+def _decode_bcd(data):
+    return "".join(f"{byte >> 4:X}{byte & 0x0F:X}" for byte in data)
+
+
+DECODERS = {
+    "ascii": lambda data: data.decode('ascii', errors='replace').strip("\x00 "),
+    "hex": lambda data: data.hex(),
+    "uint": lambda data: str(int.from_bytes(data, byteorder='big')) if data else "",
+    "bcd": _decode_bcd,
+}
+
+
+class ScanPlan:
+    """
+    Identifier ranges with priorities, and names and decoders for single identifiers.
+
+    Args:
+        kind (str): What the plan scans, "did" or "rid".
+        ranges (list): (start, end, priority, name, unsafe) tuples, end inclusive.
+        identifiers (dict): Identifier -> (name, decoder), decoder a key of DECODERS.
+    """
+
+    def __init__(self, kind, ranges=(), identifiers=None):
+        self.kind = kind
+        self.ranges = list(ranges)
+        self.identifiers = dict(identifiers or {})
+
+    def merge(self, dictionary):
+        """Adds the ranges and identifiers of a parsed dictionary file; its identifiers replace existing ones."""
+        for entry in dictionary.get("ranges", []):
+            self.ranges.append((int(entry["start"], 16), int(entry["end"], 16), int(entry.get("priority", 0)),
+                                entry.get("name", ""), bool(entry.get("unsafe", False))))
+        for identifier, entry in dictionary.get("identifiers", {}).items():
+            decoder = entry.get("decoder", "hex")
+            if decoder not in DECODERS:
+                raise ValueError(f"Unknown decoder '{decoder}' for {identifier}, expected one of: {', '.join(DECODERS)}")
+            self.identifiers[int(identifier, 16)] = (entry.get("name", ""), decoder)
+
+    def ordered_ids(self, start=0x0000, end=0xFFFF, min_priority=None):
+        """
+        Returns the identifiers from start to end (inclusive), highest priority range first.
+
+        Ranges of equal priority keep their dictionary order; identifiers in several ranges are
+        probed once, at their highest priority. Identifiers in unsafe ranges come last, after the
+        identifiers outside every range, and are left out with a minimum priority.
+
+        Args:
+            start (int): First identifier of the scan.
+            end (int): Last identifier of the scan.
+            min_priority (int): Only probe ranges with at least this priority. None probes every
+                                identifier, those outside all ranges last and in ascending order.
+
+        Returns:
+            list: The identifiers in scan order.
+        """
+        ordered = []
+        unsafe = self.unsafe_ids(start, end)
+        seen = set(unsafe)
+        for low, high, priority, _, _ in sorted(self.ranges, key=lambda item: -item[2]):
+            if min_priority is not None and priority < min_priority:
+                continue
+            for identifier in range(max(low, start), min(high, end) + 1):
+                if identifier not in seen:
+                    seen.add(identifier)
+                    ordered.append(identifier)
+        if min_priority is None:
+            ordered.extend(identifier for identifier in range(start, end + 1) if identifier not in seen)
+            ordered.extend(sorted(unsafe))
+        return ordered
+
+    def unsafe_ids(self, start=0x0000, end=0xFFFF):
+        """Returns the set of identifiers from start to end (inclusive) in unsafe ranges."""
+        return {identifier for low, high, _, _, unsafe in self.ranges if unsafe
+                for identifier in range(max(low, start), min(high, end) + 1)}
+
+    def range_name(self, identifier):
+        """Returns the name of the highest priority range containing the identifier, or ''."""
+        matches = [(priority, name) for low, high, priority, name, _ in self.ranges if low <= identifier <= high]
+        return max(matches, key=lambda match: match[0])[1] if matches else ""
+
+    def describe(self, identifier, data):
+        """
+        Names and decodes a hit.
+
+        Returns:
+            tuple: (name, value) with the identifier's name (or the name of its range) and its
+                   data decoded with the identifier's decoder (hex for unknown identifiers).
+        """
+        name, decoder = self.identifiers.get(identifier, (self.range_name(identifier), "hex"))
+        return name, DECODERS[decoder](bytes(data))
+
+
+def load_plan(kind, paths=(), user_dir=None):
+    """
+    Loads the scan plan for DIDs or RIDs.
+
+    Args:
+        kind (str): "did" or "rid".
+        paths (list): Additional dictionary files, merged last.
+        user_dir (str): Directory searched for <kind>*.json dictionaries (default USER_DICTIONARY_DIR).
+
+    Returns:
+        ScanPlan: The bundled dictionary merged with the user dictionaries.
+
+    Raises:
+        ValueError: If a dictionary is malformed or belongs to another kind.
+        OSError: If a dictionary file cannot be read.
+    """
+    plan = ScanPlan(kind)
+    bundled = resources.files(__package__).joinpath("dictionaries", f"{kind}.json")
+    plan.merge(json.loads(bundled.read_text()))
+    user_dir = user_dir or USER_DICTIONARY_DIR
+    user_files = []
+    if os.path.isdir(user_dir):
+        user_files = sorted(os.path.join(user_dir, name) for name in os.listdir(user_dir)
+                            if name.startswith(kind) and name.endswith(".json"))
+    for path in user_files + list(paths):
+        with open(path) as f:
+            try:
+                dictionary = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"Dictionary {path} is not valid JSON: {e}")
+        if dictionary.get("kind", kind) != kind:
+            raise ValueError(f"Dictionary {path} is for {dictionary['kind']}s, not {kind}s")
+        try:
+            plan.merge(dictionary)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Dictionary {path} is malformed: {e}")
+    return plan
+
+
+def hit_limit(on_hit, max_hits):
+    """
+    Wraps an on_hit callback so the scan stops after max_hits hits.
+
+    Args:
+        on_hit (callable): Callback to wrap, or None.
+        max_hits (int): Hits after which the scan stops; None or 0 for no limit.
+    """
+    if not max_hits:
+        return on_hit
+    count = 0
+
+    def callback(identifier, data):
+        nonlocal count
+        count += 1
+        if on_hit and on_hit(identifier, data) is False:
+            return False
+        return count < max_hits
+    return callback
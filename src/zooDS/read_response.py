@@ -1,3 +1,13 @@
+"""
+UDS response frames and negative response codes.
+
+send_and_collect() wraps every final response in a UDSResponse, a read-only view of
+the received frame: the service, NRC and echoed identifier are read from the frame
+bytes in place, and the payload after the echoed header is a memoryview, so a
+response is never copied or converted to hex and back to get at its data. Hex and
+ASCII renderings are only built when asked for.
+"""
+
 # Dictionary mapping standard UDS negative response codes (NRC) to their text descriptions.
 NEGATIVE_RESPONSE_CODES = {
     0x10: "General Reject",
@@ -22,6 +32,156 @@ NEGATIVE_RESPONSE_CODES = {
     0x7F: "Service Not Supported In Active Session"
 }
 
+# Echoed request fields of positive responses: response SID -> (identifier offset,
+# identifier length, header length). The payload starts after the header.
+ECHOED_FIELDS = {
+    0x50: (1, 1, 2),  # DiagnosticSessionControl: session
+    0x51: (1, 1, 2),  # ECUReset: reset type
+    0x59: (1, 1, 2),  # ReadDTCInformation: report type
+    0x62: (1, 2, 3),  # ReadDataByIdentifier: first DID
+    0x67: (1, 1, 2),  # SecurityAccess: level
+    0x68: (1, 1, 2),  # CommunicationControl: control type
+    0x6E: (1, 2, 3),  # WriteDataByIdentifier: DID
+    0x6F: (1, 2, 3),  # InputOutputControlByIdentifier: DID
+    0x71: (2, 2, 4),  # RoutineControl: RID, after the sub-function
+    0x76: (1, 1, 2),  # TransferData: block sequence counter
+    0x7E: (1, 1, 2),  # TesterPresent: sub-function
+    0xC5: (1, 1, 2),  # ControlDTCSetting: setting type
+}
+# Positive responses whose echoed identifier is a sub-function. Requests may set its
+# suppressPosRspMsgIndicationBit (0x80), which the response does not echo.
+SUB_FUNCTION_ECHOES = (0x50, 0x51, 0x59, 0x67, 0x68, 0x7E, 0xC5)
+
+
+class UDSResponse:
+    """
+    A received UDS response frame, decoded lazily from a memoryview of its bytes.
+
+    It behaves like the bytes of the frame: indexing returns ints, slicing returns bytes,
+    and len(), bytes(), iteration, hex() and comparison with bytes work as they do on bytes.
+
+    Args:
+        frame (bytes, bytearray or memoryview): The reassembled response frame.
+    """
+
+    __slots__ = ("_view",)
+
+    def __init__(self, frame):
+        self._view = frame if isinstance(frame, memoryview) else memoryview(frame)
+
+    @property
+    def raw(self):
+        """The whole frame as a memoryview."""
+        return self._view
+
+    @property
+    def negative(self):
+        """True for a negative response [0x7F, SID, NRC]."""
+        return len(self._view) > 0 and self._view[0] == 0x7F
+
+    @property
+    def positive(self):
+        """True for a non-empty frame that is not a negative response."""
+        return len(self._view) > 0 and self._view[0] != 0x7F
+
+    @property
+    def sid(self):
+        """The service ID of the request this frame answers, or None for an empty frame."""
+        if self.negative:
+            return self._view[1] if len(self._view) > 1 else None
+        return (self._view[0] - 0x40) & 0xFF if self._view else None
+
+    @property
+    def nrc(self):
+        """The negative response code, or None for a positive or malformed response."""
+        return self._view[2] if self.negative and len(self._view) > 2 else None
+
+    @property
+    def header_length(self):
+        """Bytes before the payload: the response SID and the echoed request fields."""
+        if self.negative:
+            return min(3, len(self._view))
+        fields = ECHOED_FIELDS.get(self._view[0]) if self._view else None
+        return min(fields[2], len(self._view)) if fields else min(1, len(self._view))
+
+    @property
+    def identifier(self):
+        """
+        The identifier echoed by a positive response (DID, RID, session, level, ...), or None.
+        A multi-DID ReadDataByIdentifier response echoes its first DID here.
+        """
+        fields = ECHOED_FIELDS.get(self._view[0]) if self.positive else None
+        if not fields or len(self._view) < fields[0] + fields[1]:
+            return None
+        offset, length, _ = fields
+        return int.from_bytes(self._view[offset:offset + length], byteorder='big')
+
+    @property
+    def payload(self):
+        """The data after the header as a memoryview of the frame (empty for negative responses)."""
+        return self._view[self.header_length:]
+
+    @property
+    def ascii(self):
+        """The payload decoded as ASCII, with undecodable bytes replaced."""
+        return str(self.payload, 'ascii', errors='replace')
+
+    def answers(self, request):
+        """
+        True if this frame answers the request: it is for the request's service and, if positive,
+        echoes the request's identifier. Negative responses echo no identifier, so they match any
+        request for their service. A ReadDataByIdentifier response may start with any requested
+        DID, since the ECU leaves out the ones it does not support.
+
+        Args:
+            request (bytes): The UDS request that was sent.
+        """
+        if not request or self.sid != request[0]:
+            return False
+        fields = ECHOED_FIELDS.get(self._view[0]) if self.positive else None
+        if not fields or len(self._view) < fields[0] + fields[1] or len(request) < fields[0] + fields[1]:
+            return True
+        offset, length, _ = fields
+        echoed = self._view[offset:offset + length]
+        if self._view[0] == 0x62:
+            return any(echoed == request[i:i + 2] for i in range(1, len(request) - 1, 2))
+        expected = bytearray(request[offset:offset + length])
+        if self._view[0] in SUB_FUNCTION_ECHOES:
+            expected[0] &= 0x7F
+        return echoed == expected
+
+    def hex(self, *args):
+        """The whole frame in hex, with the arguments of bytes.hex() (e.g. a separator)."""
+        return self._view.hex(*args)
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view[index].tobytes()
+        return self._view[index]
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def __bytes__(self):
+        return self._view.tobytes()
+
+    def __eq__(self, other):
+        if isinstance(other, UDSResponse):
+            other = other._view
+        try:
+            return self._view == other
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self._view.tobytes())
+
+    def __repr__(self):
+        return f"UDSResponse({self._view.hex(' ')})"
+
 
 def is_negative_response(response):
     """Determines if the provided UDS response is a negative response.
@@ -30,30 +190,30 @@ def is_negative_response(response):
     return len(response) > 0 and response[0] == 0x7F
 
 
-def process_ecu_response(response: bytes) -> str:
+def process_ecu_response(response) -> str:
     """Processes a UDS response and compares it against standard negative response codes.
 
     The UDS negative response format is:
         [0x7F, <original service id>, <negative response code>]
 
+    response: A UDSResponse, or the frame bytes.
+
     return: A text description of the negative response if one is detected.
-             If the response is not negative, returns an empty string.
+             If the response is not negative, returns "Positive Response".
              If the response is malformed, returns a suitable error message."""
     if not response:
         return "No response received."
+    if not isinstance(response, UDSResponse):
+        response = UDSResponse(response)
 
-    # Check if it is a negative response (first byte should be 0x7F).
-    if response[0] != 0x7F:
+    if response.positive:
         return "Positive Response"
 
-    # Ensure response has enough bytes to extract the negative response code.
-    if len(response) < 3:
+    # The negative response code is the third byte.
+    nrc = response.nrc
+    if nrc is None:
         return "Malformed negative response."
-
-    # The negative response code is typically in the third byte.
-    nrc = response[2]
-    description = NEGATIVE_RESPONSE_CODES.get(nrc, f"Unknown negative response code: {nrc:02X}")
-    return description
+    return NEGATIVE_RESPONSE_CODES.get(nrc, f"Unknown negative response code: {nrc:02X}")
 
 
 if __name__ == "__main__":
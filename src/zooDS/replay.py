@@ -0,0 +1,168 @@
+import can
+from .did_scan import split_did_records
+from .read_response import UDSResponse, is_negative_response
+from .utils import process_ecu_response, is_response_to
+
+"""
+Offline analysis of captured CAN traces.
+
+A trace written by capture.py (or any BLF/ASC/candump log) is read back, the ISO-TP
+frames of a tester/ECU pair are reassembled into UDS messages, and every request is
+paired with the ECU's final response to it. Scan results (DID, RID and memory hits)
+can then be re-derived from the trace without bus time.
+"""
+
+# Services whose positive responses are scan hits, with the kind the sinks record them as.
+HIT_KINDS = {0x22: "did", 0x23: "mem", 0x31: "rid"}
+
+
+class IsoTpReassembler:
+    """
+    Reassembles ISO-TP (ISO 15765-2) messages from the frames of one arbitration ID.
+
+    Frames are taken as they were logged, so no flow control is sent and no timers run;
+    a consecutive frame out of sequence discards the message in progress.
+    """
+
+    def __init__(self):
+        self.buffer = None
+        self.length = 0
+        self.sequence = 0
+
+    def feed(self, data):
+        """
+        Feeds the payload of one CAN frame.
+
+        Returns:
+            bytes: The completed message, or None if the frame did not complete one.
+        """
+        if not data:
+            return None
+        frame_type = data[0] >> 4
+        if frame_type == 0x0:  # single frame; CAN FD frames over 8 bytes carry the length in byte 1
+            length = data[0] & 0x0F
+            if length == 0 and len(data) > 8:
+                return bytes(data[2:2 + data[1]])
+            return bytes(data[1:1 + length])
+        if frame_type == 0x1:  # first frame; a 12-bit length of 0 escapes to a 32-bit length
+            length = ((data[0] & 0x0F) << 8) | data[1]
+            start = 2
+            if length == 0:
+                length = int.from_bytes(data[2:6], byteorder='big')
+                start = 6
+            self.buffer = bytearray(data[start:])
+            self.length = length
+            self.sequence = 1
+            return None
+        if frame_type == 0x2 and self.buffer is not None:  # consecutive frame
+            if data[0] & 0x0F != self.sequence:
+                self.buffer = None
+                return None
+            self.sequence = (self.sequence + 1) & 0x0F
+            self.buffer += data[1:]
+            if len(self.buffer) >= self.length:
+                message = bytes(self.buffer[:self.length])
+                self.buffer = None
+                return message
+        return None  # flow control frames and stray consecutive frames
+
+
+def read_messages(path, tester_id, ecu_id):
+    """
+    Reassembles the UDS messages of a tester/ECU pair from a trace.
+
+    Args:
+        path (str): Trace file (.blf, .asc, .log, ...).
+        tester_id (int): Tester (request) ID.
+        ecu_id (int): ECU (response) ID.
+
+    Yields:
+        tuple: (timestamp, arbitration_id, message) in trace order.
+    """
+    reassemblers = {tester_id: IsoTpReassembler(), ecu_id: IsoTpReassembler()}
+    for msg in can.LogReader(path):
+        reassembler = reassemblers.get(msg.arbitration_id)
+        if reassembler is None or msg.is_error_frame or msg.is_remote_frame:
+            continue
+        message = reassembler.feed(msg.data)
+        if message is not None:
+            yield msg.timestamp, msg.arbitration_id, message
+
+
+def replay_transactions(path, tester_id, ecu_id):
+    """
+    Pairs every request in a trace with the ECU's final response to it.
+
+    Response Pending (0x78) frames are skipped; a request repeated after a Busy (0x21) answer
+    is reported as a new transaction.
+
+    Yields:
+        tuple: (timestamp, request, response), response a UDSResponse, or None if the ECU did not
+               answer before the next request.
+    """
+    pending = None
+    for timestamp, arbitration_id, message in read_messages(path, tester_id, ecu_id):
+        if arbitration_id == tester_id:
+            if pending:
+                yield pending[0], pending[1], None
+            pending = (timestamp, message)
+        elif pending and is_response_to(message, pending[1][0]):
+            if is_negative_response(message) and len(message) > 2 and message[2] == 0x78:
+                continue
+            yield pending[0], pending[1], UDSResponse(message)
+            pending = None
+    if pending:
+        yield pending[0], pending[1], None
+
+
+def transaction_hits(request, response):
+    """
+    Returns the scan hits of a transaction as (kind, identifier, data) tuples.
+
+    DIDs of a multi-DID read are split into one hit each; memory hits are keyed by address.
+    """
+    if response is None or response.negative or request[0] not in HIT_KINDS:
+        return []
+    sid = request[0]
+    if sid == 0x22:
+        dids = [int.from_bytes(request[i:i + 2], byteorder='big') for i in range(1, len(request) - 1, 2)]
+        return [("did", did, data) for did, data in split_did_records(response[1:], dids).items()]
+    if sid == 0x31 and len(request) >= 4:
+        return [("rid", int.from_bytes(request[2:4], byteorder='big'), response)]
+    if sid == 0x23 and len(request) >= 2:
+        address_length = request[1] & 0x0F
+        return [("mem", int.from_bytes(request[2:2 + address_length], byteorder='big'), response.payload)]
+    return []
+
+
+def replay(path, tester_id, ecu_id, on_hit=None, verbose=False):
+    """
+    Re-derives scan results from a trace and prints a summary of the ECU's responses.
+
+    Args:
+        path (str): Trace file.
+        tester_id (int): Tester (request) ID.
+        ecu_id (int): ECU (response) ID.
+        on_hit (callable): Called as on_hit(kind, identifier, data) for every hit.
+        verbose (bool): Print every transaction with its classified response.
+
+    Returns:
+        dict: Counts of "requests", "hits", "negative" and "no response" transactions.
+    """
+    counts = {"requests": 0, "hits": 0, "negative": 0, "no response": 0}
+    for timestamp, request, response in replay_transactions(path, tester_id, ecu_id):
+        counts["requests"] += 1
+        if response is None:
+            counts["no response"] += 1
+            outcome = "no response"
+        else:
+            if response.negative:
+                counts["negative"] += 1
+            outcome = f"{response.hex()} {process_ecu_response(response)}"
+        if verbose:
+            print(f"{timestamp:.6f} {request.hex()} -> {outcome}")
+        for kind, identifier, data in transaction_hits(request, response):
+            counts["hits"] += 1
+            if on_hit:
+                on_hit(kind, identifier, data)
+    return counts
@@ -0,0 +1,192 @@
+import contextlib
+import time
+from collections import Counter
+from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, ProgressColumn, TextColumn, TimeRemainingColumn
+from rich.text import Text
+from .utils import process_ecu_response
+
+"""
+Scan progress reporting.
+
+Scanners send one event per request to a reporter instead of printing, so the console
+is never on the critical path of a sweep. ScanReporter only counts events and can log
+per-request detail to a buffered file; ProgressReporter adds a live display that rich
+redraws at a fixed rate from its own thread.
+"""
+
+
+class ScanReporter:
+    """
+    Counts scan events and optionally logs every request. Writes nothing to the console.
+
+    Args:
+        log_path (str): File to append one line per request to (verbose mode), if given.
+        buffer_size (int): Bytes buffered before the log is written to disk.
+
+    Attributes:
+        requests (int): Requests sent since start().
+        hits (int): Identifiers with a positive response.
+        no_response (int): Requests the ECU did not answer.
+        nrcs (Counter): Negative responses by NRC.
+    """
+
+    def __init__(self, log_path=None, buffer_size=1 << 16):
+        self._log = open(log_path, "a", buffering=buffer_size) if log_path else None
+        self.kind = None
+        self.total = None
+        self._reset()
+
+    def _reset(self):
+        self.requests = 0
+        self.hits = 0
+        self.no_response = 0
+        self.nrcs = Counter()
+        self.started = time.monotonic()
+
+    def start(self, kind, total=None):
+        """
+        Starts reporting a scan.
+
+        Args:
+            kind (str): What is scanned, e.g. "did", "rid" or "mem".
+            total (int): Units (identifiers or bytes) the scan will cover, if known.
+        """
+        self.kind = kind
+        self.total = total
+        self._reset()
+
+    def probe(self, kind, identifier, response, units=1, hits=None):
+        """
+        Reports one request.
+
+        Args:
+            kind (str): What was scanned.
+            identifier (int): DID, RID or address of the request.
+            response (UDSResponse): The final response, or None if the ECU did not answer.
+            units (int): Identifiers or bytes the request settled (0 if it will be retried).
+            hits (int): Identifiers found by the request (default: 1 for a positive response).
+        """
+        self.requests += 1
+        if response is None:
+            self.no_response += 1
+            outcome = "no response"
+        elif response.negative:
+            self.nrcs[response.nrc] += 1
+            outcome = f"{response.hex()} {process_ecu_response(response)}" if self._log else ""
+        else:
+            self.hits += 1 if hits is None else hits
+            outcome = response.hex() if self._log else ""
+        if self._log:
+            self._log.write(f"{time.time():.3f} {kind} 0x{identifier:04X} {outcome}\n")
+
+    def note(self, text):
+        """Reports an occasional message, e.g. an aborted scan."""
+        if self._log:
+            self._log.write(f"{time.time():.3f} {text}\n")
+
+    def rate(self):
+        """Requests per second since start()."""
+        elapsed = time.monotonic() - self.started
+        return self.requests / elapsed if elapsed > 0 else 0.0
+
+    def nrc_breakdown(self):
+        """Returns the NRC counts as text, most frequent first, e.g. '31:1200 33:4'."""
+        return " ".join(f"{nrc:02X}:{count}" if nrc is not None else f"??:{count}"
+                        for nrc, count in self.nrcs.most_common())
+
+    def summary(self):
+        return (f"{self.requests} request(s), {self.hits} hit(s), {self.no_response} without response, "
+                f"{self.rate():.0f} req/s" + (f", NRC {self.nrc_breakdown()}" if self.nrcs else ""))
+
+    def finish(self):
+        """Ends the scan started with start()."""
+        if self._log:
+            self._log.write(f"{time.time():.3f} {self.kind} finished: {self.summary()}\n")
+            self._log.flush()
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """Context for prompting the user in the middle of a scan."""
+        yield
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+
+class _StatsColumn(ProgressColumn):
+    """Progress column with the request rate, hit count and NRC breakdown of a reporter."""
+
+    def __init__(self, reporter):
+        super().__init__()
+        self.reporter = reporter
+
+    def render(self, task):
+        reporter = self.reporter
+        text = f"{reporter.rate():6.0f} req/s  hits {reporter.hits}"
+        if reporter.no_response:
+            text += f"  silent {reporter.no_response}"
+        if reporter.nrcs:
+            text += f"  NRC {reporter.nrc_breakdown()}"
+        return Text(text)
+
+
+class ProgressReporter(ScanReporter):
+    """
+    Shows a live progress bar with ETA, request rate, hits and NRC breakdown on stderr.
+
+    Events only update counters; rich redraws the display refresh_per_second times from
+    its own thread, so a fast scan does not wait on the terminal.
+
+    Args:
+        log_path (str): File to append one line per request to, if given.
+        console (rich.console.Console): Console to draw on (default: stderr).
+        refresh_per_second (float): Display refresh rate.
+    """
+
+    def __init__(self, log_path=None, console=None, refresh_per_second=4):
+        super().__init__(log_path)
+        self.console = console or Console(stderr=True)
+        self.refresh_per_second = refresh_per_second
+        self.progress = None
+        self.task = None
+
+    def start(self, kind, total=None):
+        super().start(kind, total)
+        if self.progress:
+            self.progress.stop()
+        self.progress = Progress(TextColumn(f"{kind.upper()} scan"), BarColumn(), MofNCompleteColumn(),
+                                 TimeRemainingColumn(), _StatsColumn(self), console=self.console,
+                                 refresh_per_second=self.refresh_per_second)
+        self.task = self.progress.add_task(kind, total=total)
+        self.progress.start()
+
+    def probe(self, kind, identifier, response, units=1, hits=None):
+        super().probe(kind, identifier, response, units, hits)
+        if self.progress and units:
+            self.progress.advance(self.task, units)
+
+    def note(self, text):
+        super().note(text)
+        self.console.print(text)
+
+    def finish(self):
+        super().finish()
+        if self.progress:
+            self.progress.stop()
+            self.progress = None
+        self.console.print(f"{self.kind.upper()} scan: {self.summary()}")
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """Hides the live display while the user is prompted."""
+        if self.progress is None:
+            yield
+            return
+        self.progress.stop()
+        try:
+            yield
+        finally:
+            self.progress.start()
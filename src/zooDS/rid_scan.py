@@ -1,45 +1,224 @@
-from .utils import wait_for_responses, process_ecu_response
+import time
+from .plans import load_plan
+from .reporting import ProgressReporter, ScanReporter
+from .utils import send_and_collect, process_ecu_response
 
-def scan_rid(rid, stack, timeout=0.3):
+# RoutineControl sub-functions. StartRoutine runs the routine; StopRoutine and
+# RequestRoutineResults probe a RID without running it.
+START_ROUTINE = 0x01
+STOP_ROUTINE = 0x02
+REQUEST_ROUTINE_RESULTS = 0x03
+SUB_FUNCTIONS = {"start": START_ROUTINE, "stop": STOP_ROUTINE, "results": REQUEST_ROUTINE_RESULTS}
+
+# RID classes reported by classify_rid.
+RID_PRESENT = "present"
+RID_ABSENT = "absent"
+RID_UNKNOWN = "unknown"
+
+# NRCs an ECU only sends after it has found the RID supported (ISO 14229-1 checks the RID
+# before security, sequence and conditions): Conditions Not Correct, Request Sequence Error
+# (e.g. results of a routine never started) and Security Access Denied. Sub-Function Not
+# Supported is left out: an ECU without the sub-function sends it for every RID.
+RID_PRESENT_NRCS = (0x22, 0x24, 0x33)
+# NRCs meaning the service or sub-function is not available in the active session.
+SESSION_NRCS = (0x7E, 0x7F)
+
+def scan_rid(rid, stack, timeout=0.3, sub_function=START_ROUTINE):
+    """
+    Sends a RoutineControl (0x31) request for the given RID.
+
+    Args:
+        rid (int): Routine identifier.
+        stack: The iso-tp communication interface.
+        timeout (float): Time in seconds to wait for responses.
+        sub_function (int): START_ROUTINE, STOP_ROUTINE or REQUEST_ROUTINE_RESULTS.
     """
-    Sends a RoutineControl (0x31) request for the given RID using the "StartRoutine" sub-function.
+    # Build UDS request: 0x31 (RoutineControl), sub-function, followed by the 2-byte RID.
+    request = bytes([0x31, sub_function, (rid >> 8) & 0xFF, rid & 0xFF])
+    return send_and_collect(stack, request, timeout)
+
+def classify_rid(response):
     """
-    # Build UDS request: 0x31 (RoutineControl), 0x01 (StartRoutine), followed by the 2-byte RID.
-    request = bytes([0x31, 0x01, (rid >> 8) & 0xFF, rid & 0xFF])
-    print(f"\nSending RoutineControl (0x31, StartRoutine) for RID: 0x{rid:04X}")
-    stack.send(request)
+    Infers from a RoutineControl response whether the RID exists.
 
-    responses = wait_for_responses(stack, timeout)
-    for response in responses:
-        print(f"Received response for RID 0x{rid:04X}: {response.hex()}")
-    return responses
+    Args:
+        response (UDSResponse): The final response, or None if the ECU did not answer.
 
-def try_all_rids(stack, timeout=0.3):
+    Returns:
+        str: RID_PRESENT for a positive response or an NRC in RID_PRESENT_NRCS, RID_ABSENT for
+             NRC 0x31 (Request Out Of Range), RID_UNKNOWN otherwise (no response, or an NRC such
+             as 0x11, 0x12 or 0x7F that does not depend on the RID).
     """
-    Iterates through all possible 2-byte RIDs, sending a RoutineControl (StartRoutine) request for each.
-    Processes and prints responses, and if a positive response is received, pauses to ask the user
-    whether to continue scanning.
+    if response is None:
+        return RID_UNKNOWN
+    if response.positive:
+        return RID_PRESENT
+    nrc = response.nrc
+    if nrc == 0x31:
+        return RID_ABSENT
+    if nrc in RID_PRESENT_NRCS:
+        return RID_PRESENT
+    return RID_UNKNOWN
+
+def ecu_alive(stack, timeout=0.3):
+    """True if the ECU answers a Tester Present (0x3E) request, positively or not."""
+    return bool(send_and_collect(stack, b"\x3E\x00", timeout))
+
+def enter_session(stack, session, timeout=0.3):
+    """Requests a diagnostic session with DiagnosticSessionControl (0x10); True if the ECU accepts."""
+    responses = send_and_collect(stack, bytes([0x10, session]), timeout)
+    return bool(responses) and responses[0].positive
+
+def recover_ecu(stack, session=None, timeout=0.3, recovery_timeout=5.0):
+    """
+    Waits for an ECU to come back after a reset and re-enters the scan's session.
+
+    Args:
+        stack: The iso-tp communication interface.
+        session (int): Diagnostic session to re-enter, or None to stay in the default session.
+        timeout (float): Time in seconds to wait for each response.
+        recovery_timeout (float): Time in seconds the ECU has to answer Tester Present again.
+
+    Returns:
+        bool: True if the ECU answers again and, with a session, accepts it.
+    """
+    deadline = time.monotonic() + recovery_timeout
+    while not ecu_alive(stack, timeout):
+        if time.monotonic() >= deadline:
+            return False
+    return session is None or enter_session(stack, session, timeout)
+
+def scan_rids(stack, start=0x0000, end=0xFFFF, timeout=0.3, on_hit=None, checkpoint=None, on_result=None,
+              skip=(), reporter=None, ids=None, sub_function=REQUEST_ROUTINE_RESULTS, session=None,
+              detect_resets=True, recovery_timeout=5.0, stop=None):
     """
+    Scans RIDs from start to end with RoutineControl requests.
+
+    By default RIDs are probed with RequestRoutineResults, which does not run the routine;
+    whether a RID exists is inferred from the NRC (see classify_rid). StartRoutine runs every
+    supported routine and may reset the ECU.
+
+    If the ECU stops answering, even to Tester Present, it is taken to have reset: the scan
+    waits up to recovery_timeout for it, re-enters the session and probes the RID once more.
+    A RID that resets the ECU again is reported with no response. An NRC 0x7E/0x7F while
+    scanning in a session means the session dropped; it is re-entered the same way. Security
+    access lost in a reset is not restored.
+
+    Args:
+        stack: The iso-tp communication interface.
+        start (int): First RID to scan.
+        end (int): Last RID to scan (inclusive).
+        timeout (float): Time in seconds to wait for responses.
+        on_hit (callable): Called as on_hit(rid, response) for each RID classified as present.
+                           Returning False stops the scan.
+        checkpoint (ScanCheckpoint): Records the scan's progress and hits, if given.
+        on_result (callable): Called as on_result(rid, response) for every probed RID, with None
+                              if the ECU did not answer.
+        skip (container): RIDs not to probe, e.g. ones with a settled result in a ScanStore.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
+        ids (list): RIDs to scan in this order instead of start to end, e.g. from
+                    plans.ScanPlan.ordered_ids(). The checkpoint cursor is then a position in ids,
+                    and the scan continues from it.
+        sub_function (int): RoutineControl sub-function to probe with (see SUB_FUNCTIONS).
+        session (int): Diagnostic session to scan in; entered at the start and after a reset.
+        detect_resets (bool): When a RID gets no response, check with Tester Present whether the
+                              ECU is still there, and recover if it reset.
+        recovery_timeout (float): Time in seconds to wait for the ECU after a reset.
+        stop (threading.Event): Ends the scan before the next request once set, e.g. from another thread.
+
+    Returns:
+        dict: Maps each RID classified as present to its response frame.
+    """
+    hits = {}
+    reporter = reporter or ScanReporter()
+    order = range(start, end + 1) if ids is None else ids
+    first = checkpoint.cursor if checkpoint and ids is not None else 0
+
+    def lost(response):
+        """Returns why the ECU stopped serving the scan ("reset" or "session"), or None."""
+        if response is None:
+            return "reset" if detect_resets and not ecu_alive(stack, timeout) else None
+        if session is not None and response.nrc in SESSION_NRCS:
+            return "session"
+        return None
+
+    def probe(rid):
+        responses = scan_rid(rid, stack, timeout, sub_function)
+        return responses[0] if responses else None
+
+    if session is not None and not enter_session(stack, session, timeout):
+        reporter.note(f"ECU did not accept session 0x{session:02X}; scanning in the current session.")
+    reporter.start("rid", sum(1 for rid in order[first:] if rid not in skip))
     try:
-        for rid in range(0x0000, 0x10000):
-            responses = scan_rid(rid, stack, timeout)
-            if responses:
-                # Positive response assumed if first byte is not 0x7F.
-                if responses[0][0] != 0x7F:
-                    for r in responses:
-                        processed = process_ecu_response(r)
-                        print(f"    {processed}")
-                        print(f"    {r.hex(' ')}")
-                        data = r.hex()[6:]
-                        decoded = bytearray.fromhex(data).decode('ascii', errors='replace')
-                        print(f"    Data: {data}")
-                        print(f"    Decoded data: {decoded}\n")
-                    cont = input("Positive response received for RID 0x{0:04X}. Continue scanning RIDs? (y/n): ".format(rid)).strip().lower()
-                    if not cont.startswith('y'):
-                        print("exiting RID scan")
+        for position in range(first, len(order)):
+            if stop is not None and stop.is_set():
+                break
+            rid = order[position]
+            if rid in skip:
+                continue
+            response = probe(rid)
+            cause = lost(response)
+            if cause:
+                reporter.note(f"ECU {'reset' if cause == 'reset' else 'left the session'} after RID 0x{rid:04X}, recovering.")
+                if not recover_ecu(stack, session, timeout, recovery_timeout):
+                    reporter.note("ECU did not come back; stopping the RID scan.")
+                    break
+                response = probe(rid)
+                if lost(response):
+                    reporter.note(f"RID 0x{rid:04X} resets the ECU; skipping it.")
+                    if not recover_ecu(stack, session, timeout, recovery_timeout):
+                        reporter.note("ECU did not come back; stopping the RID scan.")
                         break
-                else:
-                    error_msg = process_ecu_response(responses[0])
-                    print(f"Negative response for RID 0x{rid:04X}: {error_msg}\n")
+                    response = None
+            reporter.probe("rid", rid, response)
+            if on_result:
+                on_result(rid, response)
+            aborted = False
+            if classify_rid(response) == RID_PRESENT:
+                hits[rid] = response
+                if checkpoint:
+                    checkpoint.hit(rid, response.payload)
+                aborted = on_hit is not None and on_hit(rid, response) is False
+            if checkpoint:
+                checkpoint.advance(position + 1 if ids is not None else rid + 1)
+            if aborted:
+                break
+        else:
+            if checkpoint:
+                checkpoint.complete(*((0, len(order) - 1) if ids is not None else (start, end)))
+    finally:
+        reporter.finish()
+    return hits
+
+def try_all_rids(stack, timeout=0.3, plan=None, sub_function=REQUEST_ROUTINE_RESULTS, allow_unsafe=False):
+    """
+    Iterates through all possible 2-byte RIDs, sending a RoutineControl request for each.
+    RIDs are probed in the plan's priority order, standard and programming routines first,
+    with RequestRoutineResults unless another sub-function is given. StartRoutine leaves out
+    the plan's unsafe RIDs (erase memory, safety systems) unless allow_unsafe is set.
+    Processes and prints responses, and if a RID is found, pauses to ask the user
+    whether to continue scanning.
+    """
+    plan = plan or load_plan("rid")
+    reporter = ProgressReporter()
+
+    def prompt_on_hit(rid, r):
+        name, _ = plan.describe(rid, r.payload)
+        with reporter.suspended():
+            processed = process_ecu_response(r)
+            print(f"    {processed}{f' ({name})' if name else ''}")
+            print(f"    {r.hex(' ')}")
+            print(f"    Data: {r.payload.hex()}")
+            print(f"    Decoded data: {r.ascii}\n")
+            cont = input("RID 0x{0:04X} found. Continue scanning RIDs? (y/n): ".format(rid)).strip().lower()
+        if not cont.startswith('y'):
+            print("exiting RID scan")
+            return False
+        return True
+
+    try:
+        skip = plan.unsafe_ids() if sub_function == START_ROUTINE and not allow_unsafe else ()
+        scan_rids(stack, timeout=timeout, on_hit=prompt_on_hit, reporter=reporter, ids=plan.ordered_ids(),
+                  sub_function=sub_function, skip=skip)
     except KeyboardInterrupt:
         print("\nKeyboard interrupt received. Aborting RID scan.")
@@ -0,0 +1,296 @@
+from .reporting import ProgressReporter, ScanReporter
+from .rid_scan import enter_session
+from .utils import send_and_collect
+
+"""
+Generic UDS service and sub-function discovery.
+
+scan_template() sweeps one value through a request template such as "19 ??" or
+"22 F1 ??" and classifies every response. scan_services() builds a service map with
+it: all request SIDs (REQUEST_SIDS), then the sub-functions of every supported service that has
+them, in each diagnostic session the ECU can reach from the default session.
+
+Support is inferred from the NRC. A bare SID request is answered with 0x11 if the
+service does not exist and 0x7F if it exists in other sessions; any other answer
+(usually 0x13 for the missing parameters) means the service is supported. For a
+sub-function, 0x12 means not supported and 0x7E supported in other sessions.
+"""
+
+# Support classes.
+SUPPORTED = "supported"
+NOT_SUPPORTED = "not supported"
+OTHER_SESSION = "other session"
+NO_RESPONSE = "no response"
+
+# NRCs meaning the probed value does not exist, per kind of sweep.
+SERVICE_UNSUPPORTED_NRCS = (0x11,)
+SUB_FUNCTION_UNSUPPORTED_NRCS = (0x11, 0x12)
+TEMPLATE_UNSUPPORTED_NRCS = (0x11, 0x12, 0x31)
+# NRCs meaning the value exists but not in the active session.
+SESSION_NRCS = (0x7E, 0x7F)
+
+# Request SIDs swept by scan_services(). 0x40-0x7F and 0xC0-0xFF are response SIDs (SID + 0x40,
+# 0x7F for negative responses); they are only sent with all_sids.
+REQUEST_SIDS = tuple(range(0x00, 0x40)) + tuple(range(0x80, 0xC0))
+# Services with a sub-function byte (ISO 14229-1), whose sub-functions 0x00-0x7F are swept.
+SUB_FUNCTION_SERVICES = (0x10, 0x11, 0x19, 0x27, 0x28, 0x29, 0x3E, 0x83, 0x85, 0x86, 0x87)
+# Sub-function sweeps of these services reset the ECU, silence it or change its bus or DTC
+# settings; they are only probed with allow_unsafe.
+UNSAFE_SUB_FUNCTION_SERVICES = (0x11, 0x28, 0x85, 0x87)
+# The programming session may switch the ECU to its bootloader.
+PROGRAMMING_SESSION = 0x02
+DEFAULT_SESSION = 0x01
+
+SERVICE_NAMES = {
+    0x10: "DiagnosticSessionControl",
+    0x11: "ECUReset",
+    0x14: "ClearDiagnosticInformation",
+    0x19: "ReadDTCInformation",
+    0x22: "ReadDataByIdentifier",
+    0x23: "ReadMemoryByAddress",
+    0x24: "ReadScalingDataByIdentifier",
+    0x27: "SecurityAccess",
+    0x28: "CommunicationControl",
+    0x29: "Authentication",
+    0x2A: "ReadDataByPeriodicIdentifier",
+    0x2C: "DynamicallyDefineDataIdentifier",
+    0x2E: "WriteDataByIdentifier",
+    0x2F: "InputOutputControlByIdentifier",
+    0x31: "RoutineControl",
+    0x34: "RequestDownload",
+    0x35: "RequestUpload",
+    0x36: "TransferData",
+    0x37: "RequestTransferExit",
+    0x38: "RequestFileTransfer",
+    0x3D: "WriteMemoryByAddress",
+    0x3E: "TesterPresent",
+    0x83: "AccessTimingParameter",
+    0x84: "SecuredDataTransmission",
+    0x85: "ControlDTCSetting",
+    0x86: "ResponseOnEvent",
+    0x87: "LinkControl",
+}
+
+
+def parse_template(template):
+    """
+    Parses a request template in hex with one run of ?? bytes for the swept value.
+
+    Args:
+        template (str): e.g. "19 ??", "22 F1 ??" or "31 03 ?? ??".
+
+    Returns:
+        tuple: (prefix, width, suffix) with the bytes before and after the value and its width.
+
+    Raises:
+        ValueError: If the template is not hex or has no (or more than one) ?? run.
+    """
+    text = template.replace(" ", "").upper()
+    start = text.find("??")
+    if start == -1 or start % 2:
+        raise ValueError(f"Template '{template}' needs a ?? byte for the swept value")
+    end = start
+    while text[end:end + 2] == "??":
+        end += 2
+    if "?" in text[end:]:
+        raise ValueError(f"Template '{template}' has more than one ?? run")
+    return bytes.fromhex(text[:start]), (end - start) // 2, bytes.fromhex(text[end:])
+
+
+def classify_support(response, unsupported_nrcs=TEMPLATE_UNSUPPORTED_NRCS):
+    """
+    Classifies a response as SUPPORTED, NOT_SUPPORTED, OTHER_SESSION or NO_RESPONSE.
+
+    Args:
+        response (UDSResponse): The final response, or None.
+        unsupported_nrcs (tuple): NRCs meaning the probed value does not exist.
+    """
+    if response is None:
+        return NO_RESPONSE
+    if response.positive:
+        return SUPPORTED
+    nrc = response.nrc
+    if nrc in unsupported_nrcs:
+        return NOT_SUPPORTED
+    if nrc in SESSION_NRCS:
+        return OTHER_SESSION
+    return SUPPORTED
+
+
+def scan_template(stack, template, values, timeout=0.3, unsupported_nrcs=TEMPLATE_UNSUPPORTED_NRCS,
+                  on_hit=None, on_result=None, reporter=None, kind="template"):
+    """
+    Sends the template once per value and classifies every response.
+
+    Args:
+        stack: The iso-tp communication interface.
+        template (str or tuple): Request template (see parse_template), or a parsed (prefix, width, suffix).
+        values (iterable): Values to put into the template's ?? bytes.
+        timeout (float): Time in seconds to wait for responses.
+        unsupported_nrcs (tuple): NRCs meaning the value does not exist.
+        on_hit (callable): Called as on_hit(value, response) for each supported value.
+                           Returning False stops the scan.
+        on_result (callable): Called as on_result(value, response) for every value, with None
+                              if the ECU did not answer.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
+        kind (str): Name of the sweep for the reporter.
+
+    Returns:
+        dict: Maps each value to its (support class, response).
+    """
+    prefix, width, suffix = parse_template(template) if isinstance(template, str) else template
+    values = list(values)
+    reporter = reporter or ScanReporter()
+    results = {}
+    reporter.start(kind, len(values))
+    try:
+        for value in values:
+            request = prefix + value.to_bytes(width, byteorder='big') + suffix
+            responses = send_and_collect(stack, request, timeout)
+            response = responses[0] if responses else None
+            reporter.probe(kind, value, response)
+            support = classify_support(response, unsupported_nrcs)
+            results[value] = (support, response)
+            if on_result:
+                on_result(value, response)
+            if support == SUPPORTED and on_hit and on_hit(value, response) is False:
+                break
+    finally:
+        reporter.finish()
+    return results
+
+
+def find_sessions(stack, timeout=0.3, allow_unsafe=False, reporter=None):
+    """
+    Finds the diagnostic sessions the ECU accepts from the default session.
+
+    Every session 0x01-0x7F is requested from the default session, which is re-entered
+    after each accepted one. The programming session is skipped unless allow_unsafe.
+
+    Returns:
+        list: The accepted sessions, the default session first.
+    """
+    candidates = [session for session in range(0x01, 0x80)
+                  if allow_unsafe or session != PROGRAMMING_SESSION]
+    enter_session(stack, DEFAULT_SESSION, timeout)
+
+    def back_to_default(session, response):
+        if session != DEFAULT_SESSION:
+            enter_session(stack, DEFAULT_SESSION, timeout)
+
+    results = scan_template(stack, (b"\x10", 1, b""), candidates, timeout, SUB_FUNCTION_UNSUPPORTED_NRCS,
+                            on_hit=back_to_default, reporter=reporter, kind="session")
+    accepted = [session for session, (support, response) in results.items()
+                if support == SUPPORTED and response.positive]
+    return sorted(set(accepted) | {DEFAULT_SESSION})
+
+
+def scan_services(stack, sessions=None, timeout=0.3, sub_functions=True, allow_unsafe=False,
+                  on_hit=None, reporter=None, all_sids=False):
+    """
+    Builds the ECU's service map: supported SIDs and sub-functions per diagnostic session.
+
+    Args:
+        stack: The iso-tp communication interface.
+        sessions (list): Sessions to scan in; default: every session find_sessions() reaches.
+        timeout (float): Time in seconds to wait for responses.
+        sub_functions (bool): Sweep the sub-functions of supported SUB_FUNCTION_SERVICES.
+        allow_unsafe (bool): Also sweep the programming session and UNSAFE_SUB_FUNCTION_SERVICES.
+        on_hit (callable): Called as on_hit(session, sid, sub_function, response) for every
+                           supported service (sub_function None) and sub-function.
+        reporter (ScanReporter): Receives an event per request (default: counted silently).
+        all_sids (bool): Sweep every SID 0x00-0xFF instead of REQUEST_SIDS.
+
+    Returns:
+        dict: {session: {sid: (support class, {sub_function: support class})}} with the services
+              that are supported or supported in another session.
+    """
+    reporter = reporter or ScanReporter()
+    if sessions is None:
+        sessions = find_sessions(stack, timeout, allow_unsafe, reporter)
+    service_map = {}
+    for session in sessions:
+        if not enter_session(stack, session, timeout):
+            reporter.note(f"ECU did not accept session 0x{session:02X}; skipping it.")
+            continue
+        services = scan_template(stack, (b"", 1, b""), range(0x100) if all_sids else REQUEST_SIDS, timeout, SERVICE_UNSUPPORTED_NRCS,
+                                 reporter=reporter, kind=f"SID s{session:02X}")
+        session_map = {}
+        for sid, (support, response) in services.items():
+            if support not in (SUPPORTED, OTHER_SESSION):
+                continue
+            session_map[sid] = (support, {})
+            if support == SUPPORTED and on_hit:
+                on_hit(session, sid, None, response)
+        if sub_functions:
+            for sid, (support, subs) in session_map.items():
+                if support != SUPPORTED or sid not in SUB_FUNCTION_SERVICES:
+                    continue
+                if sid in UNSAFE_SUB_FUNCTION_SERVICES and not allow_unsafe:
+                    continue
+                values = range(0x80)
+                if sid == 0x10:
+                    # Sessions are already known; probing others would leave the one being scanned.
+                    values = sorted(sessions)
+                elif sid == 0x27:
+                    # Only requestSeed levels: an empty sendKey may count as a failed attempt.
+                    values = range(0x01, 0x80, 2)
+
+                def keep_session(sub, response, sid=sid):
+                    if sid == 0x10 and sub != session:
+                        enter_session(stack, session, timeout)
+
+                results = scan_template(stack, (bytes([sid]), 1, b""), values, timeout,
+                                        SUB_FUNCTION_UNSUPPORTED_NRCS, on_hit=keep_session,
+                                        reporter=reporter, kind=f"{sid:02X} sub s{session:02X}")
+                for sub, (sub_support, response) in results.items():
+                    if sub_support in (SUPPORTED, OTHER_SESSION):
+                        subs[sub] = sub_support
+                    if sub_support == SUPPORTED and on_hit:
+                        on_hit(session, sid, sub, response)
+        service_map[session] = session_map
+    enter_session(stack, DEFAULT_SESSION, timeout)
+    return service_map
+
+
+def sink_on_hit(sink, ecu=None):
+    """
+    Returns an on_hit callback for scan_services() that writes each supported service
+    (kind "service", id SID) and sub-function (kind "subfunction", id SID << 8 | sub-function)
+    to a result sink, named after the service and valued with the session.
+    """
+    def callback(session, sid, sub_function, response):
+        kind, identifier = ("service", sid) if sub_function is None else ("subfunction", (sid << 8) | sub_function)
+        sink.hit(kind, identifier, response, ecu,
+                 lambda identifier, data: (SERVICE_NAMES.get(sid, ""), f"session 0x{session:02X}"))
+    return callback
+
+
+def print_service_map(service_map):
+    """Prints the supported services and sub-functions of each session."""
+    for session, services in service_map.items():
+        print(f"Session 0x{session:02X}:")
+        for sid, (support, subs) in sorted(services.items()):
+            line = f"  0x{sid:02X} {SERVICE_NAMES.get(sid, ''):<32} {support}"
+            supported = [sub for sub, sub_support in sorted(subs.items()) if sub_support == SUPPORTED]
+            if supported:
+                line += "  sub-functions: " + " ".join(f"{sub:02X}" for sub in supported)
+            print(line)
+
+
+def try_service_scan(stack, timeout=0.3):
+    """
+    Interactive service map scan: asks whether to sweep sub-functions, unsafe services and
+    response SIDs, then prints the service map.
+    """
+    sub_functions = not input("Sweep sub-functions of supported services? (Y/n): ").strip().lower().startswith('n')
+    allow_unsafe = input("Include the programming session and ECUReset/CommunicationControl/"
+                         "ControlDTCSetting/LinkControl sub-functions? (y/N): ").strip().lower().startswith('y')
+    all_sids = input("Also send response SIDs 0x40-0x7F and 0xC0-0xFF? (y/N): ").strip().lower().startswith('y')
+    try:
+        service_map = scan_services(stack, timeout=timeout, sub_functions=sub_functions,
+                                    allow_unsafe=allow_unsafe, reporter=ProgressReporter(), all_sids=all_sids)
+    except KeyboardInterrupt:
+        print("\nKeyboard interrupt received. Aborting service scan.")
+        return
+    print_service_map(service_map)
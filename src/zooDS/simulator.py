@@ -0,0 +1,366 @@
+import os
+import threading
+import time
+import can
+import isotp
+from .key_solver import apply_transform
+from .transport import isotp_params
+
+"""
+Simulated UDS ECU for benchmarks and bench testing without hardware.
+
+SimulatedECU answers UDS requests over ISO-TP on any python-can bus, e.g. the
+`virtual` interface or a vcan SocketCAN interface. It serves sparse DID and RID
+tables, a memory image and Security Access with a seed/key transform from
+key_solver, and can be told to answer some identifiers with Response Pending
+(0x78), Busy Repeat Request (0x21) or Security Access Denied (0x33) first, or to
+reset when certain routines are started.
+
+Supported services: 0x10, 0x11, 0x22, 0x23, 0x27, 0x31 and 0x3E, and 0x35, 0x36 and
+0x37 when uploads are enabled. Everything else is answered with Service Not Supported (0x11).
+"""
+
+# Security Access transform used when none is given: XOR every seed byte with 0xA5.
+DEFAULT_KEY_ALGORITHM = [("xor", 0xA5A5A5A5)]
+
+
+def _negative(sid, nrc):
+    return bytes([0x7F, sid, nrc])
+
+
+class SimulatedECU:
+    """
+    UDS ECU served from a background thread.
+
+    Args:
+        bus: python-can bus the ECU sends and receives on.
+        ecu_id (int): CAN ID the ECU answers on.
+        tester_id (int): CAN ID the ECU listens to.
+        latency (float): Seconds between a request and its response.
+        dids (dict): DID -> data bytes, answered by ReadDataByIdentifier.
+        rids (dict): RID -> routine status bytes, answered by RoutineControl.
+        memory (bytes): Memory image served by ReadMemoryByAddress.
+        memory_base (int): Address of the first byte of the memory image.
+        protected (list): Inclusive (start, end) address ranges and DIDs that answer 0x33 while locked.
+                          Integers are DIDs, tuples are memory ranges.
+        pending (dict): DID or RID -> number of Response Pending (0x78) frames sent before the answer.
+        pending_time (float): Seconds between Response Pending frames.
+        busy (dict): DID or RID -> number of requests answered with Busy Repeat Request (0x21)
+                     before it is served.
+        key_algorithm (list): key_solver transform steps that turn a seed into the key.
+        seed_size (int): Seed length in bytes.
+        max_attempts (int): Invalid keys accepted before Exceeded Number Of Attempts (0x36),
+                            None for no limit.
+        max_dids_per_request (int): Largest number of DIDs in one request, more answer 0x13.
+        reject_partial_batches (bool): Answer a multi-DID read with 0x31 when any of its DIDs is
+                                       unsupported, as some ECUs do, instead of only when none is.
+        reset_rids (set): RIDs whose StartRoutine resets the ECU: it stays silent for reset_time
+                          seconds and comes back in the default session.
+        reset_time (float): Seconds the ECU is silent after a reset.
+        routine_sessions (tuple): Sessions RoutineControl is available in (0x7F in others),
+                                  None for all sessions.
+        sessions (tuple): Sessions DiagnosticSessionControl accepts, 0x12 for others.
+        memory_formats (tuple): addressAndLengthFormatIdentifiers ReadMemoryByAddress accepts
+                                (0x13 for others), None for all.
+        max_read_size (int): Largest ReadMemoryByAddress size, larger reads answer Response Too Long
+                             (0x14); None for no limit.
+        security_levels (tuple): Security Access requestSeed levels; other levels and their
+                                 sendKey answer 0x12.
+        upload_block_length (int): maxNumberOfBlockLength announced for RequestUpload, None to not
+                                   support RequestUpload, TransferData and RequestTransferExit.
+        lost_blocks (set): Block sequence counters whose first TransferData is answered with
+                           Wrong Block Sequence Counter (0x73), as if the request had been lost.
+        fd (bool): Send 64-byte CAN FD frames.
+    """
+
+    def __init__(self, bus, ecu_id=0x7E8, tester_id=0x7E0, latency=0.0, dids=None, rids=None,
+                 memory=b"", memory_base=0, protected=(), pending=None, pending_time=0.01, busy=None,
+                 key_algorithm=None, seed_size=4, max_attempts=None, max_dids_per_request=64,
+                 reject_partial_batches=False, reset_rids=(), reset_time=0.5, routine_sessions=None, sessions=(0x01, 0x02, 0x03),
+                 security_levels=(0x01,), memory_formats=None, max_read_size=None,
+                 upload_block_length=None, lost_blocks=(), fd=False):
+        self.bus = bus
+        self.ecu_id = ecu_id
+        self.tester_id = tester_id
+        self.latency = latency
+        self.dids = dict(dids or {})
+        self.rids = dict(rids or {})
+        self.memory = bytes(memory)
+        self.memory_base = memory_base
+        self.protected_dids = {item for item in protected if isinstance(item, int)}
+        self.protected_ranges = [item for item in protected if not isinstance(item, int)]
+        self.pending = dict(pending or {})
+        self.pending_time = pending_time
+        self.busy = dict(busy or {})
+        self.key_algorithm = key_algorithm or DEFAULT_KEY_ALGORITHM
+        self.seed_size = seed_size
+        self.max_attempts = max_attempts
+        self.max_dids_per_request = max_dids_per_request
+        self.reject_partial_batches = reject_partial_batches
+        self.reset_rids = set(reset_rids)
+        self.reset_time = reset_time
+        self.routine_sessions = routine_sessions
+        self.sessions = tuple(sessions)
+        self.security_levels = tuple(security_levels)
+        self.memory_formats = memory_formats
+        self.max_read_size = max_read_size
+        self.upload_block_length = upload_block_length
+        self.lost_blocks = set(lost_blocks)
+        self.upload = None
+        self.running = set()
+        self.offline_until = 0.0
+        self.resets = 0
+        self.session = 0x01
+        self.unlocked = False
+        self.seed = None
+        self.failed_attempts = 0
+        self.requests = 0
+        mode = isotp.AddressingMode.Normal_29bits if max(ecu_id, tester_id) > 0x7FF else isotp.AddressingMode.Normal_11bits
+        self.stack = isotp.CanStack(bus, address=isotp.Address(mode, txid=ecu_id, rxid=tester_id),
+                                    params=isotp_params(0, 0, fd))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts answering requests in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"ecu-{self.ecu_id:X}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.stack.process(rx_timeout=0.005)
+            while self.stack.available():
+                request = bytes(self.stack.recv())
+                if time.monotonic() < self.offline_until:
+                    continue  # rebooting
+                self.requests += 1
+                if self.latency:
+                    time.sleep(self.latency)
+                for response in self.handle(request):
+                    self._send(response)
+
+    def _send(self, response):
+        if response == "wait":
+            time.sleep(self.pending_time)
+            return
+        self.stack.send(response)
+        while self.stack.transmitting():
+            self.stack.process(rx_timeout=0.001)
+
+    def handle(self, request):
+        """
+        Returns the responses to a request, in the order they are sent.
+
+        The string "wait" in the list stands for a pause of pending_time seconds.
+        """
+        sid = request[0]
+        handler = {
+            0x10: self._session_control,
+            0x11: self._ecu_reset,
+            0x22: self._read_data,
+            0x23: self._read_memory,
+            0x27: self._security_access,
+            0x31: self._routine_control,
+            0x3E: self._tester_present,
+        }.get(sid)
+        if self.upload_block_length is not None and sid in (0x35, 0x36, 0x37):
+            handler = {0x35: self._request_upload, 0x36: self._transfer_data, 0x37: self._transfer_exit}[sid]
+        if handler is None:
+            return [_negative(sid, 0x11)]
+        if sid == 0x37:
+            return handler(request)
+        if sid == 0x31 and self.routine_sessions is not None and self.session not in self.routine_sessions:
+            return [_negative(sid, 0x7F)]
+        if len(request) < 2:
+            return [_negative(sid, 0x13)]
+        return handler(request)
+
+    def _delayed(self, sid, key, response):
+        """Prefixes the response with the configured Busy or Response Pending behavior of key."""
+        if self.busy.get(key):
+            self.busy[key] -= 1
+            return [_negative(sid, 0x21)]
+        responses = []
+        for _ in range(self.pending.get(key, 0)):
+            responses += [_negative(sid, 0x78), "wait"]
+        return responses + [response]
+
+    def _session_control(self, request):
+        if request[1] & 0x7F not in self.sessions:
+            return [_negative(0x10, 0x12)]
+        self.session = request[1] & 0x7F
+        self.unlocked = False
+        self.seed = None
+        self.upload = None
+        if request[1] & 0x80:
+            return []
+        return [bytes([0x50, self.session, 0x00, 0x32, 0x01, 0xF4])]
+
+    def _ecu_reset(self, request):
+        self.session = 0x01
+        self.unlocked = False
+        self.seed = None
+        self.running.clear()
+        self.upload = None
+        return [bytes([0x51, request[1] & 0x7F])]
+
+    def reset(self):
+        """Simulates an unexpected reset: silent for reset_time, then in the default session."""
+        self.resets += 1
+        self._ecu_reset(b"\x11\x01")
+        self.offline_until = time.monotonic() + self.reset_time
+
+    def _tester_present(self, request):
+        if request[1] & 0x7F:
+            return [_negative(0x3E, 0x12)]
+        if request[1] & 0x80:
+            return []
+        return [bytes([0x7E, request[1]])]
+
+    def _read_data(self, request):
+        if len(request) % 2 != 1 or (len(request) - 1) // 2 > self.max_dids_per_request:
+            return [_negative(0x22, 0x13)]
+        dids = [int.from_bytes(request[i:i + 2], byteorder='big') for i in range(1, len(request), 2)]
+        if not self.unlocked and any(did in self.protected_dids for did in dids):
+            return [_negative(0x22, 0x33)]
+        records = b"".join(did.to_bytes(2, byteorder='big') + self.dids[did] for did in dids if did in self.dids)
+        if not records or (self.reject_partial_batches and any(did not in self.dids for did in dids)):
+            return [_negative(0x22, 0x31)]
+        for did in dids:
+            if did in self.busy or did in self.pending:
+                return self._delayed(0x22, did, b"\x62" + records)
+        return [b"\x62" + records]
+
+    def _read_memory(self, request):
+        if self.memory_formats is not None and request[1] not in self.memory_formats:
+            return [_negative(0x23, 0x13)]
+        parsed = self._memory_range(request, 1)
+        if isinstance(parsed, int):
+            return [_negative(0x23, parsed)]
+        address, size = parsed
+        if self.max_read_size is not None and size > self.max_read_size:
+            return [_negative(0x23, 0x14)]
+        offset = address - self.memory_base
+        return [b"\x63" + self.memory[offset:offset + size]]
+
+    def _memory_range(self, request, offset):
+        """Parses the addressAndLengthFormatIdentifier at offset; returns (address, size) or an NRC."""
+        if len(request) <= offset:
+            return 0x13
+        address_length = request[offset] & 0x0F
+        size_length = request[offset] >> 4
+        if not address_length or not size_length or len(request) != offset + 1 + address_length + size_length:
+            return 0x13
+        address = int.from_bytes(request[offset + 1:offset + 1 + address_length], byteorder='big')
+        size = int.from_bytes(request[offset + 1 + address_length:], byteorder='big')
+        end = address + size - 1
+        if size == 0 or address < self.memory_base or end >= self.memory_base + len(self.memory):
+            return 0x31
+        if not self.unlocked and any(start <= end and address <= stop for start, stop in self.protected_ranges):
+            return 0x33
+        return address, size
+
+    def _request_upload(self, request):
+        if self.upload is not None:
+            return [_negative(0x35, 0x70)]
+        parsed = self._memory_range(request, 2)
+        if isinstance(parsed, int):
+            return [_negative(0x35, parsed)]
+        address, size = parsed
+        offset = address - self.memory_base
+        self.upload = {"next": offset, "end": offset + size, "counter": 0x01, "last": None}
+        return [bytes([0x75, 0x20]) + self.upload_block_length.to_bytes(2, byteorder='big')]
+
+    def _transfer_data(self, request):
+        upload = self.upload
+        if upload is None:
+            return [_negative(0x36, 0x24)]
+        counter = request[1]
+        if upload["last"] and counter == upload["last"][0]:
+            return [upload["last"][1]]  # repeated request: send the block again
+        if counter != upload["counter"]:
+            return [_negative(0x36, 0x73)]
+        if upload["next"] >= upload["end"]:
+            return [_negative(0x36, 0x24)]
+        if counter in self.lost_blocks:
+            self.lost_blocks.discard(counter)
+            upload["counter"] = (counter + 1) & 0xFF
+            upload["next"] += self.upload_block_length - 2
+            return [_negative(0x36, 0x73)]
+        block = self.memory[upload["next"]:min(upload["end"], upload["next"] + self.upload_block_length - 2)]
+        upload["next"] += len(block)
+        upload["counter"] = (counter + 1) & 0xFF
+        upload["last"] = (counter, bytes([0x76, counter]) + block)
+        return [upload["last"][1]]
+
+    def _transfer_exit(self, request):
+        if self.upload is None:
+            return [_negative(0x37, 0x24)]
+        self.upload = None
+        return [b"\x77"]
+
+    def _security_access(self, request):
+        level = request[1]
+        if level - (0 if level % 2 else 1) not in self.security_levels:
+            return [_negative(0x27, 0x12)]
+        if level % 2:
+            if self.max_attempts is not None and self.failed_attempts >= self.max_attempts:
+                return [_negative(0x27, 0x36)]
+            if self.unlocked:
+                self.seed = None
+                return [bytes([0x67, level]) + bytes(self.seed_size)]
+            self.seed = os.urandom(self.seed_size)
+            return [bytes([0x67, level]) + self.seed]
+        if self.seed is None:
+            return [_negative(0x27, 0x24)]
+        if bytes(request[2:]) != apply_transform(self.key_algorithm, self.seed):
+            self.failed_attempts += 1
+            self.seed = None
+            if self.max_attempts is not None and self.failed_attempts >= self.max_attempts:
+                return [_negative(0x27, 0x36)]
+            return [_negative(0x27, 0x35)]
+        self.unlocked = True
+        self.seed = None
+        self.failed_attempts = 0
+        return [bytes([0x67, level])]
+
+    def _routine_control(self, request):
+        if len(request) < 4:
+            return [_negative(0x31, 0x13)]
+        rid = int.from_bytes(request[2:4], byteorder='big')
+        if rid not in self.rids:
+            return [_negative(0x31, 0x31)]
+        sub_function = request[1] & 0x7F
+        if sub_function == 0x01:
+            if rid in self.reset_rids:
+                self.reset()
+                return []
+            self.running.add(rid)
+        elif sub_function in (0x02, 0x03):
+            if rid not in self.running:
+                return [_negative(0x31, 0x24)]
+            if sub_function == 0x02:
+                self.running.discard(rid)
+        else:
+            return [_negative(0x31, 0x12)]
+        response = bytes([0x71, sub_function]) + request[2:4] + self.rids[rid]
+        return self._delayed(0x31, rid, response)
+
+
+def virtual_bus(channel="zoods-sim", fd=False):
+    """Opens a python-can virtual bus; buses on the same channel name see each other's frames."""
+    return can.Bus(interface="virtual", channel=channel, fd=fd)
@@ -0,0 +1,132 @@
+import csv
+import json
+import sys
+import time
+
+"""
+Result sinks that stream scan hits to a file or stdout as they are found.
+
+Records are written through a buffered stream and flushed at most once per
+flush_interval, so a fast scan is never held up by disk or terminal writes
+while a slow one still shows results promptly.
+"""
+
+CSV_FIELDS = ["time", "ecu", "kind", "id", "data", "ascii", "name", "value"]
+
+
+class ResultSink:
+    """
+    Base class for result sinks. Subclasses implement _write_record().
+
+    Args:
+        stream: Text stream to write to.
+        flush_interval (float): Maximum time in seconds a record stays in the buffer.
+        close_stream (bool): Close the stream when the sink is closed.
+    """
+
+    def __init__(self, stream, flush_interval=1.0, close_stream=True):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.close_stream = close_stream
+        self.count = 0
+        self._last_flush = time.monotonic()
+
+    def _write_record(self, record):
+        raise NotImplementedError
+
+    def write(self, record):
+        """Writes one record (dict with the keys in CSV_FIELDS) to the sink."""
+        self._write_record(record)
+        self.count += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.stream.flush()
+            self._last_flush = now
+
+    def hit(self, kind, identifier, data, ecu=None, describe=None):
+        """
+        Writes a scan hit.
+
+        Args:
+            kind (str): What was scanned, e.g. "did", "rid" or "mem".
+            identifier (int): The DID, RID or memory address.
+            data (bytes): Response data.
+            ecu (int): Arbitration ID of the responding ECU, if known.
+            describe (callable): Returns the (name, value) of a hit from (identifier, data),
+                                 e.g. plans.ScanPlan.describe.
+        """
+        data = bytes(data)
+        name, value = describe(identifier, data) if describe else ("", "")
+        self.write({
+            "time": round(time.time(), 3),
+            "ecu": f"0x{ecu:X}" if ecu is not None else "",
+            "kind": kind,
+            "id": f"0x{identifier:04X}",
+            "data": data.hex(),
+            "ascii": data.decode('ascii', errors='replace'),
+            "name": name,
+            "value": value,
+        })
+
+    def on_hit(self, kind, ecu=None, describe=None):
+        """Returns an on_hit callback for the scanners that writes each hit to this sink."""
+        def callback(identifier, data):
+            self.hit(kind, identifier, data, ecu, describe)
+            return True
+        return callback
+
+    def close(self):
+        self.stream.flush()
+        if self.close_stream:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    """Writes one JSON object per line."""
+
+    def _write_record(self, record):
+        self.stream.write(json.dumps(record) + "\n")
+
+
+class CsvSink(ResultSink):
+    """Writes CSV rows with a header line."""
+
+    def __init__(self, stream, flush_interval=1.0, close_stream=True):
+        super().__init__(stream, flush_interval, close_stream)
+        self._writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+        if not (stream.seekable() and stream.tell() > 0):  # no header when appending to a file
+            self._writer.writeheader()
+
+    def _write_record(self, record):
+        self._writer.writerow(record)
+
+
+SINK_FORMATS = {"jsonl": JsonlSink, "csv": CsvSink}
+
+
+def open_sink(path="-", fmt=None, flush_interval=1.0):
+    """
+    Opens a result sink for the given path.
+
+    Args:
+        path (str): Output file, or "-" for stdout.
+        fmt (str): "jsonl" or "csv". Taken from the file extension when not given, defaulting to jsonl.
+        flush_interval (float): Maximum time in seconds a record stays in the buffer.
+
+    Returns:
+        ResultSink: The opened sink.
+    """
+    if fmt is None:
+        fmt = "csv" if str(path).lower().endswith(".csv") else "jsonl"
+    if fmt not in SINK_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of: {', '.join(SINK_FORMATS)}")
+    if path == "-":
+        return SINK_FORMATS[fmt](sys.stdout, flush_interval, close_stream=False)
+    stream = open(path, "a", newline="", buffering=1 << 16)
+    return SINK_FORMATS[fmt](stream, flush_interval)
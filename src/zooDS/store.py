@@ -0,0 +1,318 @@
+import json
+import os
+import sqlite3
+import time
+from .dump_image import add_range
+from .read_response import UDSResponse
+
+"""
+Persistent per-ECU scan database.
+
+Every probe of a DID, RID, memory block or service is stored in SQLite with its
+response class and payload, keyed by the ECU. An ECU is identified by its tester/ECU
+IDs plus the data of its identification DIDs (part numbers, software versions), so a
+firmware update shows up as a new ECU whose results can be diffed against the old one.
+
+Re-scanning the same ECU skips identifiers whose result is settled (a positive response
+or an NRC saying the identifier is not supported) and re-probes the rest. Results are kept
+per scan context, the session and sub-function a scan probed with, because ISO 14229 lets
+the supported identifiers differ between sessions. Results that
+differ from the stored ones are logged as changes of the run that saw them.
+"""
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".zoods", "scans.db")
+
+# Response classes.
+POSITIVE = "positive"
+NEGATIVE = "negative"
+NO_RESPONSE = "no response"
+
+# NRCs that will not change on a re-probe of the same firmware in the same scan context: the
+# identifier, service or sub-function is not supported. Conditional NRCs such as 0x22, 0x24,
+# 0x33 or 0x7F depend on the security state, and 0x13 on the request format; they are probed again.
+SETTLED_NRCS = (0x11, 0x12, 0x31)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ecus (
+    id INTEGER PRIMARY KEY,
+    tx INTEGER NOT NULL,
+    rx INTEGER NOT NULL,
+    identity TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    UNIQUE (tx, rx, identity)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ecu INTEGER NOT NULL REFERENCES ecus (id),
+    kind TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '',
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS probes (
+    ecu INTEGER NOT NULL REFERENCES ecus (id),
+    kind TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '',
+    ident INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    nrc INTEGER,
+    data BLOB,
+    run INTEGER NOT NULL REFERENCES runs (id),
+    PRIMARY KEY (ecu, kind, context, ident)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    kind TEXT NOT NULL,
+    ident INTEGER NOT NULL,
+    old_class TEXT,
+    old_data BLOB,
+    new_class TEXT NOT NULL,
+    new_data BLOB
+);
+"""
+
+
+def scan_context(session=None, sub_function=None):
+    """
+    Describes the ECU state a scan's results depend on, e.g. "session 03, sub-function 03".
+
+    Args:
+        session (int): Diagnostic session the scan runs in, or None for the ECU's current session.
+        sub_function (int): Sub-function the identifiers are probed with, e.g. for RoutineControl.
+
+    Returns:
+        str: The context, empty for a scan in the current session without a sub-function.
+    """
+    parts = []
+    if session is not None:
+        parts.append(f"session {session:02X}")
+    if sub_function is not None:
+        parts.append(f"sub-function {sub_function:02X}")
+    return ", ".join(parts)
+
+
+def classify_response(response):
+    """
+    Classifies a probe result.
+
+    Args:
+        response (UDSResponse): The final response, or None if the ECU did not answer.
+
+    Returns:
+        tuple: (class, nrc) with class POSITIVE, NEGATIVE or NO_RESPONSE.
+    """
+    if response is None:
+        return NO_RESPONSE, None
+    if response.negative:
+        return NEGATIVE, response.nrc
+    return POSITIVE, None
+
+
+def is_settled(response_class, nrc):
+    """True if a result will not change when the same ECU is probed again."""
+    return response_class == POSITIVE or (response_class == NEGATIVE and nrc in SETTLED_NRCS)
+
+
+class ScanStore:
+    """
+    SQLite database of scan results.
+
+    Writes are committed at most once per commit_interval seconds and when the store is
+    closed, so recording a probe does not wait for the disk.
+
+    Args:
+        path (str): Database file (default DEFAULT_PATH).
+        commit_interval (float): Maximum time in seconds a recorded probe stays uncommitted.
+    """
+
+    def __init__(self, path=None, commit_interval=2.0):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.commit_interval = commit_interval
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+        self._last_commit = time.monotonic()
+        self._runs = {}
+
+    def _create_schema(self):
+        """Creates the tables, moving probes of databases written before results had a scan context."""
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(probes)")]
+        if not columns or "context" in columns:
+            self.db.executescript(SCHEMA)
+            return
+        self.db.execute("ALTER TABLE probes RENAME TO probes_v1")
+        self.db.execute("ALTER TABLE runs ADD COLUMN context TEXT NOT NULL DEFAULT ''")
+        self.db.executescript(SCHEMA)
+        self.db.execute("INSERT INTO probes (ecu, kind, ident, length, class, nrc, data, run) "
+                        "SELECT ecu, kind, ident, length, class, nrc, data, run FROM probes_v1")
+        self.db.execute("DROP TABLE probes_v1")
+        self.db.commit()
+
+    def ecu(self, tx, rx, identity=None):
+        """
+        Returns the database ID of an ECU, adding it if it is new.
+
+        Args:
+            tx (int): Tester (source) ID.
+            rx (int): ECU (destination) ID.
+            identity (dict): Identification DIDs mapped to their data, e.g. from
+                             did_scan.read_identification().
+        """
+        identity = json.dumps({f"{did:04X}": bytes(data).hex() for did, data in sorted((identity or {}).items())})
+        now = time.time()
+        row = self.db.execute("SELECT id FROM ecus WHERE tx = ? AND rx = ? AND identity = ?",
+                              (tx, rx, identity)).fetchone()
+        if row:
+            self.db.execute("UPDATE ecus SET last_seen = ? WHERE id = ?", (now, row[0]))
+            return row[0]
+        cursor = self.db.execute("INSERT INTO ecus (tx, rx, identity, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+                                 (tx, rx, identity, now, now))
+        self.db.commit()
+        return cursor.lastrowid
+
+    def previous_ecu(self, ecu):
+        """Returns the ID of the most recently seen ECU with the same tester/ECU IDs but another identity."""
+        row = self.db.execute(
+            "SELECT b.id FROM ecus a JOIN ecus b ON a.tx = b.tx AND a.rx = b.rx AND a.id != b.id "
+            "WHERE a.id = ? ORDER BY b.last_seen DESC LIMIT 1", (ecu,)).fetchone()
+        return row[0] if row else None
+
+    def begin_run(self, ecu, kind, context=""):
+        """
+        Starts a run of a scan of the given kind ("did", "rid", "mem", ...) and returns its ID.
+        Its probes are stored under the scan context from scan_context().
+        """
+        cursor = self.db.execute("INSERT INTO runs (ecu, kind, context, started) VALUES (?, ?, ?, ?)",
+                                 (ecu, kind, context, time.time()))
+        self.db.commit()
+        self._runs[cursor.lastrowid] = (ecu, kind, context)
+        return cursor.lastrowid
+
+    def finish_run(self, run):
+        self.db.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run))
+        self.db.commit()
+
+    def record(self, run, identifier, response, length=1):
+        """
+        Stores the result of one probe, logging a change if it differs from the stored result.
+
+        Args:
+            run (int): Run ID from begin_run().
+            identifier (int): DID, RID, memory address or service ID.
+            response (UDSResponse): The final response, or None if the ECU did not answer.
+            length (int): Number of identifiers covered, e.g. the bytes of a memory read.
+        """
+        if run not in self._runs:
+            self._runs[run] = self.db.execute("SELECT ecu, kind, context FROM runs WHERE id = ?", (run,)).fetchone()
+        ecu, kind, context = self._runs[run]
+        response_class, nrc = classify_response(response)
+        data = bytes(response) if response is not None else None
+        old = self.db.execute("SELECT class, data FROM probes WHERE ecu = ? AND kind = ? AND context = ? AND ident = ?",
+                              (ecu, kind, context, identifier)).fetchone()
+        if old and (old[0], old[1]) != (response_class, data):
+            self.db.execute("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (run, kind, identifier, old[0], old[1], response_class, data))
+        self.db.execute("INSERT OR REPLACE INTO probes (ecu, kind, context, ident, length, class, nrc, data, run) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ecu, kind, context, identifier, length, response_class, nrc, data, run))
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.commit()
+
+    def on_result(self, run):
+        """Returns an on_result callback for the scanners that records every probe of the run."""
+        def callback(identifier, response, length=1):
+            self.record(run, identifier, response, length)
+        return callback
+
+    def settled(self, ecu, kind, start, end, context=""):
+        """Returns the set of identifiers between start and end (inclusive) with a settled result in the context."""
+        rows = self.db.execute("SELECT ident, class, nrc FROM probes "
+                               "WHERE ecu = ? AND kind = ? AND context = ? AND ident BETWEEN ? AND ?",
+                               (ecu, kind, context, start, end))
+        return {ident for ident, response_class, nrc in rows if is_settled(response_class, nrc)}
+
+    def settled_probes(self, ecu, kind, start, end, context=""):
+        """
+        Returns the settled probes overlapping start to end (inclusive) in the context, e.g. memory reads.
+
+        Returns:
+            list: (identifier, length, response) tuples, response a UDSResponse.
+        """
+        rows = self.db.execute("SELECT ident, length, class, nrc, data FROM probes "
+                               "WHERE ecu = ? AND kind = ? AND context = ? AND ident <= ? AND ident + length > ? "
+                               "ORDER BY ident", (ecu, kind, context, end, start))
+        return [(ident, length, UDSResponse(data)) for ident, length, response_class, nrc, data in rows
+                if is_settled(response_class, nrc)]
+
+    def settled_ranges(self, ecu, kind, start, end, context=""):
+        """Returns the merged inclusive [start, end] ranges covered by settled probes, e.g. memory reads."""
+        ranges = []
+        for ident, length, _ in self.settled_probes(ecu, kind, start, end, context):
+            ranges = add_range(ranges, ident, ident + length - 1)
+        return ranges
+
+    def results(self, ecu, kind, response_class=POSITIVE, context=""):
+        """Returns {identifier: response} for the ECU's stored probes of one class in the context."""
+        rows = self.db.execute("SELECT ident, data FROM probes WHERE ecu = ? AND kind = ? AND context = ? AND class = ?",
+                               (ecu, kind, context, response_class))
+        return {ident: data for ident, data in rows}
+
+    def changes(self, run):
+        """Returns the (kind, identifier, old_class, old_data, new_class, new_data) changes seen by a run."""
+        self.commit()
+        return self.db.execute("SELECT kind, ident, old_class, old_data, new_class, new_data FROM changes "
+                               "WHERE run = ? ORDER BY ident", (run,)).fetchall()
+
+    def diff_ecus(self, old, new, kind, context=""):
+        """
+        Compares the positive results of two ECU entries, e.g. before and after a firmware update.
+
+        Returns:
+            dict: {"added": [...], "removed": [...], "changed": [...]} lists of identifiers.
+                  Identifiers not probed on the new ECU yet are not reported as removed.
+        """
+        self.commit()
+        before = self.results(old, kind, context=context)
+        after = self.results(new, kind, context=context)
+        probed = {ident for (ident,) in self.db.execute("SELECT ident FROM probes WHERE ecu = ? AND kind = ? AND context = ?",
+                                                         (new, kind, context))}
+        return {
+            "added": sorted(set(after) - set(before)),
+            "removed": sorted(ident for ident in set(before) - set(after) if ident in probed),
+            "changed": sorted(ident for ident in set(before) & set(after) if before[ident] != after[ident]),
+        }
+
+    def commit(self):
+        self.db.commit()
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def print_run_report(store, ecu, run, kind, context=""):
+    """Prints the changes a run found, and the difference to the ECU's previous identity if there is one."""
+    changes = store.changes(run)
+    print(f"{len(changes)} result(s) changed since the last run.")
+    for _, ident, old_class, old_data, new_class, new_data in changes:
+        old = old_data.hex() if old_data else old_class
+        new = new_data.hex() if new_data else new_class
+        print(f"  0x{ident:04X}: {old} -> {new}")
+    previous = store.previous_ecu(ecu)
+    if previous is None:
+        return
+    diff = store.diff_ecus(previous, ecu, kind, context)
+    print("Compared to the ECU's previous identification (e.g. before a software update):")
+    for label, idents in diff.items():
+        if idents:
+            print(f"  {label}: " + ", ".join(f"0x{ident:04X}" for ident in idents))
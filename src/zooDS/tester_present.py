@@ -1,5 +1,7 @@
 import can
+import contextlib
 import time
+from .utils import unfiltered
 
 
 def send_tester_present_functional(bus, arbitration_id, is_extended_id):
@@ -20,24 +22,25 @@ def send_tester_present_functional(bus, arbitration_id, is_extended_id):
         data=bytes.fromhex("02 3E 00"),
         is_extended_id=is_extended_id
     )
-    try:
-        bus.send(tester_present_msg)
-        print(f"\nSent Tester Present from ID {hex(arbitration_id)}: {tester_present_msg}")
-    except can.CanError as e:
-        print(f"\nFailed to send Tester Present on ID {hex(arbitration_id)}: {e}")
-        return []
-
-    print("\nListening for Tester Present responses...")
-    timeout_gap = 1.0  # seconds to wait after the last received frame
-    last_frame_time = time.time()
-    responses = []
-    while True:
-        msg = bus.recv(timeout=1.0)
-        if msg.data[1] == 0x7E:
-            responses.append(msg)
-            last_frame_time = time.time()  # Reset timeout on receiving a message
-        if time.time() - last_frame_time > timeout_gap:
-            break
+    with unfiltered(bus):
+        try:
+            bus.send(tester_present_msg)
+            print(f"\nSent Tester Present from ID {hex(arbitration_id)}: {tester_present_msg}")
+        except can.CanError as e:
+            print(f"\nFailed to send Tester Present on ID {hex(arbitration_id)}: {e}")
+            return []
+
+        print("\nListening for Tester Present responses...")
+        timeout_gap = 1.0  # seconds to wait after the last received frame
+        last_frame_time = time.monotonic()
+        responses = []
+        while True:
+            msg = bus.recv(timeout=timeout_gap)
+            if msg is not None and is_tester_present_response(msg):
+                responses.append(msg)
+                last_frame_time = time.monotonic()  # Reset timeout on receiving a message
+            if time.monotonic() - last_frame_time > timeout_gap:
+                break
 
     if responses:
         for r in responses:
@@ -47,6 +50,207 @@ def send_tester_present_functional(bus, arbitration_id, is_extended_id):
     return responses
 
 
+# Physical request IDs of 29-bit normal fixed addressing from tester 0xF1: 0x18DA<target>F1.
+NORMAL_FIXED_REQUEST = 0x18DA00F1
+# Functional (broadcast) request IDs: OBD 11-bit and 29-bit normal fixed from tester 0xF1.
+FUNCTIONAL_REQUEST_IDS = (0x7DF, 0x18DB33F1)
+
+
+def is_tester_present_response(msg):
+    """True if the frame is a single-frame positive (7E) or negative (7F 3E) Tester Present response."""
+    data = msg.data
+    if len(data) < 3 or data[0] >> 4 != 0:
+        return False
+    return data[1] == 0x7E or (data[1] == 0x7F and data[2] == 0x3E)
+
+
+def discovery_ids(sweep_11bit=True, sweep_29bit=True, exclude=()):
+    """
+    Lists the (arbitration ID, is_extended_id) pairs a discovery sweep sends Tester Present on:
+    every 11-bit ID and every 29-bit normal fixed physical request ID 0x18DAxxF1. Functional
+    request IDs (FUNCTIONAL_REQUEST_IDS) are left out, since every ECU answers them.
+
+    Args:
+        sweep_11bit (bool): Include 0x000-0x7FF.
+        sweep_29bit (bool): Include 0x18DA00F1-0x18DAFFF1.
+        exclude (iterable): IDs to leave out, e.g. IDs already carrying other traffic.
+    """
+    exclude = set(exclude) | set(FUNCTIONAL_REQUEST_IDS)
+    ids = []
+    if sweep_11bit:
+        ids += [(arbitration_id, False) for arbitration_id in range(0x800) if arbitration_id not in exclude]
+    if sweep_29bit:
+        ids += [(NORMAL_FIXED_REQUEST | (target << 8), True) for target in range(0x100)
+                if NORMAL_FIXED_REQUEST | (target << 8) not in exclude]
+    return ids
+
+
+class _ResponseCollector(can.Listener):
+    """Collects Tester Present responses from a can.Notifier thread, with their arrival time."""
+
+    def __init__(self):
+        self.responses = []
+        self.seen_ids = set()
+
+    def on_message_received(self, msg):
+        self.seen_ids.add(msg.arbitration_id)
+        if is_tester_present_response(msg):
+            self.responses.append((time.monotonic(), msg.arbitration_id))
+
+    def clear(self):
+        self.responses = []
+
+    def responders(self):
+        return {arbitration_id for _, arbitration_id in self.responses}
+
+
+def _send_tester_present(bus, arbitration_id, is_extended_id):
+    msg = can.Message(arbitration_id=arbitration_id, data=bytes.fromhex("02 3E 00"),
+                      is_extended_id=is_extended_id)
+    try:
+        bus.send(msg)
+    except can.CanError:
+        time.sleep(0.01)  # transmit queue full; give the controller time to drain it
+        try:
+            bus.send(msg)
+        except can.CanError as e:
+            print(f"Failed to send Tester Present on ID {hex(arbitration_id)}: {e}")
+
+
+def _requests_answered_by(bus, collector, ecu_id, candidates, response_wait):
+    """
+    Finds which candidate request IDs an ECU answers on, by group testing.
+
+    Tester Present is sent on a group of candidates at once; groups the ECU answers are
+    halved until single IDs remain. Finding k request IDs among n candidates takes about
+    k * log2(n) rounds of response_wait.
+    """
+    def answers(group):
+        collector.clear()
+        for arbitration_id, is_ext in group:
+            _send_tester_present(bus, arbitration_id, is_ext)
+        time.sleep(response_wait)
+        return ecu_id in collector.responders()
+
+    def search(group, known=False):
+        if not known and not answers(group):
+            return []
+        if len(group) == 1:
+            return [group[0][0]]
+        middle = len(group) // 2
+        found = search(group[:middle])
+        # If the first half is silent the ECU answered the second half; no need to test it again.
+        return found + search(group[middle:], known=not found)
+
+    return search(candidates)
+
+
+def discover_ecus(bus, sweep_11bit=True, sweep_29bit=True, burst_size=16, burst_gap=0.02,
+                  response_wait=0.1, listen_time=1.0):
+    """
+    Discovers tester/ECU ID pairs by sweeping Tester Present over all physical request IDs.
+
+    The bus is first monitored for listen_time; IDs already carrying traffic are not swept,
+    so regular ECU messages are never spoofed. Tester Present ("3E 00") is then sent in bursts
+    of burst_size IDs every burst_gap seconds while a can.Notifier collects responses in the
+    background, so the sweep never waits on a single ID. 29-bit normal fixed responses name
+    their tester in the ID (0x18DAF1xx answers 0x18DAxxF1). Any other response is matched to
+    the bursts sent shortly before it and confirmed by re-sending Tester Present to those IDs
+    in halving groups.
+
+    Args:
+        bus: The CAN bus instance.
+        sweep_11bit (bool): Sweep 0x000-0x7FF.
+        sweep_29bit (bool): Sweep 0x18DA00F1-0x18DAFFF1.
+        burst_size (int): Tester Present messages sent back to back.
+        burst_gap (float): Seconds between two bursts; limits the bus load.
+        response_wait (float): Seconds to wait for responses after a burst (P2 with margin).
+        listen_time (float): Seconds of passive listening before the sweep.
+
+    Returns:
+        dict: Maps each request (tester) ID to the sorted list of ECU IDs that responded to it.
+    """
+    collector = _ResponseCollector()
+    with unfiltered(bus):  # responses can come from any ID
+        notifier = can.Notifier(bus, [collector])
+        pairs = {}
+        try:
+            time.sleep(listen_time)
+            busy = set(collector.seen_ids)
+            if busy:
+                print(f"Not sweeping {len(busy)} ID(s) that already carry traffic.")
+            ids = discovery_ids(sweep_11bit, sweep_29bit, exclude=busy)
+            print(f"Sweeping Tester Present over {len(ids)} IDs...")
+            collector.clear()
+            bursts = []
+            for i in range(0, len(ids), burst_size):
+                burst = ids[i:i + burst_size]
+                sent_at = time.monotonic()
+                for arbitration_id, is_ext in burst:
+                    _send_tester_present(bus, arbitration_id, is_ext)
+                bursts.append((sent_at, time.monotonic(), burst))
+                time.sleep(burst_gap)
+            time.sleep(response_wait)
+
+            # Attribute responses to the bursts that were on the bus just before them.
+            candidates = {}
+            swept = {arbitration_id for arbitration_id, _ in ids}
+            for received_at, ecu_id in collector.responses:
+                if ecu_id in busy:
+                    continue
+                tester_id = ecu_id
+                if (ecu_id >> 16) == (NORMAL_FIXED_REQUEST >> 16) and (ecu_id >> 8) & 0xFF == NORMAL_FIXED_REQUEST & 0xFF:
+                    tester_id = NORMAL_FIXED_REQUEST | ((ecu_id & 0xFF) << 8)
+                if tester_id != ecu_id and tester_id in swept:
+                    pairs.setdefault(tester_id, set()).add(ecu_id)
+                    continue
+                group = candidates.setdefault(ecu_id, [])
+                for started, finished, burst in bursts:
+                    if started <= received_at <= finished + response_wait:
+                        group.extend(entry for entry in burst if entry not in group)
+            for ecu_id, group in candidates.items():
+                if not group:
+                    group = list(ids)  # arrived late; search the whole sweep
+                print(f"Confirming request ID(s) of ECU {hex(ecu_id)} among {len(group)} candidate(s)...")
+                for tester_id in _requests_answered_by(bus, collector, ecu_id, group, response_wait):
+                    pairs.setdefault(tester_id, set()).add(ecu_id)
+        finally:
+            notifier.stop()
+    return {tester_id: sorted(ecu_ids) for tester_id, ecu_ids in sorted(pairs.items())}
+
+
+def print_discovery(pairs):
+    """Prints the tester/ECU ID pairs found by discover_ecus()."""
+    if not pairs:
+        print("No ECU responded to the sweep.")
+        return
+    for tester_id, ecu_ids in pairs.items():
+        print(f"tester {hex(tester_id)} -> ECU " + ", ".join(hex(ecu_id) for ecu_id in ecu_ids))
+
+
+def try_id_sweep(bus):
+    """
+    Runs discover_ecus(), prints the pairs found and lets the user pick a tester ID.
+
+    Returns:
+        (int, dict): The chosen tester ID (None if nothing was chosen) and the discovered
+                     {tester_id: [ecu_ids]} map.
+    """
+    pairs = discover_ecus(bus)
+    if not pairs:
+        print_discovery(pairs)
+        return None, pairs
+    testers = list(pairs)
+    for number, tester_id in enumerate(testers, start=1):
+        print(f"{number}. tester {hex(tester_id)} -> ECU " + ", ".join(hex(ecu_id) for ecu_id in pairs[tester_id]))
+    choice = input("Choose a tester ID by number (press Enter for 1): ").strip()
+    try:
+        return testers[int(choice) - 1 if choice else 0], pairs
+    except (ValueError, IndexError):
+        print("Invalid choice.")
+        return None, pairs
+
+
 def try_functional_broadcast(bus):
     """
     Attempts to send a Tester Present functional broadcast using standard tester IDs.
@@ -121,7 +325,7 @@ def try_functional_broadcast(bus):
 def background_tester_present(bus, arbitration_id, stop_event):
     """
     Continuously sends a Tester Present message every 1 second in a background thread,
-    until the stop_event is set.
+    until the stop_event is set. CyclicTesterPresent sends it without a Python thread.
 
     Args:
         bus: The CAN bus instance.
@@ -141,3 +345,109 @@ def background_tester_present(bus, arbitration_id, stop_event):
             print(f"Background Tester Present error: {e}")
         if stop_event.wait(1.0):
             break
+
+
+def pauses_during_scans(arbitration_id, pause_during_scans=None):
+    """
+    True if a keep-alive on arbitration_id stops while a scan runs (see CyclicTesterPresent).
+    By default (None) it pauses on physical request IDs and keeps running on functional ones.
+    """
+    if pause_during_scans is None:
+        return arbitration_id not in FUNCTIONAL_REQUEST_IDS
+    return pause_during_scans
+
+
+class CyclicTesterPresent:
+    """
+    Keeps the diagnostic session alive with a cyclic Tester Present sent by python-can.
+
+    Uses bus.send_periodic(), which SocketCAN implements with the kernel broadcast manager,
+    so keep-alive frames are sent on time without any Python-side work or GIL jitter. Other
+    interfaces fall back to python-can's own cyclic send thread.
+
+    Args:
+        bus: The CAN bus instance.
+        arbitration_id (int): The tester arbitration ID to use.
+        period (float): Seconds between two Tester Present messages (must stay below S3, 5 s).
+        suppress_response (bool): Send "3E 80" so the ECU does not answer each keep-alive.
+        pause_during_scans (bool): Stop the keep-alive inside scanning(), as scan traffic
+                                   already holds the session open. Its single frames on a
+                                   physical tester ID would land between the consecutive frames
+                                   of multi-frame scan requests on that ID, so the default (None)
+                                   pauses unless the keep-alive goes to a functional request ID.
+    """
+
+    def __init__(self, bus, arbitration_id, period=2.0, suppress_response=True, pause_during_scans=None):
+        self.bus = bus
+        self.arbitration_id = arbitration_id
+        self.period = period
+        self.suppress_response = suppress_response
+        self.pause_during_scans = pause_during_scans
+        self.task = None
+
+    def _message(self):
+        sub_function = 0x80 if self.suppress_response else 0x00
+        return can.Message(
+            arbitration_id=self.arbitration_id,
+            data=bytes([0x02, 0x3E, sub_function]),
+            is_extended_id=self.arbitration_id > 0x7FF
+        )
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    @property
+    def pauses(self):
+        """True if scanning() stops the keep-alive (see pause_during_scans)."""
+        return pauses_during_scans(self.arbitration_id, self.pause_during_scans)
+
+    def start(self):
+        """Starts the cyclic Tester Present if it is not running."""
+        if self.task is None:
+            try:
+                self.task = self.bus.send_periodic(self._message(), self.period)
+            except can.CanError as e:
+                print(f"Failed to start cyclic Tester Present: {e}")
+
+    def stop(self):
+        """Stops the cyclic Tester Present."""
+        if self.task is not None:
+            self.task.stop()
+            self.task = None
+
+    def modify(self, arbitration_id=None, period=None, suppress_response=None):
+        """
+        Changes the keep-alive while it runs. A new period restarts the cyclic task;
+        other changes update the frame in place where the interface supports it.
+        """
+        restart = period is not None and period != self.period
+        if arbitration_id is not None:
+            self.arbitration_id = arbitration_id
+        if period is not None:
+            self.period = period
+        if suppress_response is not None:
+            self.suppress_response = suppress_response
+        if self.task is None:
+            return
+        if not restart and isinstance(self.task, can.ModifiableCyclicTaskABC):
+            try:
+                self.task.modify_data(self._message())
+                return
+            except (ValueError, can.CanError):
+                pass  # e.g. the arbitration ID changed; restart with the new frame
+        self.stop()
+        self.start()
+
+    @contextlib.contextmanager
+    def scanning(self):
+        """Context for scans: pauses the keep-alive if it pauses during scans (see pauses)."""
+        if not (self.pauses and self.running):
+            yield
+            return
+        self.stop()
+        try:
+            yield
+        finally:
+            self.start()
+
@@ -0,0 +1,92 @@
+from collections import deque
+
+"""
+Adaptive response timeouts derived from measured ECU latency.
+
+An AdaptiveTimeout can be passed wherever the scanners take a timeout in seconds.
+It keeps a rolling window of response latencies per service and derives the wait
+for the next request from a high percentile of that window.
+"""
+
+
+class AdaptiveTimeout:
+    """
+    Per-ECU response timeout that follows the ECU's measured round-trip latency.
+
+    The timeout for a service is percentile(latencies) * margin, clamped to [floor, ceiling].
+    Until min_samples latencies are known it is `initial`. Every recalibrate_every requests
+    the ceiling is used once, so responses slower than the current estimate can still be seen.
+    A response arriving after its request timed out counts as a sample at twice that timeout.
+
+    Args:
+        initial (float): Timeout in seconds used before enough samples are collected.
+        floor (float): Lowest timeout in seconds.
+        ceiling (float): Highest timeout in seconds, also used for recalibration probes.
+        percentile (float): Latency percentile the timeout is based on (0-1).
+        margin (float): Factor applied to the percentile.
+        window (int): Number of recent latencies kept per service.
+        min_samples (int): Samples needed before the estimate is used.
+        recalibrate_every (int): Requests between recalibration probes (0 disables them).
+    """
+
+    def __init__(self, initial=0.3, floor=0.02, ceiling=2.0, percentile=0.99, margin=1.5,
+                 window=200, min_samples=20, recalibrate_every=500):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.margin = margin
+        self.window = window
+        self.min_samples = min_samples
+        self.recalibrate_every = recalibrate_every
+        self._samples = {}
+        self._estimates = {}
+        self._requests = 0
+        self._last = {}
+
+    def clone(self):
+        """Returns a new estimator with the same settings and no samples, e.g. for another ECU."""
+        return AdaptiveTimeout(self.initial, self.floor, self.ceiling, self.percentile, self.margin,
+                               self.window, self.min_samples, self.recalibrate_every)
+
+    def timeout_for(self, sid):
+        """Returns the timeout in seconds to use for the next request with the given service ID."""
+        self._requests += 1
+        if self.recalibrate_every and self._requests % self.recalibrate_every == 0:
+            timeout = self.ceiling
+        else:
+            timeout = self._estimates.get(sid, self.initial)
+        self._last[sid] = timeout
+        return timeout
+
+    def record(self, sid, latency):
+        """Adds a measured latency in seconds between a request and its first response."""
+        samples = self._samples.setdefault(sid, deque(maxlen=self.window))
+        samples.append(latency)
+        if len(samples) >= self.min_samples:
+            ordered = sorted(samples)
+            value = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+            self._estimates[sid] = min(self.ceiling, max(self.floor, value * self.margin))
+
+    def record_late(self, sid):
+        """Notes that a response for the service arrived after its request had timed out."""
+        self.record(sid, min(self.ceiling, 2 * self._last.get(sid, self.initial)))
+
+    def __str__(self):
+        if not self._estimates:
+            return f"auto ({self.initial}s until calibrated)"
+        current = ", ".join(f"0x{sid:02X}: {value:.3f}s" for sid, value in sorted(self._estimates.items()))
+        return f"auto ({current})"
+
+
+def parse_timeout(text, default=0.3):
+    """
+    Parses a timeout setting: seconds as a number, or "auto" for an AdaptiveTimeout.
+
+    Returns:
+        float or AdaptiveTimeout
+    """
+    text = str(text).strip().lower()
+    if text == "auto":
+        return AdaptiveTimeout(initial=default)
+    return float(text)
@@ -0,0 +1,161 @@
+import select
+import isotp
+
+"""
+ISO-TP transports for the scanners.
+
+Two backends provide the same stack interface (send, recv, available, process):
+
+    kernel  The Linux CAN_ISOTP socket. Segmentation, flow control and STmin timing
+            run in the kernel, so multi-frame transfers go at wire speed no matter
+            how often Python gets to run.
+    user    isotp.CanStack from can-isotp, run by its own thread in Python. Works
+            on every python-can interface.
+
+"auto" uses the kernel socket when the bus is SocketCAN and the kernel supports
+CAN_ISOTP, and the userspace stack otherwise. A bus with a trace capture attached
+(see capture.py) always uses the userspace stack, since frames sent and received by
+the kernel socket never pass through python-can.
+"""
+
+BACKENDS = ("auto", "kernel", "user")
+# Largest CAN FD payload, used as the ISO-TP frame length on CAN FD buses.
+CANFD_DATA_LENGTH = 64
+# canfd_frame flag requesting a bitrate switch for the data phase (CANFD_BRS in linux/can.h).
+CANFD_BRS = 0x01
+
+
+def isotp_params(stmin=0, blocksize=8, fd=False):
+    """Returns isotp.CanStack parameters, with 64-byte frames and bitrate switching for CAN FD."""
+    params = {'stmin': stmin, 'blocksize': blocksize}
+    if fd:
+        params.update({'can_fd': True, 'tx_data_length': CANFD_DATA_LENGTH, 'bitrate_switch': True})
+    return params
+
+
+class KernelIsoTpStack:
+    """
+    ISO-TP stack backed by a kernel CAN_ISOTP socket, with the subset of the isotp.CanStack
+    interface used by the scanners.
+
+    The kernel reassembles frames on its own, so there is nothing to process(); reads wait
+    on the socket. Transport errors (e.g. a missing flow control frame) are printed and
+    reported as "no frame", like the userspace stack does.
+
+    Args:
+        interface (str): SocketCAN network interface, e.g. can0.
+        address (isotp.Address): Tester/ECU addressing.
+        stmin (int): Separation time minimum sent in our flow control frames.
+        blocksize (int): Block size sent in our flow control frames.
+        fd (bool): Send 64-byte CAN FD frames with bitrate switching.
+    """
+
+    # Frames arrive without process() calls, like on a started isotp.CanStack.
+    started = True
+
+    def __init__(self, interface, address, stmin=0, blocksize=8, fd=False):
+        self.interface = interface
+        self.address = address
+        self.socket = isotp.socket()
+        try:
+            self.socket.set_fc_opts(bs=blocksize, stmin=stmin)
+            if fd:
+                self.socket.set_ll_opts(mtu=isotp.socket.LinkLayerProtocol.CAN_FD,
+                                        tx_dl=CANFD_DATA_LENGTH, tx_flags=CANFD_BRS)
+            self.socket.bind(interface, address)
+        except Exception:
+            self.socket.close()
+            raise
+
+    def send(self, data):
+        try:
+            self.socket.send(bytes(data))
+        except OSError as e:
+            print(f"ISO-TP send error: {e}")
+
+    def available(self):
+        readable, _, _ = select.select([self.socket], [], [], 0)
+        return bool(readable)
+
+    def recv(self, block=False, timeout=None):
+        """
+        Returns the next reassembled frame, or None if none arrives.
+
+        Args:
+            block (bool): Wait for a frame instead of returning at once.
+            timeout (float): Seconds to wait when blocking (None waits indefinitely).
+        """
+        wait = (timeout if block else 0)
+        readable, _, _ = select.select([self.socket], [], [], wait)
+        if not readable:
+            return None
+        try:
+            return self.socket.recv()
+        except OSError as e:
+            print(f"ISO-TP receive error: {e}")
+            return None
+
+    def process(self, rx_timeout=0.0, do_rx=True, do_tx=True):
+        """Does nothing; the kernel runs the protocol. Kept for callers of isotp.CanStack."""
+
+    def transmitting(self):
+        return False
+
+    def close(self):
+        self.socket.close()
+
+
+def kernel_interface(bus):
+    """Returns the SocketCAN interface name of a python-can bus, or None for other interfaces."""
+    if str(getattr(bus, "channel_info", "")).startswith("socketcan"):
+        return getattr(bus, "channel", None)
+    return None
+
+
+def open_isotp_stack(bus, address, stmin=0, blocksize=8, backend="auto", fd=False):
+    """
+    Creates an ISO-TP stack on the bus with the selected backend.
+
+    Args:
+        bus: The CAN bus instance.
+        address (isotp.Address): Tester/ECU addressing.
+        stmin (int): Separation time minimum (default 0).
+        blocksize (int): Block size (default 8).
+        backend (str): "kernel", "user" or "auto" (see BACKENDS).
+        fd (bool): Send 64-byte CAN FD frames with bitrate switching; the bus must be CAN FD.
+
+    Returns:
+        KernelIsoTpStack or isotp.CanStack. The userspace stack is started, so its own thread
+        runs the protocol and recv(block=True) returns as soon as a frame is reassembled.
+        Release it with close_stack().
+
+    Raises:
+        ValueError: For an unknown backend, or "kernel" on a bus that is not SocketCAN or is captured.
+        OSError, NotImplementedError: If "kernel" is selected and the kernel lacks CAN_ISOTP.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ISO-TP backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+    if backend == "kernel" and getattr(bus, "capture", None) is not None:
+        raise ValueError("Frames of the kernel ISO-TP backend cannot be captured; use the user backend")
+    if backend == "kernel" or (backend == "auto" and getattr(bus, "capture", None) is None):
+        interface = kernel_interface(bus)
+        if interface is None and backend == "kernel":
+            raise ValueError("The kernel ISO-TP backend needs a SocketCAN interface")
+        if interface is not None:
+            try:
+                return KernelIsoTpStack(interface, address, stmin, blocksize, fd)
+            except (OSError, NotImplementedError) as e:
+                if backend == "kernel":
+                    raise
+                print(f"Kernel ISO-TP unavailable ({e}), using the userspace stack.")
+    stack = isotp.CanStack(bus=bus, address=address, params=isotp_params(stmin, blocksize, fd))
+    stack.start()
+    return stack
+
+
+def close_stack(stack):
+    """Releases a stack created by open_isotp_stack(): kernel stacks hold a socket, userspace stacks a thread."""
+    if isinstance(stack, KernelIsoTpStack):
+        stack.close()
+    elif getattr(stack, "started", False):
+        stack.stop()
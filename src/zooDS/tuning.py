@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from .utils import send_and_collect, set_isotp_stack
+from .transport import close_stack
+
+"""
+ISO-TP flow control calibration.
+
+Our flow control frames tell the ECU how fast it may send the consecutive frames of a
+long response: STmin is the gap between frames, the block size the number of frames
+between two flow control frames. Faster settings than the ECU or the link can sustain
+show up as lost frames and timeouts. calibrate_isotp() measures throughput and error
+rate of a bulk request under several settings; the best ones are stored per tester/ECU
+pair and picked up by set_isotp_stack() for every later stack.
+"""
+
+# Default calibration grid, fastest first. STmin uses the ISO 15765-2 encoding:
+# 0x00-0x7F milliseconds, 0xF1-0xF9 100-900 microseconds.
+STMIN_CANDIDATES = (0x00, 0xF1, 0xF5, 0x01, 0x02, 0x05, 0x0A)
+BLOCKSIZE_CANDIDATES = (0, 32, 16, 8, 4)
+
+TUNING_PATH = os.path.join(os.path.expanduser("~"), ".zoods", "isotp_tuning.json")
+
+
+def describe_stmin(stmin):
+    """Returns a readable STmin, e.g. '5 ms' or '100 us'."""
+    if 0xF1 <= stmin <= 0xF9:
+        return f"{(stmin - 0xF0) * 100} us"
+    return f"{stmin} ms"
+
+
+def _key(tester_id, ecu_id):
+    return f"{tester_id:X}:{ecu_id:X}"
+
+
+def load_tuning(tester_id, ecu_id, path=None):
+    """
+    Returns the stored flow control settings for a tester/ECU pair.
+
+    Returns:
+        dict: {"stmin", "blocksize", "throughput", "measured"}, or None if the pair was never calibrated.
+    """
+    path = path or TUNING_PATH
+    try:
+        with open(path) as f:
+            return json.load(f).get(_key(tester_id, ecu_id))
+    except (OSError, ValueError):
+        return None
+
+
+def save_tuning(tester_id, ecu_id, stmin, blocksize, throughput, path=None):
+    """Stores the flow control settings for a tester/ECU pair, keeping other pairs' entries."""
+    path = path or TUNING_PATH
+    try:
+        with open(path) as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        store = {}
+    store[_key(tester_id, ecu_id)] = {
+        "stmin": stmin,
+        "blocksize": blocksize,
+        "throughput": round(throughput, 1),
+        "measured": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(store, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def measure_transfer(stack, request, trials=5, timeout=1.0):
+    """
+    Sends a request with a multi-frame response several times and measures the transfer.
+
+    A trial fails if the ECU does not answer, answers negatively, or returns a different
+    length than the first complete response.
+
+    Returns:
+        dict: {"ok": successful trials, "errors": failed trials,
+               "throughput": response bytes per second over the successful trials}
+    """
+    expected = None
+    ok = errors = 0
+    received = 0
+    elapsed = 0.0
+    for _ in range(trials):
+        started = time.monotonic()
+        responses = send_and_collect(stack, request, timeout)
+        duration = time.monotonic() - started
+        if not responses or responses[0].negative:
+            errors += 1
+            continue
+        if expected is None:
+            expected = len(responses[0])
+        if len(responses[0]) != expected:
+            errors += 1
+            continue
+        ok += 1
+        received += len(responses[0])
+        elapsed += duration
+    return {"ok": ok, "errors": errors, "throughput": received / elapsed if elapsed else 0.0}
+
+
+def calibrate_isotp(bus, tester_id, ecu_id, request, trials=5, timeout=1.0, backend="auto",
+                    stmin_candidates=STMIN_CANDIDATES, blocksize_candidates=BLOCKSIZE_CANDIDATES,
+                    path=None):
+    """
+    Measures a bulk request under every STmin/block size combination and stores the best one.
+
+    The best setting is the fastest one without errors. If every setting failed at least
+    once, nothing is stored.
+
+    Args:
+        bus: The CAN bus instance.
+        tester_id (int): Tester (source) ID.
+        ecu_id (int): ECU (destination) ID.
+        request (bytes): A request with a long (multi-frame) response, e.g. a
+                         ReadMemoryByAddress of a few hundred bytes.
+        trials (int): Requests per setting.
+        timeout (float): Time in seconds to wait for each response.
+        backend (str): ISO-TP implementation (see transport.BACKENDS).
+        stmin_candidates (tuple): STmin values to try, raw encoding.
+        blocksize_candidates (tuple): Block sizes to try.
+        path (str): Tuning store (default TUNING_PATH).
+
+    Returns:
+        tuple: (best, results) where best is a (stmin, blocksize, throughput) tuple or None,
+               and results maps (stmin, blocksize) to measure_transfer() results.
+    """
+    id_mode = "29" if tester_id > 0x7FF or ecu_id > 0x7FF else "11"
+    results = {}
+    best = None
+    for stmin in stmin_candidates:
+        for blocksize in blocksize_candidates:
+            stack = set_isotp_stack((bus, tester_id, ecu_id, id_mode), stmin, blocksize, backend=backend)
+            try:
+                result = measure_transfer(stack, request, trials, timeout)
+            finally:
+                close_stack(stack)
+            results[(stmin, blocksize)] = result
+            print(f"STmin {describe_stmin(stmin):>7}, block size {blocksize:>2}: "
+                  f"{result['throughput']:8.0f} B/s, {result['errors']}/{trials} errors")
+            if result["ok"] and not result["errors"] and (best is None or result["throughput"] > best[2]):
+                best = (stmin, blocksize, result["throughput"])
+    if best:
+        save_tuning(tester_id, ecu_id, *best, path=path)
+    return best, results
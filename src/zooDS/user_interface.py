@@ -3,8 +3,11 @@ zooDS main module that provides an interactive command-line interface for UDS (U
 communications over CAN bus. This module allows scanning DIDs, RIDs, memory addresses, 
 and sending custom UDS services.
 """
-from zooDS import did_scan, mem_scan, tester_present, utils, rid_scan, key_crack
+import contextlib
+from zooDS import did_scan, mem_scan, tester_present, utils, rid_scan, key_crack, multi_scan, tuning, service_scan
 from .utils import set_can_channel, stack_parms, set_isotp_stack, get_hex_input
+from .timing import AdaptiveTimeout, parse_timeout
+from .transport import close_stack
 
 
 def zds():
@@ -14,6 +17,8 @@ def zds():
     """
 
     bus = None
+    stack = None
+    keep_alive = None
     try:
         # Set up the CAN interface with error handling
         interface = input("Enter CAN interface (e.g., can0, vcan0): ").strip()
@@ -22,14 +27,29 @@ def zds():
             if not bus:
                 print(f"Failed to initialize CAN interface '{interface}'. Exiting.")
                 return
+            if utils.bus_is_fd(bus):
+                print("CAN FD interface detected; ISO-TP will use 64-byte frames.")
         except Exception as e:
             print(f"Error setting up CAN interface: {e}")
             return
 
         # Option to discover valid tester arbitration ID.
+        ecu_ids = []
+        ecu_testers = None
         if input("Attempt to discover valid tester ID? (y/n): ").strip().lower().startswith('y'):
             try:
-                tester_id = utils.process_id_result(tester_present.try_functional_broadcast(bus))
+                method = input("1. Functional broadcast\n"
+                               "2. Sweep all physical IDs\n"
+                               "Choose discovery method (press Enter for 1): ").strip()
+                if method == '2':
+                    tester_id, pairs = tester_present.try_id_sweep(bus)
+                    ecu_testers = {ecu_id: tester for tester, ecus in pairs.items() for ecu_id in ecus}
+                    ecu_ids = sorted(ecu_testers)
+                else:
+                    discovered = tester_present.try_functional_broadcast(bus)
+                    if isinstance(discovered, tuple):
+                        ecu_ids = discovered[1]
+                    tester_id = utils.process_id_result(discovered)
                 if not tester_id:
                     print("Failed to discover a valid tester ID.")
                     tester_id = get_hex_input("Enter tester (source) id in hex: ")
@@ -47,12 +67,20 @@ def zds():
             print(f"Error setting up ISO-TP stack: {e}")
             return
 
+        # Optional keep-alive so the session does not drop through an S3 timeout.
+        if input("Keep session alive with cyclic Tester Present? (y/n): ").strip().lower().startswith('y'):
+            pause = input("Pause it during scans, so it cannot interrupt multi-frame requests? "
+                          "(y/n, Enter for yes): ").strip().lower()
+            keep_alive = tester_present.CyclicTesterPresent(bus, tester_id, pause_during_scans=not pause.startswith('n'))
+            keep_alive.start()
+        scanning = keep_alive.scanning if keep_alive else contextlib.nullcontext
+
         # Set default timeout for responses, allow configuration
         default_timeout = 0.3
-        timeout = input(f"Enter response timeout in seconds (default: {default_timeout}): ").strip()
+        timeout = input(f"Enter response timeout in seconds or 'auto' (default: {default_timeout}): ").strip()
         if timeout:
             try:
-                default_timeout = float(timeout)
+                default_timeout = parse_timeout(timeout)
                 print(f"Timeout set to {default_timeout} seconds")
             except ValueError:
                 print(f"Invalid timeout value. Using default: {default_timeout} seconds")
@@ -66,34 +94,111 @@ def zds():
                 "3. Scan Memory by Address\n"
                 "4. Update Tester/ECU IDs\n"
                 "5. Configure Timeout\n"
-                "6. Exit\n"
+                "6. Scan All Discovered ECUs\n"
+                "7. Calibrate ISO-TP Flow Control\n"
+                "8. Scan Services\n"
+                "9. Exit\n"
                 "Or enter a UDS service (e.g., 10 01): "
             ).strip()
 
             if user_choice == '1':
-                    did_scan.try_all_dids(stack, timeout=default_timeout)
+                    batch = input("Enter DIDs per request (press Enter for 1): ").strip()
+                    try:
+                        batch_size = int(batch) if batch else 1
+                    except ValueError:
+                        print("Invalid batch size, using 1.")
+                        batch_size = 1
+                    with scanning():
+                        did_scan.try_all_dids(stack, timeout=default_timeout, batch_size=batch_size)
             elif user_choice == '2':
-                    rid_scan.try_all_rids(stack, timeout=default_timeout)
+                    mode = input("Probe RIDs with (r)equest results [default, does not run routines], "
+                                 "s(t)op routine or (s)tart routine? ").strip().lower()
+                    sub_function = {'s': rid_scan.START_ROUTINE, 't': rid_scan.STOP_ROUTINE}.get(
+                        mode[:1], rid_scan.REQUEST_ROUTINE_RESULTS)
+                    allow_unsafe = sub_function == rid_scan.START_ROUTINE and input(
+                        "Also start erase-memory and safety system routines? (y/n): ").strip().lower().startswith('y')
+                    with scanning():
+                        rid_scan.try_all_rids(stack, timeout=default_timeout, sub_function=sub_function,
+                                              allow_unsafe=allow_unsafe)
             elif user_choice == '3':
-                    mem_scan.try_memory_scan(stack, timeout=default_timeout)
+                    with scanning():
+                        mem_scan.try_memory_scan(stack, timeout=default_timeout)
             elif user_choice == '4':
                 # Update both tester and ECU IDs
                 tester_id = get_hex_input("Enter Tester (source) id in hex: ")
+                # The current stack is only replaced once the new one is open.
+                filters = bus.filters
                 try:
-                    stack_params = stack_parms(bus, tester_id)
-                    stack = set_isotp_stack(stack_params)
-                    print("IDs updated successfully")
+                    new_parms = stack_parms(bus, tester_id)
+                    new_stack = set_isotp_stack(new_parms)
                 except Exception as e:
                     print(f"Error updating IDs: {e}")
+                    new_stack = None
+                if new_stack is None:
+                    # Opening the new stack may already have filtered the bus down to the new ECU ID.
+                    bus.set_filters(filters)
+                    print("Keeping the current IDs.")
+                    continue
+                close_stack(stack)
+                stack, parms = new_stack, new_parms
+                if keep_alive:
+                    keep_alive.modify(arbitration_id=parms[1])
+                print("IDs updated successfully")
             elif user_choice == '5':
                 # Allow timeout configuration
                 try:
-                    new_timeout = float(input("Enter new timeout value in seconds: ").strip())
+                    new_timeout = parse_timeout(input("Enter new timeout value in seconds or 'auto': ").strip())
                     default_timeout = new_timeout
                     print(f"Timeout updated to {default_timeout} seconds")
                 except ValueError:
                     print("Invalid timeout value. Keeping current setting.")
             elif user_choice == '6':
+                if not ecu_ids:
+                    print("No ECUs discovered. Restart zooDS and run tester ID discovery first.")
+                    continue
+                kind = input("Scan (d)IDs or (r)IDs on all discovered ECUs? ").strip().lower()
+                # Adaptive timeouts are learned per ECU.
+                if isinstance(default_timeout, AdaptiveTimeout):
+                    ecu_timeout = default_timeout.clone
+                else:
+                    ecu_timeout = lambda: default_timeout
+                if kind.startswith('d'):
+                    label, scan = "DID", lambda ecu_stack, stop: did_scan.scan_dids(
+                        ecu_stack, timeout=ecu_timeout(), stop=stop)
+                elif kind.startswith('r'):
+                    label, scan = "RID", lambda ecu_stack, stop: rid_scan.scan_rids(
+                        ecu_stack, timeout=ecu_timeout(), stop=stop)
+                else:
+                    print("Invalid choice.")
+                    continue
+                # The main stack's thread would read frames meant for the per-ECU stacks.
+                close_stack(stack)
+                try:
+                    report = multi_scan.scan_ecus(bus, ecu_ids, scan, tester_ids=ecu_testers)
+                finally:
+                    stack = set_isotp_stack(parms)
+                multi_scan.print_report(report, label, ecu_testers)
+            elif user_choice == '7':
+                _, tester_id, ecu_id, _ = parms
+                request = input("Enter a request with a long response in hex (e.g. 23 14 00 00 80 00 FF): ").strip()
+                try:
+                    request = bytes.fromhex(request)
+                except ValueError:
+                    print("Invalid hex input.")
+                    continue
+                close_stack(stack)
+                with scanning():
+                    best, _ = tuning.calibrate_isotp(bus, tester_id, ecu_id, request)
+                if best:
+                    print(f"Saved STmin {tuning.describe_stmin(best[0])}, block size {best[1]} "
+                          f"({best[2]:.0f} B/s) for {hex(tester_id)}/{hex(ecu_id)}.")
+                else:
+                    print("No setting completed every transfer; keeping the current settings.")
+                stack = set_isotp_stack(parms)
+            elif user_choice == '8':
+                    with scanning():
+                        service_scan.try_service_scan(stack, timeout=default_timeout)
+            elif user_choice == '9':
                     break
             else:
                 try:
@@ -103,12 +208,11 @@ def zds():
                     continue
 
                 print(f"Sending UDS service: {user_choice}...")
-                stack.send(service_bytes)
-                responses = utils.wait_for_responses(stack, timeout=default_timeout)
+                responses = utils.send_and_collect(stack, service_bytes, timeout=default_timeout)
 
                 if responses:
                     for resp in responses:
-                        utils.print_response(resp, service_bytes)
+                        utils.print_response(resp)
                 else:
                     print("No UDS response received within timeout.")
 
@@ -121,6 +225,10 @@ def zds():
     except Exception as e:
         print(f"Unexpected error: {e}")
     finally:
+        if keep_alive:
+            keep_alive.stop()
+        if stack:
+            close_stack(stack)
         # shut down bus
         if bus:
             try:
@@ -1,92 +1,135 @@
+import contextlib
 import time
 import isotp
 import can
+from .capture import attach_capture
+from .read_response import UDSResponse, process_ecu_response
+from .timing import AdaptiveTimeout
+from .transport import open_isotp_stack
 
 """
 Utility module to handle common tasks
    """
-# Dictionary mapping standard UDS negative response codes (NRC) to their text descriptions.
-NEGATIVE_RESPONSE_CODES = {
-    0x10: "General Reject",
-    0x11: "Service Not Supported",
-    0x12: "Sub-Function Not Supported",
-    0x13: "Incorrect Message Length or Invalid Format",
-    0x14: "Response Too Long",
-    0x21: "Busy Repeat Request",
-    0x22: "Conditions Not Correct",
-    0x24: "Request Sequence Error",
-    0x31: "Request Out Of Range",
-    0x33: "Security Access Denied",
-    0x35: "Invalid Key",
-    0x36: "Exceeded Number of Attempts",
-    0x37: "Required Time Delay Not Expired",
-    0x70: "Upload/Download Not Accepted",
-    0x71: "Transfer Data Suspended",
-    0x72: "General Programming Failure",
-    0x73: "Wrong Block Sequence Counter",
-    0x78: "Response Pending",
-    0x7E: "Sub-function Not Supported In Active Session",
-    0x7F: "Service Not Supported In Active Session"
-}
-
-
-def is_negative_response(response):
-    """Determines if the provided UDS response is a negative response.
-        The first byte of a UDS negative response is 0x7F."""
-    # return True if it is a negative response, otherwise False
-    return len(response) > 0 and response[0] == 0x7F
-
-
-def process_ecu_response(response: bytes) -> str:
-    """Processes a UDS response and compares it against standard negative response codes.
-
-    The UDS negative response format is:
-        [0x7F, <original service id>, <negative response code>]
-
-    return: A text description of the negative response if one is detected.
-             If the response is not negative, returns an empty string.
-             If the response is malformed, returns a suitable error message."""
+# Time in seconds the ECU may take to send its final response after NRC 0x78 (P2* server max).
+P2_STAR_TIMEOUT = 5.0
+# MTU of a SocketCAN interface set up for CAN FD frames (struct canfd_frame).
+CANFD_MTU = 72
+
+
+def is_response_to(response, sid):
+    """
+    Determines if the response frame answers a request with the given service ID.
+
+    Positive responses carry SID + 0x40 in the first byte, negative responses are [0x7F, SID, NRC].
+    """
     if not response:
-        return "No response received."
+        return False
+    if response[0] == 0x7F:
+        return len(response) > 1 and response[1] == sid
+    return response[0] == (sid + 0x40) & 0xFF
 
-    # Check if it is a negative response (first byte should be 0x7F).
-    if response[0] != 0x7F:
-        return "Positive Response"
 
-    # Ensure response has enough bytes to extract the negative response code.
-    if len(response) < 3:
-        return "Malformed negative response."
+def _drain(stack, sid=None):
+    """
+    Discards frames left over from earlier requests (e.g. late responses).
 
-    # The negative response code starts at the third byte.
-    nrc = response[2]
-    description = NEGATIVE_RESPONSE_CODES.get(nrc, f"Unknown negative response code: {nrc:02X}")
-    return description
+    Returns:
+        int: Number of discarded frames answering the given service ID.
+    """
+    late = 0
+    while stack.available():
+        if is_response_to(stack.recv(), sid):
+            late += 1
+    return late
 
 
-def wait_for_responses(stack, timeout, sleep_interval=0.01):
+def send_and_collect(stack, request, timeout=0.3, p2_star_timeout=P2_STAR_TIMEOUT,
+                     busy_retries=3, busy_backoff=0.05):
+    """
+    Sends a UDS request and returns as soon as the ECU's final response to it arrives.
+
+    NRC 0x78 (Response Pending) extends the wait by p2_star_timeout. NRC 0x21 (Busy Repeat Request)
+    resends the request after an exponential backoff, up to busy_retries times. Frames that do not
+    answer the request (see UDSResponse.answers), such as a late positive response to an earlier
+    request for another identifier, are dropped and the wait goes on.
+
+    With an AdaptiveTimeout, the wait comes from the ECU's measured latency for the service, and
+    the latency of the first response to each send, without the busy backoff, is fed back into it.
+
+    Args:
+        stack: Started ISO-TP stack from open_isotp_stack(), with send(), available() and a blocking recv().
+        request (bytes): The complete UDS request message.
+        timeout (float or AdaptiveTimeout): Time in seconds to wait for the first response (P2 client).
+        p2_star_timeout (float): Time in seconds to wait after each Response Pending NRC.
+        busy_retries (int): Number of times to repeat the request on a Busy NRC.
+        busy_backoff (float): Delay in seconds before the first repeat, doubled on each retry.
+
+    Returns:
+        List holding the final response as a UDSResponse, or an empty list if the ECU did not
+        answer in time.
+    """
+    sid = request[0]
+    estimator = timeout if isinstance(timeout, AdaptiveTimeout) else None
+    if _drain(stack, sid) and estimator:
+        estimator.record_late(sid)
+    if estimator:
+        timeout = estimator.timeout_for(sid)
+    stack.send(request)
+    attempt = 0
+    sent = time.monotonic()
+    deadline = sent + timeout
+    measured = estimator is None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        frame = stack.recv(block=True, timeout=remaining)
+        if frame is None:
+            continue
+        response = UDSResponse(frame)
+        if not response.answers(request):
+            continue
+        if not measured:
+            estimator.record(sid, time.monotonic() - sent)
+            measured = True
+        if response.nrc == 0x78:
+            deadline = time.monotonic() + p2_star_timeout
+            continue
+        if response.nrc == 0x21 and attempt < busy_retries:
+            time.sleep(busy_backoff * (2 ** attempt))
+            attempt += 1
+            stack.send(request)
+            sent = time.monotonic()
+            deadline = sent + timeout
+            measured = estimator is None
+            continue
+        return [response]
+
+
+def wait_for_responses(stack, timeout):
     """
     Waits for responses from the ECU via the provided stack.
 
+    Prefer send_and_collect() for single requests; this function always waits out the idle
+    timeout, which is only useful when the number of responses is unknown.
+
     Args:
-        stack: Communication interface with methods process(), available(), and recv().
+        stack: Started ISO-TP stack from open_isotp_stack(), with a blocking recv().
         timeout (float): Time in seconds to wait after the last received frame before stopping.
-        sleep_interval (float): Interval in seconds between stack checks.
 
     Returns:
-        List of received response frames.
+        List of received responses as UDSResponse objects.
     """
     responses = []
-    last_frame_time = time.time()
+    last_frame_time = time.monotonic()
     while True:
-        stack.process()
-        if stack.available():
-            response = stack.recv()
-            # print(f"Received response: {response.hex()}")
-            responses.append(response)
-            last_frame_time = time.time()  # Reset timeout on each response.
-        if time.time() - last_frame_time > timeout:
+        remaining = timeout - (time.monotonic() - last_frame_time)
+        if remaining <= 0:
             break
-        time.sleep(sleep_interval)
+        response = stack.recv(block=True, timeout=remaining)
+        if response is not None:
+            responses.append(UDSResponse(response))
+            last_frame_time = time.monotonic()  # Reset timeout on each response.
     return responses
 
 
@@ -108,46 +151,117 @@ def get_hex_input(prompt):
         return None
 
 
+def print_response(response):
+    """
+    Prints ECU response frame's message data, and decoded ASCII data.
 
+    Args:
+        response (UDSResponse): ECU response frame.
+    """
+    print(f"{response.hex(' ')}: {process_ecu_response(response)}")
+    print(f"data: {response.payload.hex()}")
+    print(f"ascii: {response.ascii}")
 
 
-def print_response(response, service_bytes):
+def parse_hex_range(text):
     """
-    Prints ECU response frame's message data, and decoded ASCII data.
+    Parses an inclusive hex range such as "F100-F1FF", or a single hex value.
 
     Args:
-        response: ECU response frame (bytes).
-        service_bytes: Request from Tester (bytes)
+        text (str): The range string.
 
+    Returns:
+        tuple: (start, end) as integers.
     """
-    processed = process_ecu_response(response)
-    raw = response.hex(' ')
-    # first two bytes in response are header  first two bytes.
-    if len(service_bytes) > 2:
-        data = response.hex()[6:]
-    else:
-        data = response.hex()[4:]
+    start, _, end = text.partition('-')
+    start = int(start.strip(), 16)
+    end = int(end.strip(), 16) if end else start
+    if start > end:
+        raise ValueError(f"Range start 0x{start:X} is above range end 0x{end:X}")
+    return start, end
+
+
+def can_filters_for(rx_ids, extended=None):
+    """
+    Builds exact-match python-can filters for the given receive IDs.
+
+    Args:
+        rx_ids (iterable): Arbitration IDs to receive.
+        extended (bool): Match 29-bit IDs; by default IDs above 0x7FF are taken as 29-bit.
+
+    Returns:
+        list: can_filters entries, one per ID.
+    """
+    filters = []
+    for rx_id in rx_ids:
+        is_ext = rx_id > 0x7FF if extended is None else extended
+        filters.append({"can_id": rx_id, "can_mask": 0x1FFFFFFF if is_ext else 0x7FF, "extended": is_ext})
+    return filters
+
+
+def set_rx_filters(bus, rx_ids=None, extended=None):
+    """
+    Installs receive filters for rx_ids on the bus, or removes all filters if rx_ids is None.
+    SocketCAN applies them in the kernel, so other frames never reach Python.
+    """
+    bus.set_filters(can_filters_for(rx_ids, extended) if rx_ids is not None else None)
+
+
+@contextlib.contextmanager
+def unfiltered(bus):
+    """Receives every frame inside the context, e.g. for discovery, then restores the filters."""
+    previous = bus.filters
+    bus.set_filters(None)
     try:
-        decoded = bytearray.fromhex(data).decode('ascii', errors='replace')
-    except ValueError:
-        decoded = ""
-    print(f"{raw}: {processed}")
-    print(f"data: {data}")
-    print(f"ascii: {decoded}")
+        yield bus
+    finally:
+        bus.set_filters(previous)
+
 
+def interface_supports_fd(interface):
+    """
+    True if the SocketCAN interface is configured for CAN FD (its MTU is CANFD_MTU, 72).
 
-def set_can_channel(interface):
+    Args:
+        interface (str): name of CAN bus network.
+    """
+    try:
+        with open(f"/sys/class/net/{interface}/mtu") as f:
+            return int(f.read().strip()) == CANFD_MTU
+    except (OSError, ValueError):
+        return False
+
+
+def bus_is_fd(bus):
+    """True if the python-can bus was opened for CAN FD."""
+    return getattr(bus, "protocol", None) == can.CanProtocol.CAN_FD
+
+
+def set_can_channel(interface, rx_ids=None, fd=None, capture=None):
     """
         Retruns sting of CAN bus instance channel.
 
         Args:
             interface (str): name of CAN bus network.
+            rx_ids (list): Only receive these arbitration IDs (default: receive everything).
+            fd (bool): Open the bus for CAN FD (default: when the interface supports it).
+            capture (str): Log every frame sent and received to this file (.blf, .asc, .log, ...).
         """
+    can_filters = can_filters_for(rx_ids) if rx_ids else None
+    if fd is None:
+        fd = interface_supports_fd(interface)
     try:
-        bus = can.interface.Bus(channel=interface, interface='socketcan', timeout=0.3)
+        bus = can.interface.Bus(channel=interface, interface='socketcan', timeout=0.3, can_filters=can_filters, fd=fd)
     except Exception as e:
         print(f"Error opening interface {interface}: {e}")
         return
+    if capture:
+        try:
+            attach_capture(bus, capture)
+        except (ValueError, OSError) as e:
+            print(f"Error opening capture file {capture}: {e}")
+            bus.shutdown()
+            return
     return bus
 
 
@@ -188,17 +302,41 @@ def stack_parms(bus, tester_id):
     return bus, tester_id, ecu_id, id_mode
 
 
-def set_isotp_stack(parms, stmin=0, blocksize=8):
+def flow_control_for(tester_id, ecu_id, stmin=None, blocksize=None):
+    """
+    Resolves the flow control settings for a tester/ECU pair.
+
+    Values left as None come from the pair's calibration (see tuning.calibrate_isotp),
+    or default to STmin 0 and block size 8 for pairs that were never calibrated.
+
+    Returns:
+        tuple: (stmin, blocksize)
+    """
+    if stmin is None or blocksize is None:
+        from .tuning import load_tuning
+        tuned = load_tuning(tester_id, ecu_id) or {}
+        stmin = tuned.get("stmin", 0) if stmin is None else stmin
+        blocksize = tuned.get("blocksize", 8) if blocksize is None else blocksize
+    return stmin, blocksize
+
+
+def set_isotp_stack(parms, stmin=None, blocksize=None, filter_rx=True, backend="auto", fd=None):
     """
     Creates and returns an ISO-TP stack for the provided tester and ECU IDs.
 
+    With filter_rx, the bus is filtered down to the ECU ID, replacing earlier filters,
+    so frames of other nodes are dropped before they reach the stack.
+
     Args:
         parms (tuple): [bus, tester_id, ecu_id, id_mode]
-        stmin (int): Separation time minimum (default 0).
-        blocksize (int): Block size (default 8).
+        stmin (int): Separation time minimum (default: calibrated value, or 0).
+        blocksize (int): Block size (default: calibrated value, or 8).
+        filter_rx (bool): Install a receive filter for the ECU ID (default True).
+        backend (str): ISO-TP implementation, "kernel", "user" or "auto" (see transport.BACKENDS).
+        fd (bool): Send 64-byte CAN FD frames with bitrate switching (default: when the bus is CAN FD).
 
     Returns:
-        isotp.CanStack: The configured ISO-TP stack.
+        The configured ISO-TP stack (transport.KernelIsoTpStack or isotp.CanStack).
     """
     if parms and isinstance(parms, tuple):
         bus, tester_id, ecu_id, id_mode = parms
@@ -210,8 +348,41 @@ def set_isotp_stack(parms, stmin=0, blocksize=8):
             print("Invalid identifier mode, defaulting to 11-bit.")
             addressing_mode = isotp.AddressingMode.Normal_11bits
         address = isotp.Address(addressing_mode, txid=tester_id, rxid=ecu_id)
-        return isotp.CanStack(bus=bus, address=address, params={'stmin': stmin, 'blocksize': blocksize})
+        if filter_rx:
+            set_rx_filters(bus, [ecu_id], extended=addressing_mode == isotp.AddressingMode.Normal_29bits)
+        stmin, blocksize = flow_control_for(tester_id, ecu_id, stmin, blocksize)
+        if fd is None:
+            fd = bus_is_fd(bus)
+        return open_isotp_stack(bus, address, stmin, blocksize, backend, fd)
     else:
         print("Invalid parameters")
         return
 
+
+def open_stack(interface, tester_id, ecu_id, stmin=None, blocksize=None, backend="auto", fd=None, capture=None):
+    """
+    Opens the CAN interface and an ISO-TP stack for a tester/ECU pair without prompting.
+
+    Args:
+        interface (str): name of CAN bus network.
+        tester_id (int): Tester (source) ID; IDs above 0x7FF select 29-bit addressing.
+        ecu_id (int): ECU (destination) ID.
+        stmin (int): Separation time minimum (default: calibrated value, or 0).
+        blocksize (int): Block size (default: calibrated value, or 8).
+        backend (str): ISO-TP implementation, "kernel", "user" or "auto" (see transport.BACKENDS).
+        fd (bool): Use CAN FD (default: when the interface supports it).
+        capture (str): Log every frame to this file (see set_can_channel).
+
+    Returns:
+        tuple: (bus, stack), or None if the interface or the stack could not be opened.
+    """
+    bus = set_can_channel(interface, fd=fd, capture=capture)
+    if not bus:
+        return
+    id_mode = "29" if tester_id > 0x7FF or ecu_id > 0x7FF else "11"
+    try:
+        return bus, set_isotp_stack((bus, tester_id, ecu_id, id_mode), stmin, blocksize, backend=backend)
+    except (ValueError, OSError, NotImplementedError) as e:
+        print(f"Error opening {backend} ISO-TP stack on {interface}: {e}")
+        bus.shutdown()
+        return
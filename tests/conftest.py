@@ -0,0 +1,57 @@
+import contextlib
+import uuid
+
+import isotp
+import pytest
+
+from zooDS import cli
+from zooDS.simulator import SimulatedECU, virtual_bus
+from zooDS.transport import close_stack, open_isotp_stack
+
+
+@pytest.fixture
+def simulated_ecu():
+    """
+    Starts a SimulatedECU on a private python-can virtual bus; no CAN hardware is needed.
+
+    Returns a factory called with SimulatedECU keyword arguments, which returns (ecu, stack)
+    with stack a tester ISO-TP stack talking to the ECU on 0x7E0/0x7E8.
+    """
+    with contextlib.ExitStack() as cleanup:
+        def start(**kwargs):
+            channel = f"zoods-test-{uuid.uuid4().hex}"
+            ecu_bus = virtual_bus(channel)
+            cleanup.callback(ecu_bus.shutdown)
+            tester_bus = virtual_bus(channel)
+            cleanup.callback(tester_bus.shutdown)
+            ecu = cleanup.enter_context(SimulatedECU(ecu_bus, **kwargs))
+            address = isotp.Address(isotp.AddressingMode.Normal_11bits, txid=0x7E0, rxid=0x7E8)
+            stack = open_isotp_stack(tester_bus, address, backend="user")
+            cleanup.callback(close_stack, stack)
+            return ecu, stack
+        yield start
+
+
+@pytest.fixture
+def simulated_cli(monkeypatch):
+    """
+    Points the CLI commands at a SimulatedECU instead of a CAN interface.
+
+    Returns a factory called with SimulatedECU keyword arguments, which starts the ECU and
+    makes cli.open_stack() open a stack to it on every invocation; returns the ECU.
+    """
+    with contextlib.ExitStack() as cleanup:
+        def start(**kwargs):
+            channel = f"zoods-test-{uuid.uuid4().hex}"
+            ecu_bus = virtual_bus(channel)
+            cleanup.callback(ecu_bus.shutdown)
+            ecu = cleanup.enter_context(SimulatedECU(ecu_bus, **kwargs))
+
+            def open_stack(iface, tx, rx, **options):
+                bus = virtual_bus(channel)
+                address = isotp.Address(isotp.AddressingMode.Normal_11bits, txid=tx, rxid=rx)
+                return bus, open_isotp_stack(bus, address, backend="user")
+
+            monkeypatch.setattr(cli, "open_stack", open_stack)
+            return ecu
+        yield start
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from zooDS import cli, mem_scan
+from zooDS.checkpoint import ScanCheckpoint
+
+
+def test_resume_restores_cursor_and_hits(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    with ScanCheckpoint(path, "did", 0x0000, 0xFFFF) as checkpoint:
+        checkpoint.hit(0xF190, b"VIN")
+        checkpoint.advance(0x1234)
+    with ScanCheckpoint(path, "did", 0x0000, 0xFFFF, resume=True) as checkpoint:
+        assert checkpoint.cursor == 0x1234
+        assert checkpoint.hits == {0xF190: b"VIN"}
+        assert not checkpoint.finished
+
+
+def test_resume_ignores_a_torn_last_line(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    with ScanCheckpoint(path, "rid", 0x0000, 0x00FF) as checkpoint:
+        checkpoint.advance(0x0080)
+    with open(path, "a") as f:
+        f.write('{"cursor": 2')
+    assert ScanCheckpoint(path, "rid", 0x0000, 0x00FF, resume=True).cursor == 0x0080
+
+
+def test_resume_rejects_another_scan(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    ScanCheckpoint(path, "did", 0x0000, 0xFFFF).close()
+    with pytest.raises(ValueError):
+        ScanCheckpoint(path, "did", 0x0000, 0x00FF, resume=True)
+
+
+def test_completed_scan_is_finished(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    with ScanCheckpoint(path, "mem", 0x1000, 0x1FFF) as checkpoint:
+        checkpoint.complete(0x1000, 0x1FFF)
+    assert ScanCheckpoint(path, "mem", 0x1000, 0x1FFF, resume=True).finished
+
+
+def test_without_resume_the_checkpoint_starts_over(tmp_path):
+    path = str(tmp_path / "scan.ckpt")
+    with ScanCheckpoint(path, "did", 0x0000, 0xFFFF) as checkpoint:
+        checkpoint.advance(0x8000)
+    assert ScanCheckpoint(path, "did", 0x0000, 0xFFFF).cursor == 0x0000
+
+
+def test_interrupted_memory_scan_resumes(simulated_cli, monkeypatch, tmp_path):
+    simulated_cli(memory=bytes(range(256)) * 4, memory_base=0x1000)
+    checkpoint, output = str(tmp_path / "mem.ckpt"), str(tmp_path / "mem.jsonl")
+    args = ["scan-mem", "--iface", "sim", "--tx", "7E0", "--rx", "7E8", "--range", "1000-13FF", "--size", "40",
+            "--addr-len", "4", "--size-len", "1", "--timeout", "0.2", "--checkpoint", checkpoint, "--output", output]
+    build_request = mem_scan.build_read_memory_request
+
+    def interrupt_at_0x1200(address, *args):
+        if address == 0x1200:
+            raise KeyboardInterrupt
+        return build_request(address, *args)
+
+    monkeypatch.setattr(mem_scan, "build_read_memory_request", interrupt_at_0x1200)
+    result = CliRunner().invoke(cli.app, args)
+    assert "Scan interrupted at 0x1200; rerun with --resume to continue." in result.output
+    assert ScanCheckpoint(checkpoint, "mem", 0x1000, 0x13FF, resume=True).cursor == 0x1200
+
+    monkeypatch.setattr(mem_scan, "build_read_memory_request", build_request)
+    result = CliRunner().invoke(cli.app, args + ["--resume"])
+    assert result.exit_code == 0
+    addresses = [int(json.loads(line)["id"], 16) for line in open(output)]
+    assert addresses == list(range(0x1000, 0x1400, 0x40))
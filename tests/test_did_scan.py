@@ -0,0 +1,50 @@
+import pytest
+
+from zooDS.did_scan import scan_dids, split_did_records
+
+
+def test_split_did_records_in_request_order():
+    payload = bytes.fromhex("F190 414243 F18C 3132")
+    assert split_did_records(payload, [0xF190, 0xF18A, 0xF18C]) == {0xF190: b"ABC", 0xF18C: b"12"}
+
+
+def test_split_did_records_single_record_keeps_all_data():
+    payload = bytes.fromhex("0010 AABBCC")
+    assert split_did_records(payload, [0x0010, 0x0012]) == {0x0010: bytes.fromhex("AABBCC")}
+
+
+def test_split_did_records_stops_at_unrequested_did():
+    payload = bytes.fromhex("0001 AA 1234 BB")
+    assert split_did_records(payload, [0x0001, 0x0002]) == {0x0001: bytes.fromhex("AA1234BB")}
+
+
+def test_split_did_records_ambiguous_data_is_split_wrongly():
+    # Data of 0x0010 holds the bytes of 0x0012, so the guessed boundary is wrong.
+    payload = bytes.fromhex("0010 0012AA 0012 0102")
+    assert split_did_records(payload, [0x0010, 0x0012]) != {0x0010: bytes.fromhex("0012AA"),
+                                                             0x0012: bytes.fromhex("0102")}
+
+
+def test_scan_dids_confirms_ambiguous_batches(simulated_ecu):
+    dids = {0x0010: bytes.fromhex("0012AA"), 0x0012: bytes.fromhex("0102"), 0x0014: bytes.fromhex("05")}
+    _, stack = simulated_ecu(dids=dids)
+    results = {}
+    hits = scan_dids(stack, 0x0000, 0x001F, timeout=0.2, batch_size=32,
+                     on_result=lambda did, response: results.__setitem__(did, response))
+    assert hits == dids
+    assert all(bytes(results[did]) == b"\x62" + did.to_bytes(2, "big") + data for did, data in dids.items())
+    assert results[0x0011].nrc == 0x31
+
+
+def test_scan_dids_bisects_oversized_batches(simulated_ecu):
+    _, stack = simulated_ecu(dids={0x0003: b"\x01", 0x0030: b"\x02"}, max_dids_per_request=4)
+    assert scan_dids(stack, 0x0000, 0x003F, timeout=0.2, batch_size=16) == {0x0003: b"\x01", 0x0030: b"\x02"}
+
+
+@pytest.mark.parametrize("trust_out_of_range, hits", [
+    (True, {}),
+    (False, {0x0003: b"\x01", 0x0030: b"\x02"}),
+])
+def test_scan_dids_bisects_out_of_range_batches_only_on_request(simulated_ecu, trust_out_of_range, hits):
+    _, stack = simulated_ecu(dids={0x0003: b"\x01", 0x0030: b"\x02"}, reject_partial_batches=True)
+    assert scan_dids(stack, 0x0000, 0x003F, timeout=0.2, batch_size=16, trust_out_of_range=trust_out_of_range) == hits
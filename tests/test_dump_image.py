@@ -0,0 +1,30 @@
+import pytest
+
+from zooDS.dump_image import DumpImage
+
+
+def test_missing_ranges_follow_writes_and_refusals(tmp_path):
+    with DumpImage(str(tmp_path / "dump.bin"), 0x1000, 0x100) as image:
+        assert image.missing() == [[0x1000, 0x10FF]]
+        image.write(0x1000, bytes(0x10))
+        image.write(0x1080, bytes(0x10))
+        image.mark_nrc(0x10F0, 0x10, 0x33)
+        assert image.missing() == [[0x1010, 0x107F], [0x1090, 0x10EF]]
+        assert image.missing(0x1008, 0x1017) == [[0x1010, 0x1017]]
+        assert image.missing(retry_nrc=True)[-1] == [0x1090, 0x10FF]
+
+
+def test_reopened_image_keeps_data_and_index(tmp_path):
+    path = str(tmp_path / "dump.bin")
+    with DumpImage(path, 0x1000, 0x100) as image:
+        image.write(0x1010, b"\xAA\xBB")
+    with DumpImage(path, 0x1000, 0x100) as image:
+        assert bytes(image.read(0x1010, 2)) == b"\xAA\xBB"
+        assert image.missing() == [[0x1000, 0x100F], [0x1012, 0x10FF]]
+
+
+def test_reopening_with_another_range_fails(tmp_path):
+    path = str(tmp_path / "dump.bin")
+    DumpImage(path, 0x1000, 0x100).close()
+    with pytest.raises(ValueError):
+        DumpImage(path, 0x1000, 0x200)
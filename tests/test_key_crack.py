@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from zooDS.key_crack import request_seed, solve_and_send, xor_key
+from zooDS.key_solver import apply_transform
+from zooDS.utils import send_and_collect
+
+ALGORITHM = [("xor", 0x0000BEEF), ("add", 0x11223344)]
+
+
+@pytest.fixture
+def seeds(monkeypatch):
+    """Makes the simulated ECU's seeds reproducible."""
+    monkeypatch.setattr("zooDS.simulator.os.urandom", random.Random(0).randbytes)
+
+
+def test_invalid_key_discards_the_seed(simulated_ecu):
+    ecu, stack = simulated_ecu()
+    seed = send_and_collect(stack, b"\x27\x01", 0.2)[0].payload
+    assert send_and_collect(stack, b"\x27\x02" + bytes(4), 0.2)[0].nrc == 0x35
+    key = apply_transform(ecu.key_algorithm, bytes(seed))
+    assert send_and_collect(stack, b"\x27\x02" + key, 0.2)[0].nrc == 0x24
+    assert not ecu.unlocked
+
+
+def test_request_seed(simulated_ecu):
+    ecu, stack = simulated_ecu(security_levels=[0x03])
+    assert request_seed(stack, b"\x27\x04", 0.2) == ecu.seed
+    assert request_seed(stack, b"\x27\x02", 0.2) is None
+
+
+def test_xor_key_answers_a_fresh_seed_with_every_key(simulated_ecu, seeds):
+    ecu, stack = simulated_ecu()
+    seed = send_and_collect(stack, b"\x27\x01", 0.2)[0].payload
+    xor_key(bytes(seed), stack, b"\x27\x02")
+    assert ecu.unlocked
+    assert ecu.failed_attempts == 0
+
+
+def test_solve_and_send_computes_each_key_from_a_fresh_seed(simulated_ecu, seeds, monkeypatch):
+    ecu, stack = simulated_ecu(key_algorithm=ALGORITHM)
+    pairs = [(seed, apply_transform(ALGORITHM, seed)) for seed in
+             (bytes.fromhex("01020304"), bytes.fromhex("A1B2C3D4"), bytes.fromhex("DEADBEEF"))]
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+    seed = send_and_collect(stack, b"\x27\x01", 0.2)[0].payload
+    solve_and_send(bytes(seed), stack, b"\x27\x02", pairs)
+    assert ecu.unlocked
+
+
+def test_solve_and_send_stops_at_the_lockout(simulated_ecu, seeds, monkeypatch):
+    ecu, stack = simulated_ecu(key_algorithm=ALGORITHM, max_attempts=2)
+    pairs = [(seed, apply_transform(ALGORITHM, seed)) for seed in
+             (bytes.fromhex("01020304"), bytes.fromhex("A1B2C3D4"), bytes.fromhex("DEADBEEF"))]
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+    seed = send_and_collect(stack, b"\x27\x01", 0.2)[0].payload
+    solve_and_send(bytes(seed), stack, b"\x27\x02", pairs)
+    assert not ecu.unlocked
+    assert ecu.failed_attempts == 2
@@ -0,0 +1,36 @@
+import pytest
+
+from zooDS.key_solver import apply_transform, candidate_keys, solve_seed_key
+
+SEEDS = [bytes.fromhex(seed) for seed in ("01020304", "A1B2C3D4", "DEADBEEF", "00FF7F80")]
+
+
+@pytest.mark.parametrize("algorithm", [
+    [("xor", 0xA5A5A5A5)],
+    [("rotl", 5), ("xor", 0x1234ABCD)],
+    [("not", None), ("add", 0x00C0FFEE)],
+    [("xor", 0x0000BEEF), ("add", 0x11223344)],
+])
+def test_solver_predicts_the_key_of_a_new_seed(algorithm):
+    pairs = [(seed, apply_transform(algorithm, seed)) for seed in SEEDS]
+    seed = bytes.fromhex("13572468")
+    assert apply_transform(algorithm, seed) in [key for key, _ in candidate_keys(solve_seed_key(pairs), seed)]
+
+
+def test_enough_pairs_leave_a_single_key():
+    algorithm = [("rotl", 5), ("xor", 0x1234ABCD)]
+    pairs = [(seed, apply_transform(algorithm, seed)) for seed in SEEDS]
+    seed = bytes.fromhex("13572468")
+    assert [key for key, _ in candidate_keys(solve_seed_key(pairs), seed)] == [apply_transform(algorithm, seed)]
+
+
+def test_every_transform_fits_every_pair():
+    algorithm = [("bswap", None), ("rsub", 0x5A5A)]
+    pairs = [(seed, apply_transform(algorithm, seed)) for seed in (b"\x12\x34", b"\xAB\xCD", b"\x00\x01")]
+    for steps in solve_seed_key(pairs):
+        assert all(apply_transform(steps, seed) == key for seed, key in pairs)
+
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        solve_seed_key([(b"\x01\x02", b"\x03\x04"), (b"\x01", b"\x02")])
@@ -0,0 +1,131 @@
+import pytest
+
+from zooDS.dump_image import DumpImage
+from zooDS.mem_scan import (PROTECTED, READABLE, UNMAPPED, build_request_upload, map_memory_regions,
+                            parse_max_block_length, probe_max_read_size, probe_memory_access, probe_memory_format,
+                            upload_memory)
+from zooDS.read_response import UDSResponse
+
+BASE = 0x1000
+MEMORY = bytes(range(256)) * 6
+
+
+@pytest.fixture
+def image(tmp_path):
+    with DumpImage(str(tmp_path / "dump.bin"), BASE, len(MEMORY)) as image:
+        yield image
+
+
+def test_build_request_upload():
+    assert build_request_upload(0x1000, 0x200, 4, 2) == bytes.fromhex("35 00 24 00 00 10 00 02 00")
+
+
+@pytest.mark.parametrize("frame, block_length", [
+    ("75 20 01 02", 0x100),
+    ("75 10 42", 0x40),
+])
+def test_parse_max_block_length(frame, block_length):
+    assert parse_max_block_length(UDSResponse(bytes.fromhex(frame))) == block_length
+
+
+@pytest.mark.parametrize("frame", ["75", "75 20 01", "75 00"])
+def test_parse_max_block_length_rejects_truncated_responses(frame):
+    with pytest.raises(ValueError):
+        parse_max_block_length(UDSResponse(bytes.fromhex(frame)))
+
+
+def test_upload_wraps_the_block_sequence_counter(simulated_ecu, image):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, upload_block_length=6)
+    blocks = []
+    uploaded = upload_memory(stack, BASE, BASE + len(MEMORY) - 1, image, timeout=0.2,
+                             on_hit=lambda address, data: blocks.append(address))
+    assert uploaded == len(MEMORY)
+    assert len(blocks) == len(MEMORY) // 4 > 0x100
+    assert bytes(image.read(BASE, len(MEMORY))) == MEMORY
+    assert image.missing() == []
+    assert ecu.upload is None
+
+
+def test_upload_restarts_after_a_lost_block(simulated_ecu, image):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, upload_block_length=0x42, lost_blocks={0x03})
+    assert upload_memory(stack, BASE, BASE + 0x1FF, image, timeout=0.2) == 0x200
+    assert bytes(image.read(BASE, 0x200)) == MEMORY[:0x200]
+    assert image.missing(BASE, BASE + 0x1FF) == []
+
+
+def test_upload_stops_when_every_restart_loses_a_block(simulated_ecu, image):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, upload_block_length=0x42,
+                               lost_blocks={0x01})
+    assert upload_memory(stack, BASE, BASE + 0x1FF, image, timeout=0.2, retries=0) == 0
+    assert image.missing(BASE, BASE + 0x1FF) == [[BASE, BASE + 0x1FF]]
+
+
+def test_refused_upload_uploads_nothing(simulated_ecu, image):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE)
+    assert upload_memory(stack, BASE, BASE + 0xFF, image, timeout=0.2) == 0
+    assert image.missing() == [[BASE, BASE + len(MEMORY) - 1]]
+
+
+@pytest.mark.parametrize("formats, expected", [
+    (None, (4, 4, True)),
+    ((0x24, 0x14), (4, 2, True)),
+    ((0x12,), (2, 1, True)),
+    ((0x33,), None),
+])
+def test_probe_memory_format(simulated_ecu, formats, expected):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, memory_formats=formats)
+    assert probe_memory_format(stack, BASE, timeout=0.2) == expected
+
+
+def test_probe_memory_format_accepts_protected_addresses(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, memory_formats=(0x14,), protected=[(BASE, BASE + 0xFF)])
+    assert probe_memory_format(stack, BASE, timeout=0.2) == (4, 1, False)
+
+
+def test_probe_memory_format_falls_back_to_out_of_range_answers(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, memory_formats=(0x14,))
+    assert probe_memory_format(stack, BASE + len(MEMORY), timeout=0.2) == (4, 1, False)
+
+
+@pytest.mark.parametrize("max_read_size, expected", [(None, 0xFF), (0x40, 0x40), (0x01, 0x01)])
+def test_probe_max_read_size(simulated_ecu, max_read_size, expected):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, max_read_size=max_read_size)
+    assert probe_max_read_size(stack, BASE, 4, 1, timeout=0.2) == expected
+
+
+def test_probe_max_read_size_is_bounded_by_the_region(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE)
+    assert probe_max_read_size(stack, BASE + len(MEMORY) - 0x21, 4, 2, timeout=0.2) == 0x21
+    assert probe_max_read_size(stack, BASE + len(MEMORY), 4, 2, timeout=0.2) == 0
+
+
+def test_probe_memory_access_probes_only_unknown_lengths(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, memory_formats=(0x14, 0x24), max_read_size=0x80)
+    assert probe_memory_access(stack, BASE, timeout=0.2, mem_size_len=1) == (4, 1, 0x80)
+    assert probe_memory_access(stack, BASE, timeout=0.2, mem_addr_len=4, mem_size_len=1) == (4, 1, 0x80)
+    assert probe_memory_access(stack, BASE, timeout=0.2, mem_addr_len=2) is None
+
+
+def test_map_memory_regions_locates_the_edges(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, protected=[(BASE + 0x230, BASE + 0x3FF)])
+    regions = map_memory_regions(stack, BASE - 0x100, BASE + 0x7FF, stride=0x100, timeout=0.2)
+    assert regions == [
+        (BASE - 0x100, BASE - 1, UNMAPPED),
+        (BASE, BASE + 0x22F, READABLE),
+        (BASE + 0x230, BASE + 0x3FF, PROTECTED),
+        (BASE + 0x400, BASE + len(MEMORY) - 1, READABLE),
+        (BASE + len(MEMORY), BASE + 0x7FF, UNMAPPED),
+    ]
+
+
+def test_map_memory_regions_misses_regions_smaller_than_the_stride(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE, protected=[(BASE + 0x120, BASE + 0x12F)])
+    assert map_memory_regions(stack, BASE, BASE + 0x1FF, stride=0x100, timeout=0.2) == [
+        (BASE, BASE + 0x1FF, READABLE)]
+
+
+def test_map_memory_regions_with_a_coarse_granularity(simulated_ecu):
+    ecu, stack = simulated_ecu(memory=MEMORY, memory_base=BASE)
+    regions = map_memory_regions(stack, BASE, BASE + 0x7FF, stride=0x400, timeout=0.2, granularity=0x10)
+    assert [region[2] for region in regions] == [READABLE, UNMAPPED]
+    assert BASE + len(MEMORY) <= regions[1][0] < BASE + len(MEMORY) + 0x10
@@ -0,0 +1,61 @@
+import contextlib
+import os
+import signal
+import threading
+import time
+import uuid
+
+import pytest
+
+from zooDS import multi_scan
+from zooDS.did_scan import scan_dids
+from zooDS.simulator import SimulatedECU, virtual_bus
+
+ECUS = {0x7E8: {0xF190: b"VIN-A"}, 0x7E9: {0xF190: b"VIN-B", 0xF18C: b"SN-B"}}
+
+
+@pytest.fixture
+def bus():
+    """A tester bus on a private virtual channel with a simulated ECU for each entry of ECUS."""
+    channel = f"zoods-test-{uuid.uuid4().hex}"
+    with contextlib.ExitStack() as cleanup:
+        for ecu_id, dids in ECUS.items():
+            ecu_bus = virtual_bus(channel)
+            cleanup.callback(ecu_bus.shutdown)
+            cleanup.enter_context(SimulatedECU(ecu_bus, ecu_id=ecu_id, tester_id=multi_scan.tester_id_for(ecu_id),
+                                               dids=dids))
+        tester_bus = virtual_bus(channel)
+        cleanup.callback(tester_bus.shutdown)
+        yield tester_bus
+
+
+@pytest.mark.parametrize("ecu_id, tester_id", [(0x7E8, 0x7E0), (0x18DAF110, 0x18DA10F1)])
+def test_tester_id_for(ecu_id, tester_id):
+    assert multi_scan.tester_id_for(ecu_id) == tester_id
+
+
+def test_scan_ecus_scans_every_ecu(bus):
+    report = multi_scan.scan_ecus(bus, list(ECUS),
+                                  lambda stack, stop: scan_dids(stack, 0xF180, 0xF19F, 0.2, stop=stop))
+    assert {ecu_id: {did: bytes(data) for did, data in hits.items()} for ecu_id, hits in report.items()} == ECUS
+
+
+def test_scan_ecus_reports_failed_scans(bus):
+    def scan(stack, stop):
+        raise RuntimeError("lost")
+
+    report = multi_scan.scan_ecus(bus, list(ECUS), scan)
+    assert all(isinstance(result, RuntimeError) for result in report.values())
+
+
+def test_ctrl_c_stops_every_scan(bus):
+    def scan(stack, stop):
+        while not stop.wait(0.01):
+            pass
+        return "stopped"
+
+    started = time.monotonic()
+    threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGINT)).start()
+    report = multi_scan.scan_ecus(bus, list(ECUS), scan)
+    assert report == {ecu_id: "stopped" for ecu_id in ECUS}
+    assert time.monotonic() - started < 2
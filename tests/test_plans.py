@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from zooDS.plans import ScanPlan, hit_limit, load_plan
+
+
+@pytest.fixture
+def plan():
+    plan = ScanPlan("rid")
+    plan.merge({"ranges": [
+        {"start": "0010", "end": "0013", "priority": 10, "name": "Low"},
+        {"start": "0002", "end": "0004", "priority": 90, "name": "High"},
+        {"start": "0004", "end": "0006", "priority": 50, "name": "Middle"},
+        {"start": "000E", "end": "000F", "priority": 0, "name": "Erase", "unsafe": True},
+    ], "identifiers": {"0003": {"name": "Serial", "decoder": "ascii"}}})
+    return plan
+
+
+def test_ordered_ids_probe_high_priority_ranges_first(plan):
+    assert plan.ordered_ids(0x0000, 0x0013) == [
+        0x02, 0x03, 0x04, 0x05, 0x06, 0x10, 0x11, 0x12, 0x13,
+        0x00, 0x01, 0x07, 0x08, 0x09, 0x0A, 0x0B, 0x0C, 0x0D,
+        0x0E, 0x0F]
+
+
+def test_ordered_ids_with_min_priority_leave_out_unsafe_and_unranged_ids(plan):
+    assert plan.ordered_ids(0x0000, 0x0013, min_priority=50) == [0x02, 0x03, 0x04, 0x05, 0x06]
+    assert plan.ordered_ids(0x0000, 0x0013, min_priority=0) == [
+        0x02, 0x03, 0x04, 0x05, 0x06, 0x10, 0x11, 0x12, 0x13]
+
+
+def test_ordered_ids_stay_within_the_scan_range(plan):
+    assert plan.ordered_ids(0x0005, 0x000E) == [0x05, 0x06, 0x07, 0x08, 0x09, 0x0A, 0x0B, 0x0C, 0x0D, 0x0E]
+
+
+def test_unsafe_ids(plan):
+    assert plan.unsafe_ids() == {0x0E, 0x0F}
+    assert plan.unsafe_ids(0x0000, 0x000E) == {0x0E}
+
+
+def test_describe_names_and_decodes_hits(plan):
+    assert plan.describe(0x0003, b"AB12\x00") == ("Serial", "AB12")
+    assert plan.describe(0x0004, b"\x01\x02") == ("High", "0102")
+    assert plan.describe(0x0100, b"\xFF") == ("", "ff")
+
+
+def test_merge_rejects_unknown_decoders():
+    with pytest.raises(ValueError):
+        ScanPlan("did").merge({"identifiers": {"F190": {"decoder": "base64"}}})
+
+
+def test_hit_limit_stops_after_max_hits():
+    seen = []
+    on_hit = hit_limit(lambda identifier, data: seen.append(identifier), 2)
+    assert on_hit(0x01, b"") is True
+    assert on_hit(0x02, b"") is False
+    assert seen == [0x01, 0x02]
+    assert hit_limit(None, 0) is None
+
+
+def test_bundled_rid_plan_probes_erase_and_safety_routines_last():
+    plan = load_plan("rid", user_dir="/nonexistent")
+    ids = plan.ordered_ids()
+    assert ids[0] == 0xFF01
+    unsafe = plan.unsafe_ids()
+    assert {0xFF00, 0xFF02, 0xE200, 0xE2FF} <= unsafe
+    assert set(ids[-len(unsafe):]) == unsafe
+    assert not unsafe & set(plan.ordered_ids(min_priority=0))
+
+
+def test_load_plan_merges_user_dictionaries(tmp_path):
+    (tmp_path / "did_oem.json").write_text(json.dumps({
+        "kind": "did", "identifiers": {"F190": {"name": "Chassis number", "decoder": "ascii"}}}))
+    (tmp_path / "rid_oem.json").write_text(json.dumps({"kind": "rid", "identifiers": {"F190": {}}}))
+    plan = load_plan("did", user_dir=str(tmp_path))
+    assert plan.describe(0xF190, b"WVW") == ("Chassis number", "WVW")
+
+
+def test_load_plan_rejects_dictionaries_of_another_kind(tmp_path):
+    path = tmp_path / "extra.json"
+    path.write_text(json.dumps({"kind": "rid"}))
+    with pytest.raises(ValueError, match="rids, not dids"):
+        load_plan("did", [str(path)], user_dir=str(tmp_path))
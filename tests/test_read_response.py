@@ -0,0 +1,55 @@
+import pytest
+
+from zooDS.read_response import UDSResponse, process_ecu_response
+
+
+@pytest.mark.parametrize("frame, identifier, payload", [
+    ("62 F1 90 57 56 57", 0xF190, "57 56 57"),
+    ("71 01 02 03 00 10", 0x0203, "00 10"),
+    ("67 01 12 34 56 78", 0x01, "12 34 56 78"),
+    ("50 03 00 32 01 F4", 0x03, "00 32 01 F4"),
+    ("76 05 AA BB", 0x05, "AA BB"),
+    ("63 00 11 22", None, "00 11 22"),
+    ("7F 22 31", None, ""),
+    ("62 F1", None, ""),
+])
+def test_identifier_and_payload(frame, identifier, payload):
+    response = UDSResponse(bytes.fromhex(frame))
+    assert response.identifier == identifier
+    assert bytes(response.payload) == bytes.fromhex(payload)
+
+
+@pytest.mark.parametrize("frame, uds_request, answers", [
+    ("62 F1 90 00", "22 F1 90", True),
+    ("62 F1 8C 00", "22 F1 90", False),
+    ("62 F1 8C 00", "22 F1 90 F1 8C", True),
+    ("7F 22 31", "22 F1 90", True),
+    ("7F 22 31", "2E F1 90 00", False),
+    ("71 01 02 03 00", "31 01 02 03", True),
+    ("71 01 02 04 00", "31 01 02 03", False),
+    ("50 03 00 32 01 F4", "10 83", True),
+    ("67 01 00 00 00 00", "27 03", False),
+    ("76 05 AA", "36 05", True),
+    ("76 04 AA", "36 05", False),
+    ("63 00 11", "23 14 10 00 10", True),
+    ("63 00 11", "", False),
+])
+def test_answers(frame, uds_request, answers):
+    assert UDSResponse(bytes.fromhex(frame)).answers(bytes.fromhex(uds_request)) == answers
+
+
+def test_behaves_like_bytes():
+    response = UDSResponse(bytearray.fromhex("62 F1 90 41 42"))
+    assert response == bytes.fromhex("62 F1 90 41 42")
+    assert response[0] == 0x62
+    assert response[3:] == b"AB"
+    assert len(response) == 5
+    assert response.ascii == "AB"
+    assert hash(response) == hash(UDSResponse(bytes(response)))
+
+
+def test_negative_response():
+    response = UDSResponse(b"\x7F\x27\x35")
+    assert response.negative and not response.positive
+    assert (response.sid, response.nrc) == (0x27, 0x35)
+    assert process_ecu_response(response) == "Invalid Key"
@@ -0,0 +1,87 @@
+import uuid
+
+import isotp
+import pytest
+
+from zooDS.capture import attach_capture, is_capturing
+from zooDS.did_scan import scan_dids
+from zooDS.read_response import UDSResponse
+from zooDS.replay import IsoTpReassembler, replay, replay_transactions, transaction_hits
+from zooDS.simulator import SimulatedECU, virtual_bus
+from zooDS.transport import close_stack, open_isotp_stack
+
+DIDS = {0xF190: b"WVWZZZ1KZAW000001", 0xF18C: b"SN01"}
+
+
+def test_reassembler_single_and_multi_frame_messages():
+    reassembler = IsoTpReassembler()
+    assert reassembler.feed(bytes.fromhex("03 22 F1 90 AA AA AA AA")) == bytes.fromhex("22 F1 90")
+    assert reassembler.feed(bytes.fromhex("10 0A 62 F1 90 01 02 03")) is None
+    assert reassembler.feed(bytes.fromhex("30 00 00")) is None
+    assert reassembler.feed(bytes.fromhex("21 04 05 06 07 AA AA AA")) == bytes.fromhex("62 F1 90 01 02 03 04 05 06 07")
+
+
+def test_reassembler_drops_messages_with_a_lost_frame():
+    reassembler = IsoTpReassembler()
+    reassembler.feed(bytes.fromhex("10 0E 62 F1 90 01 02 03"))
+    assert reassembler.feed(bytes.fromhex("22 0B 0C 0D 0E 0F 10 11")) is None
+    assert reassembler.feed(bytes.fromhex("21 04 05 06 07 08 09 0A")) is None
+
+
+def test_reassembler_escape_lengths():
+    reassembler = IsoTpReassembler()
+    assert reassembler.feed(bytes([0x00, 0x0A]) + bytes(range(10)) + bytes(4)) == bytes(range(10))
+    assert reassembler.feed(bytes.fromhex("10 00 00 00 00 03 AA BB")) is None
+    assert reassembler.feed(bytes.fromhex("21 CC")) == bytes.fromhex("AA BB CC")
+
+
+@pytest.mark.parametrize("request_hex, response_hex, hits", [
+    ("22 F1 90", "62 F1 90 41 42", [("did", 0xF190, b"AB")]),
+    ("22 F1 90 F1 8C", "62 F1 90 41 F1 8C 42", [("did", 0xF190, b"A"), ("did", 0xF18C, b"B")]),
+    ("31 01 02 03", "71 01 02 03 00", [("rid", 0x0203, bytes.fromhex("71 01 02 03 00"))]),
+    ("23 14 00 00 10 00 02", "63 AA BB", [("mem", 0x1000, b"\xAA\xBB")]),
+    ("22 F1 90", "7F 22 31", []),
+    ("3E 00", "7E 00", []),
+])
+def test_transaction_hits(request_hex, response_hex, hits):
+    found = transaction_hits(bytes.fromhex(request_hex), UDSResponse(bytes.fromhex(response_hex)))
+    assert [(kind, identifier, bytes(data)) for kind, identifier, data in found] == hits
+
+
+@pytest.fixture
+def trace(tmp_path):
+    """Captures a DID scan of a simulated ECU, with Response Pending and Busy answers, to a candump log."""
+    path = str(tmp_path / "scan.log")
+    channel = f"zoods-test-{uuid.uuid4().hex}"
+    ecu_bus = virtual_bus(channel)
+    tester_bus = virtual_bus(channel)
+    writer = attach_capture(tester_bus, path)
+    try:
+        with SimulatedECU(ecu_bus, dids=DIDS, pending={0xF190: 2}, busy={0xF18C: 1}):
+            address = isotp.Address(isotp.AddressingMode.Normal_11bits, txid=0x7E0, rxid=0x7E8)
+            stack = open_isotp_stack(tester_bus, address, backend="user")
+            try:
+                scan_dids(stack, 0xF188, 0xF193, timeout=0.2)
+            finally:
+                close_stack(stack)
+    finally:
+        tester_bus.shutdown()
+        ecu_bus.shutdown()
+    assert not is_capturing(tester_bus)
+    assert writer.captured and not writer.dropped
+    return path
+
+
+def test_replay_re_derives_the_hits_of_a_captured_scan(trace):
+    hits = {}
+    counts = replay(trace, 0x7E0, 0x7E8, lambda kind, identifier, data: hits.setdefault(identifier, bytes(data)))
+    assert hits == DIDS
+    assert counts["hits"] == 2
+    assert counts["no response"] == 0
+
+
+def test_replay_pairs_requests_with_final_responses(trace):
+    transactions = [(request, response) for _, request, response in replay_transactions(trace, 0x7E0, 0x7E8)]
+    assert (bytes.fromhex("22 F1 8C"), UDSResponse(b"\x7F\x22\x21")) in transactions
+    assert all(response.nrc != 0x78 for _, response in transactions)
+    assert [request for request, _ in transactions].count(bytes.fromhex("22 F1 8C")) == 2
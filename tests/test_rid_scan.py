@@ -0,0 +1,44 @@
+import pytest
+
+from zooDS.read_response import UDSResponse
+from zooDS.plans import ScanPlan
+from zooDS.rid_scan import RID_ABSENT, RID_PRESENT, RID_UNKNOWN, START_ROUTINE, classify_rid, scan_rids, try_all_rids
+
+
+@pytest.mark.parametrize("frame, expected", [
+    ("71 03 02 00 00", RID_PRESENT),
+    ("7F 31 22", RID_PRESENT),
+    ("7F 31 24", RID_PRESENT),
+    ("7F 31 33", RID_PRESENT),
+    ("7F 31 31", RID_ABSENT),
+    ("7F 31 11", RID_UNKNOWN),
+    ("7F 31 12", RID_UNKNOWN),
+    ("7F 31 7F", RID_UNKNOWN),
+])
+def test_classify_rid(frame, expected):
+    assert classify_rid(UDSResponse(bytes.fromhex(frame))) == expected
+
+
+def test_classify_rid_without_response():
+    assert classify_rid(None) == RID_UNKNOWN
+
+
+def test_scan_rids_finds_routines_without_running_them(simulated_ecu):
+    ecu, stack = simulated_ecu(rids={0x0202: b"\x00", 0x0210: b"\x01"})
+    hits = scan_rids(stack, 0x0200, 0x021F, timeout=0.2)
+    assert sorted(hits) == [0x0202, 0x0210]
+    assert all(hit.nrc == 0x24 for hit in hits.values())
+    assert not ecu.running
+
+
+def test_try_all_rids_never_starts_unsafe_routines_by_default(simulated_ecu, monkeypatch):
+    ecu, stack = simulated_ecu(rids={0xFF00: b"\x00", 0xE201: b"\x00"})
+    plan = ScanPlan("rid")
+    plan.merge({"ranges": [{"start": "FF00", "end": "FF00", "unsafe": True},
+                           {"start": "E200", "end": "E2FF", "unsafe": True}]})
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+    monkeypatch.setattr(plan, "ordered_ids", lambda: [0xFF00, 0xE201, 0x0001])
+    try_all_rids(stack, timeout=0.1, plan=plan, sub_function=START_ROUTINE)
+    assert not ecu.running
+    try_all_rids(stack, timeout=0.1, plan=plan, sub_function=START_ROUTINE, allow_unsafe=True)
+    assert ecu.running
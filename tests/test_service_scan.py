@@ -0,0 +1,105 @@
+import pytest
+
+from zooDS.read_response import UDSResponse
+from zooDS.reporting import ScanReporter
+from zooDS.service_scan import (NO_RESPONSE, NOT_SUPPORTED, OTHER_SESSION, SUB_FUNCTION_SERVICES, SUPPORTED,
+                                classify_support, find_sessions, parse_template, scan_services, scan_template)
+
+
+class SidRecorder(ScanReporter):
+    """Records the SIDs of the service sweeps."""
+
+    def __init__(self):
+        super().__init__()
+        self.sids = []
+
+    def probe(self, kind, identifier, response, units=1, hits=None):
+        if kind.startswith("SID"):
+            self.sids.append(identifier)
+        super().probe(kind, identifier, response, units, hits)
+
+
+@pytest.mark.parametrize("template, parsed", [
+    ("19 ??", (b"\x19", 1, b"")),
+    ("22 F1 ??", (b"\x22\xF1", 1, b"")),
+    ("31 03 ?? ?? 00", (b"\x31\x03", 2, b"\x00")),
+    ("????", (b"", 2, b"")),
+])
+def test_parse_template(template, parsed):
+    assert parse_template(template) == parsed
+
+
+@pytest.mark.parametrize("template", ["22 F1 90", "22 F?", "?? 01 ??", "2G ??"])
+def test_parse_template_rejects_bad_templates(template):
+    with pytest.raises(ValueError):
+        parse_template(template)
+
+
+@pytest.mark.parametrize("frame, support", [
+    ("62 F1 90 00", SUPPORTED),
+    ("7F 22 13", SUPPORTED),
+    ("7F 22 33", SUPPORTED),
+    ("7F 22 31", NOT_SUPPORTED),
+    ("7F 22 11", NOT_SUPPORTED),
+    ("7F 22 7F", OTHER_SESSION),
+    ("7F 22 7E", OTHER_SESSION),
+])
+def test_classify_support(frame, support):
+    assert classify_support(UDSResponse(bytes.fromhex(frame))) == support
+
+
+def test_classify_support_without_response():
+    assert classify_support(None) == NO_RESPONSE
+
+
+def test_scan_template_sweeps_the_value(simulated_ecu):
+    ecu, stack = simulated_ecu(dids={0xF190: b"VIN", 0xF18C: b"SN"})
+    hits = []
+    results = scan_template(stack, "22 F1 ??", range(0x80, 0xA0), timeout=0.2,
+                            on_hit=lambda value, response: hits.append(value))
+    assert hits == [0x8C, 0x90]
+    assert results[0x81][0] == NOT_SUPPORTED
+    assert len(results) == 0x20
+
+
+def test_scan_template_stops_when_on_hit_returns_false(simulated_ecu):
+    ecu, stack = simulated_ecu(dids={0xF190: b"VIN", 0xF18C: b"SN"})
+    results = scan_template(stack, "22 F1 ??", range(0x80, 0xA0), timeout=0.2,
+                            on_hit=lambda value, response: False)
+    assert max(results) == 0x8C
+
+
+def test_find_sessions_skips_the_programming_session(simulated_ecu):
+    ecu, stack = simulated_ecu(sessions=(0x01, 0x02, 0x03, 0x40))
+    assert find_sessions(stack, timeout=0.2) == [0x01, 0x03, 0x40]
+    assert ecu.session == 0x01
+    assert find_sessions(stack, timeout=0.2, allow_unsafe=True) == [0x01, 0x02, 0x03, 0x40]
+
+
+def test_scan_services_maps_services_and_sub_functions(simulated_ecu):
+    ecu, stack = simulated_ecu(sessions=(0x01, 0x03), routine_sessions=(0x03,))
+    service_map = scan_services(stack, timeout=0.2)
+    assert sorted(service_map) == [0x01, 0x03]
+    default = service_map[0x01]
+    assert default[0x31] == (OTHER_SESSION, {})
+    assert default[0x10] == (SUPPORTED, {0x01: SUPPORTED, 0x03: SUPPORTED})
+    assert default[0x3E] == (SUPPORTED, {0x00: SUPPORTED})
+    assert default[0x11] == (SUPPORTED, {})
+    assert 0x14 not in default
+    assert service_map[0x03][0x31][0] == SUPPORTED
+    assert ecu.session == 0x01
+
+
+@pytest.mark.parametrize("all_sids, sids", [
+    (False, list(range(0x00, 0x40)) + list(range(0x80, 0xC0))),
+    (True, list(range(0x100))),
+])
+def test_scan_services_sends_response_sids_only_on_request(simulated_ecu, all_sids, sids):
+    ecu, stack = simulated_ecu()
+    reporter = SidRecorder()
+    scan_services(stack, sessions=[0x01], timeout=0.2, sub_functions=False, reporter=reporter, all_sids=all_sids)
+    assert reporter.sids == sids
+
+
+def test_secured_data_transmission_has_no_sub_functions():
+    assert 0x84 not in SUB_FUNCTION_SERVICES
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from zooDS import cli
+from zooDS.sinks import CsvSink, JsonlSink, open_sink
+
+
+def test_jsonl_sink_writes_one_record_per_hit(tmp_path):
+    path = tmp_path / "hits.jsonl"
+    with open_sink(str(path)) as sink:
+        assert isinstance(sink, JsonlSink)
+        sink.hit("did", 0xF190, b"VIN", 0x7E8, lambda identifier, data: ("VIN", data.decode()))
+        on_hit = sink.on_hit("rid", 0x7E8)
+        assert on_hit(0x0203, b"\x00") is True
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(record["kind"], record["id"], record["data"]) for record in records] == [
+        ("did", "0xF190", "56494e"), ("rid", "0x0203", "00")]
+    assert records[0]["ecu"] == "0x7E8"
+    assert (records[0]["name"], records[0]["value"]) == ("VIN", "VIN")
+    assert sink.count == 2
+
+
+def test_csv_sink_writes_the_header_once(tmp_path):
+    path = tmp_path / "hits.csv"
+    for data in (b"A", b"B"):
+        with open_sink(str(path)) as sink:
+            assert isinstance(sink, CsvSink)
+            sink.hit("did", 0xF190, data)
+    rows = list(csv.DictReader(path.open()))
+    assert [row["ascii"] for row in rows] == ["A", "B"]
+    assert rows[0]["ecu"] == ""
+
+
+def test_format_overrides_the_extension(tmp_path):
+    with open_sink(str(tmp_path / "hits.csv"), "jsonl") as sink:
+        assert isinstance(sink, JsonlSink)
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / "hits.xml"), "xml")
+    assert not (tmp_path / "hits.xml").exists()
+
+
+def test_records_are_flushed_after_the_interval():
+    stream = io.StringIO()
+    flushed = []
+    stream.flush = lambda: flushed.append(stream.getvalue().count("\n"))
+    sink = JsonlSink(stream, flush_interval=0, close_stream=False)
+    sink.hit("did", 0xF190, b"A")
+    assert flushed == [1]
+
+
+def test_headless_scan_rejects_an_unknown_format_before_opening_the_bus(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "open_stack", lambda *args, **kwargs: pytest.fail("bus opened"))
+    result = CliRunner().invoke(cli.app, ["scan-did", "--iface", "vcan0", "--tx", "7E0", "--rx", "7E8",
+                                          "--format", "xml", "--checkpoint", str(tmp_path / "scan.ckpt")])
+    assert result.exit_code == 1
+    assert "Unknown output format 'xml'" in result.output
+    assert not (tmp_path / "scan.ckpt").exists()
@@ -0,0 +1,88 @@
+import pytest
+from typer.testing import CliRunner
+
+from zooDS import cli
+from zooDS.did_scan import IDENTIFICATION_DIDS
+from zooDS.dump_image import DumpImage
+from zooDS.read_response import UDSResponse
+from zooDS.store import NEGATIVE, NO_RESPONSE, POSITIVE, ScanStore, is_settled, scan_context
+
+
+@pytest.mark.parametrize("response_class, nrc, settled", [
+    (POSITIVE, None, True),
+    (NEGATIVE, 0x11, True),
+    (NEGATIVE, 0x12, True),
+    (NEGATIVE, 0x31, True),
+    (NEGATIVE, 0x13, False),
+    (NEGATIVE, 0x22, False),
+    (NEGATIVE, 0x33, False),
+    (NEGATIVE, 0x7F, False),
+    (NO_RESPONSE, None, False),
+])
+def test_is_settled(response_class, nrc, settled):
+    assert is_settled(response_class, nrc) == settled
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ScanStore(str(tmp_path / "scans.db")) as store:
+        yield store
+
+
+def test_settled_ranges_merge_settled_memory_reads(store):
+    ecu = store.ecu(0x7E0, 0x7E8)
+    run = store.begin_run(ecu, "mem")
+    store.record(run, 0x1000, UDSResponse(b"\x63" + bytes(16)), 16)
+    store.record(run, 0x1010, UDSResponse(b"\x7F\x23\x31"), 16)
+    store.record(run, 0x1020, UDSResponse(b"\x7F\x23\x33"), 16)
+    store.record(run, 0x1030, None, 16)
+    store.record(run, 0x1040, UDSResponse(b"\x63" + bytes(16)), 16)
+    assert store.settled_ranges(ecu, "mem", 0x1000, 0x104F) == [[0x1000, 0x101F], [0x1040, 0x104F]]
+    assert store.settled_ranges(ecu, "mem", 0x1020, 0x103F) == []
+
+
+def test_settled_results_are_kept_per_scan_context(store):
+    ecu = store.ecu(0x7E0, 0x7E8)
+    default = store.begin_run(ecu, "rid", scan_context(sub_function=0x03))
+    store.record(default, 0x0200, UDSResponse(b"\x7F\x31\x31"))
+    store.record(default, 0x0201, UDSResponse(b"\x7F\x31\x12"))
+    assert store.settled(ecu, "rid", 0x0200, 0x0201, scan_context(sub_function=0x03)) == {0x0200, 0x0201}
+    assert store.settled(ecu, "rid", 0x0200, 0x0201, scan_context(0x03, 0x03)) == set()
+    assert store.settled(ecu, "rid", 0x0200, 0x0201, scan_context(sub_function=0x01)) == set()
+
+
+def test_changed_results_are_logged(store):
+    ecu = store.ecu(0x7E0, 0x7E8)
+    first = store.begin_run(ecu, "did")
+    store.record(first, 0xF190, UDSResponse(b"\x62\xF1\x90A"))
+    second = store.begin_run(ecu, "did")
+    store.record(second, 0xF190, UDSResponse(b"\x62\xF1\x90B"))
+    assert [change[1] for change in store.changes(second)] == [0xF190]
+    assert store.changes(first) == []
+
+
+def test_settled_probes_keep_the_responses(store):
+    ecu = store.ecu(0x7E0, 0x7E8)
+    run = store.begin_run(ecu, "mem")
+    store.record(run, 0x1000, UDSResponse(b"\x63\xAA\xBB"), 2)
+    store.record(run, 0x1002, UDSResponse(b"\x7F\x23\x33"), 2)
+    store.record(run, 0x1004, UDSResponse(b"\x7F\x23\x31"), 2)
+    assert [(ident, length, bytes(response)) for ident, length, response in store.settled_probes(ecu, "mem", 0, 0xFFFF)] == [
+        (0x1000, 2, b"\x63\xAA\xBB"), (0x1004, 2, b"\x7F\x23\x31")]
+
+
+def test_a_new_image_gets_the_ranges_settled_in_the_database(simulated_cli, tmp_path):
+    memory = bytes(range(256)) * 4
+    ecu = simulated_cli(memory=memory, memory_base=0x1000)
+    args = ["scan-mem", "--iface", "sim", "--tx", "7E0", "--rx", "7E8", "--range", "1000-147F", "--size", "40",
+            "--addr-len", "4", "--size-len", "1", "--timeout", "0.2", "--db", str(tmp_path / "scans.db")]
+    assert CliRunner().invoke(cli.app, args + ["--checkpoint", str(tmp_path / "first.ckpt")]).exit_code == 0
+    requests = ecu.requests
+    image = str(tmp_path / "dump.bin")
+    result = CliRunner().invoke(cli.app, args + ["--checkpoint", str(tmp_path / "second.ckpt"), "--image", image])
+    assert result.exit_code == 0
+    assert ecu.requests - requests == len(IDENTIFICATION_DIDS)
+    with DumpImage(image, 0x1000, 0x480) as dump:
+        assert bytes(dump.read(0x1000, len(memory))) == memory
+        assert dump.missing() == []
+        assert dump.missing(retry_nrc=True) == [[0x1400, 0x147F]]
@@ -0,0 +1,77 @@
+import contextlib
+import uuid
+
+import pytest
+from typer.testing import CliRunner
+
+from zooDS import cli
+from zooDS.simulator import SimulatedECU, virtual_bus
+from zooDS.tester_present import (FUNCTIONAL_REQUEST_IDS, NORMAL_FIXED_REQUEST, CyclicTesterPresent, discover_ecus,
+                                  discovery_ids)
+
+
+@pytest.fixture
+def bus():
+    """A tester bus on a private virtual channel with two simulated ECUs, one 11-bit and one 29-bit."""
+    channel = f"zoods-test-{uuid.uuid4().hex}"
+    with contextlib.ExitStack() as cleanup:
+        for tester_id, ecu_id in ((0x7E0, 0x7E8), (0x18DA10F1, 0x18DAF110)):
+            ecu_bus = virtual_bus(channel)
+            cleanup.callback(ecu_bus.shutdown)
+            cleanup.enter_context(SimulatedECU(ecu_bus, ecu_id=ecu_id, tester_id=tester_id))
+        tester_bus = virtual_bus(channel)
+        cleanup.callback(tester_bus.shutdown)
+        yield tester_bus
+
+
+def test_discovery_ids_leave_out_functional_and_excluded_ids():
+    ids = discovery_ids(exclude={0x100})
+    arbitration_ids = {arbitration_id for arbitration_id, _ in ids}
+    assert not arbitration_ids & set(FUNCTIONAL_REQUEST_IDS)
+    assert 0x100 not in arbitration_ids
+    assert len(ids) == 0x800 - 2 + 0x100
+    assert (NORMAL_FIXED_REQUEST | 0x1000, True) in ids
+    assert discovery_ids(sweep_11bit=False) == [(NORMAL_FIXED_REQUEST | (target << 8), True) for target in range(0x100)]
+
+
+def test_discover_ecus_finds_both_addressing_modes(bus):
+    pairs = discover_ecus(bus, burst_gap=0.005, response_wait=0.2, listen_time=0.05)
+    assert pairs == {0x7E0: [0x7E8], 0x18DA10F1: [0x18DAF110]}
+
+
+def test_discover_ecus_sweeps_only_the_selected_ids(bus):
+    pairs = discover_ecus(bus, sweep_29bit=False, burst_gap=0.005, response_wait=0.2, listen_time=0.05)
+    assert pairs == {0x7E0: [0x7E8]}
+
+
+@pytest.mark.parametrize("arbitration_id, pause_during_scans, pauses", [
+    (0x7E0, None, True),
+    (0x7DF, None, False),
+    (0x7E0, False, False),
+    (0x7DF, True, True),
+])
+def test_scanning_pauses_the_keep_alive(bus, arbitration_id, pause_during_scans, pauses):
+    tester_present = CyclicTesterPresent(bus, arbitration_id, 0.05, pause_during_scans=pause_during_scans)
+    assert tester_present.pauses == pauses
+    tester_present.start()
+    try:
+        with tester_present.scanning():
+            assert tester_present.running != pauses
+        assert tester_present.running
+    finally:
+        tester_present.stop()
+
+
+@pytest.mark.parametrize("options, message", [
+    ([], "would send nothing"),
+    (["--no-pause-keep-alive"], "bus unavailable"),
+])
+def test_headless_scans_reject_a_keep_alive_that_never_sends(monkeypatch, tmp_path, options, message):
+    def open_stack(*args, **kwargs):
+        print("bus unavailable")
+
+    monkeypatch.setattr(cli, "open_stack", open_stack)
+    result = CliRunner().invoke(cli.app, ["scan-did", "--iface", "vcan0", "--tx", "7E0", "--rx", "7E8",
+                                          "--keep-alive", "2", "--checkpoint", str(tmp_path / "scan.ckpt")] + options)
+    assert result.exit_code == 1
+    assert message in result.output
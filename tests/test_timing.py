@@ -0,0 +1,48 @@
+from zooDS.timing import AdaptiveTimeout, parse_timeout
+
+
+def test_initial_timeout_until_enough_samples():
+    timeout = AdaptiveTimeout(initial=0.3, min_samples=5, recalibrate_every=0)
+    for _ in range(4):
+        timeout.record(0x22, 0.01)
+    assert timeout.timeout_for(0x22) == 0.3
+
+
+def test_timeout_follows_the_measured_latency():
+    timeout = AdaptiveTimeout(floor=0.001, margin=2.0, min_samples=5, recalibrate_every=0)
+    for _ in range(10):
+        timeout.record(0x22, 0.01)
+    assert timeout.timeout_for(0x22) == 0.02
+    assert timeout.timeout_for(0x31) == timeout.initial
+
+
+def test_timeout_is_clamped():
+    timeout = AdaptiveTimeout(floor=0.05, ceiling=1.0, min_samples=1, recalibrate_every=0)
+    timeout.record(0x22, 0.001)
+    assert timeout.timeout_for(0x22) == 0.05
+    timeout.record(0x23, 5.0)
+    assert timeout.timeout_for(0x23) == 1.0
+
+
+def test_recalibration_probe_uses_the_ceiling():
+    timeout = AdaptiveTimeout(ceiling=2.0, min_samples=1, recalibrate_every=3)
+    timeout.record(0x22, 0.01)
+    assert [timeout.timeout_for(0x22) for _ in range(3)][-1] == 2.0
+
+
+def test_late_response_counts_as_twice_the_timeout():
+    timeout = AdaptiveTimeout(initial=0.1, margin=1.0, min_samples=1, recalibrate_every=0)
+    timeout.timeout_for(0x22)
+    timeout.record_late(0x22)
+    assert timeout.timeout_for(0x22) == 0.2
+
+
+def test_clone_has_no_samples():
+    timeout = AdaptiveTimeout(min_samples=1)
+    timeout.record(0x22, 0.5)
+    assert timeout.clone().timeout_for(0x22) == timeout.initial
+
+
+def test_parse_timeout():
+    assert parse_timeout("0.5") == 0.5
+    assert isinstance(parse_timeout("auto"), AdaptiveTimeout)
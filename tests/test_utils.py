@@ -0,0 +1,59 @@
+import time
+
+from zooDS.timing import AdaptiveTimeout
+from zooDS.utils import send_and_collect, wait_for_responses
+
+DIDS = {0xF190: b"WVWZZZ1KZAW000001", 0xF18C: b"SN0001"}
+
+
+def test_response_pending_extends_the_wait(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, pending={0xF190: 3}, pending_time=0.1)
+    responses = send_and_collect(stack, b"\x22\xF1\x90", timeout=0.05)
+    assert [bytes(response.payload) for response in responses] == [DIDS[0xF190]]
+
+
+def test_busy_repeats_the_request(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, busy={0xF190: 2})
+    responses = send_and_collect(stack, b"\x22\xF1\x90", timeout=0.2, busy_backoff=0.01)
+    assert responses[0].positive
+    assert ecu.requests == 3
+
+
+def test_busy_retries_are_limited(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, busy={0xF190: 5})
+    responses = send_and_collect(stack, b"\x22\xF1\x90", timeout=0.2, busy_retries=2, busy_backoff=0.01)
+    assert responses[0].nrc == 0x21
+    assert ecu.requests == 3
+
+
+def test_busy_backoff_is_not_measured_as_latency(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, busy={0xF190: 1})
+    timeout = AdaptiveTimeout(min_samples=100)
+    assert send_and_collect(stack, b"\x22\xF1\x90", timeout, busy_backoff=0.2)[0].positive
+    assert len(timeout._samples[0x22]) == 2
+    assert max(timeout._samples[0x22]) < 0.2
+
+
+def test_late_responses_are_drained_and_counted(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, latency=0.1)
+    timeout = AdaptiveTimeout(initial=0.02, ceiling=1.0, min_samples=100, recalibrate_every=0)
+    assert send_and_collect(stack, b"\x22\xF1\x90", timeout) == []
+    time.sleep(0.2)
+    timeout.initial = 0.5
+    responses = send_and_collect(stack, b"\x22\xF1\x8C", timeout)
+    assert bytes(responses[0].payload) == DIDS[0xF18C]
+    assert timeout._samples[0x22][0] == 0.04
+
+
+def test_responses_to_other_requests_are_dropped(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, latency=0.1)
+    assert send_and_collect(stack, b"\x22\xF1\x90", timeout=0.02) == []
+    responses = send_and_collect(stack, b"\x22\xF1\x8C", timeout=0.5)
+    assert bytes(responses[0].payload) == DIDS[0xF18C]
+
+
+def test_wait_for_responses_collects_until_idle(simulated_ecu):
+    ecu, stack = simulated_ecu(dids=DIDS, pending={0xF190: 1})
+    stack.send(b"\x22\xF1\x90")
+    responses = wait_for_responses(stack, 0.2)
+    assert [response.nrc for response in responses] == [0x78, None]